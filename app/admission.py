@@ -0,0 +1,99 @@
+"""
+Admission control: a worker processes at most ADMISSION_MAX_INFLIGHT requests
+at once, and at most ADMISSION_MAX_QUEUE more wait for a slot. Past that,
+requests are turned away at once with 503 and Retry-After, so under overload
+the latency of admitted requests stays bounded instead of every request
+queueing behind all the others.
+"""
+import asyncio
+import json
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.config import settings
+from app.metrics import ADMISSIONS
+
+# Endpoints that take a slot; long-lived streams and WebSockets don't
+ADMITTED_PATHS = ("/honeypot", "/honeypot/batch")
+
+class AdmissionControl:
+    def __init__(self, max_inflight: int, max_queue: int, retry_after: int = 1):
+        # max_inflight <= 0: everything is admitted
+        self.slots = asyncio.Semaphore(max_inflight) if max_inflight > 0 else None
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self.waiting = 0
+
+    async def acquire(self) -> bool:
+        """
+        Waits for a slot; False (at once) if the wait queue is full.
+        """
+        if self.slots is None:
+            return True
+        if self.slots.locked() and self.waiting >= self.max_queue:
+            ADMISSIONS.inc("rejected")
+            return False
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        ADMISSIONS.inc("admitted")
+        # One pass of the event loop before the request's work: requests already
+        # received reach this point (and are counted) first. Otherwise, with inline
+        # analysis, each request would run to completion as soon as it is parsed,
+        # and the backlog would build up unseen in socket buffers.
+        await asyncio.sleep(0)
+        return True
+
+    def release(self):
+        if self.slots is not None:
+            self.slots.release()
+
+admission = AdmissionControl(settings.ADMISSION_MAX_INFLIGHT, settings.ADMISSION_MAX_QUEUE, settings.ADMISSION_RETRY_AFTER)
+
+BUSY_BODY = json.dumps(
+    {"error": "HTTPException", "message": "Server busy. Please try again later.", "details": None},
+    separators=(",", ":")
+).encode()
+
+async def admitted(call):
+    """
+    Awaits call() in an admission slot, for requests that arrive inside a
+    connection the middleware doesn't hold a slot for (stream lines, WebSocket
+    frames).
+    None if the wait queue is full.
+    """
+    control = admission
+    if not await control.acquire():
+        return None
+    try:
+        return await call()
+    finally:
+        control.release()
+
+class AdmissionMiddleware:
+    """
+    Applies `admission` to ADMITTED_PATHS ahead of routing, body parsing and
+    dependencies, so a rejection costs next to nothing. The 503 body has the
+    shape of the API's other HTTP errors.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in ADMITTED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        control = admission
+        if not await control.acquire():
+            await send({"type": "http.response.start", "status": 503, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(BUSY_BODY)).encode()),
+                (b"retry-after", str(control.retry_after).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": BUSY_BODY})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            control.release()
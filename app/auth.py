@@ -1,23 +1,31 @@
+import time
 from fastapi import Header, HTTPException, status
 from app.config import settings
+from app.metrics import STAGE
 
-def verify_api_key(x_api_key: str | None = Header(None)):
+async def verify_api_key(x_api_key: str | None = Header(None)):
     """
     Validates the x-api-key header.
     Returns True if valid.
     Raises 401 if missing.
     Raises 403 if invalid.
+    Async (it never blocks), so FastAPI runs it on the event loop rather than
+    in the thread pool.
     """
-    if x_api_key is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing API Key"
-        )
-    
-    if x_api_key != settings.API_KEY:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid API Key"
-        )
-        
-    return True
+    started = time.perf_counter()
+    try:
+        if x_api_key is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Missing API Key"
+            )
+
+        if x_api_key != settings.API_KEY:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Invalid API Key"
+            )
+
+        return True
+    finally:
+        STAGE["auth"].observe_since(started)
@@ -0,0 +1,132 @@
+"""
+Batch scoring for offline corpus classification (backtesting rule changes
+over message archives). detect_scam_batch(messages) returns exactly
+[detect_scam(m) for m in messages], but scans and scores a block at a time.
+"""
+from bisect import bisect_right
+from app.detector import PATTERNS, MATCHER, SCAM_TYPES, LINK_POINTS, classify_scores, score_mask, scan_message
+
+# Optional NumPy: scores and classifies the hit matrix as arrays.
+# Without it the same results come from classify_scores per distinct row.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Joins a block's messages; no keyword contains it, so no match spans two messages
+SEPARATOR = "\x00"
+# Messages per scan block: bounds the joined copy held in memory
+BLOCK_SIZE = 10_000
+# One str.find pass per keyword costs about 0.35us per 300-character message,
+# one automaton pass about 30us: past this many keywords scan_block falls
+# back to the automaton
+BLOCK_SCAN_MAX_KEYWORDS = 80
+
+def scan_block(messages: list[str]) -> list[int]:
+    """
+    Signal masks (as app.detector.scan_message) of a block of messages: the
+    rows of its sparse keyword-hit matrix. Built one keyword column at a
+    time: each keyword is searched with str.find over the whole block joined
+    into one string, jumping to the next message after a hit, so Python only
+    runs per hit rather than per character.
+    """
+    if len(MATCHER) > BLOCK_SCAN_MAX_KEYWORDS:
+        return [scan_message(message) for message in messages]
+    lowered = [m.lower() for m in messages]
+    starts = []
+    position = 0
+    for text in lowered:
+        starts.append(position)
+        position += len(text) + 1
+    block = SEPARATOR.join(lowered)
+    find = block.find
+    last = len(starts) - 1
+
+    masks = [0] * len(messages)
+    for pattern_id, keyword in enumerate(MATCHER.keywords):
+        bit = 1 << pattern_id
+        i = find(keyword)
+        while i != -1:
+            row = bisect_right(starts, i) - 1
+            masks[row] |= bit
+            if row == last:
+                break
+            i = find(keyword, starts[row + 1])
+    return masks
+
+def hit_matrix(masks: list[int]):
+    """
+    Dense 0/1 matrix (rows: masks, columns: PATTERNS) unpacked from the masks' bits.
+    """
+    width = (len(PATTERNS) + 7) // 8
+    packed = np.frombuffer(b"".join(mask.to_bytes(width, "little") for mask in masks), dtype=np.uint8)
+    return np.unpackbits(packed.reshape(len(masks), width), axis=1, bitorder="little")[:, :len(PATTERNS)]
+
+def classify_masks_array(masks: list[int]) -> list[tuple[bool, str, float]]:
+    """
+    classify_scores over score_mask for many masks at once.
+    Scores are the hit matrix times the per-pattern weights, accumulated one
+    pattern column at a time in pattern id order: the order score_hits adds
+    them in, so every float sum is bit-identical (a BLAS product may reorder
+    the additions). The confidence mapping is applied element-wise.
+    """
+    hits = hit_matrix(masks)
+    scores = np.zeros((len(masks), len(SCAM_TYPES)))
+    type_index = {type_key: i for i, type_key in enumerate(SCAM_TYPES)}
+    links = [j for j, (type_key, _, _) in enumerate(PATTERNS) if type_key is None]
+    # Link markers come first and count once
+    scores[:, type_index["phishing"]] += hits[:, links].any(axis=1) * LINK_POINTS
+    for j, (type_key, points, _) in enumerate(PATTERNS):
+        if type_key is not None:
+            scores[:, type_index[type_key]] += hits[:, j] * points
+
+    # Mirrors classify_scores: the first highest type wins; thresholds 0.5/1.0/2.5/4.5
+    winner = scores.argmax(axis=1)
+    best = scores.max(axis=1)
+    confidence = np.select(
+        [best < 0.5, best < 1.0, best < 2.5, best < 4.5],
+        [0.0, 0.25, 0.4 + (best - 1.0) * 0.2, 0.7 + (best - 2.5) * 0.125],
+        0.99
+    )
+    is_scam = best >= 1.0
+    # Python's round() (correctly rounded) on the few distinct values, not np.round
+    rounded = {c: round(c, 2) for c in set(confidence.tolist())}
+    return [
+        (scam, SCAM_TYPES[w] if scam else "unknown", rounded[c])
+        for scam, w, c in zip(is_scam.tolist(), winner.tolist(), confidence.tolist())
+    ]
+
+def classify_masks(masks: list[int]) -> list[tuple[bool, str, float]]:
+    if not masks:
+        return []
+    if np is not None:
+        return classify_masks_array(masks)
+    return [classify_scores(score_mask(mask)[0]) for mask in masks]
+
+def detect_scam_batch(messages: list[str]) -> list[dict]:
+    """
+    detect_scam for every message, in order. Repeated texts are scanned once
+    and every distinct hit pattern is scored once.
+    """
+    unique = list(dict.fromkeys(messages))
+    mask_of = {}
+    for start in range(0, len(unique), BLOCK_SIZE):
+        chunk = unique[start:start + BLOCK_SIZE]
+        mask_of.update(zip(chunk, scan_block(chunk)))
+
+    distinct = list(dict.fromkeys(mask_of.values()))
+    verdicts = {
+        mask: (is_scam, scam_type, confidence, score_mask(mask)[1])
+        for mask, (is_scam, scam_type, confidence) in zip(distinct, classify_masks(distinct))
+    }
+
+    results = []
+    for message in messages:
+        is_scam, scam_type, confidence, signals = verdicts[mask_of[message]]
+        results.append({
+            "is_scam": is_scam,
+            "scam_type": scam_type,
+            "confidence": confidence,
+            "signals": list(signals)
+        })
+    return results
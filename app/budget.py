@@ -0,0 +1,40 @@
+import time
+
+class AnalysisBudget:
+    """
+    Time budget for the CPU-bound analysis stages of one request.
+    Only time spent inside `with budget:` blocks is charged, so awaiting
+    session I/O (while other requests run) doesn't use it up.
+    Long-running work polls expired() and stops early once the budget is
+    spent; `exceeded` then tells the caller its results are partial.
+    A budget of None or <= 0 never expires.
+    """
+
+    def __init__(self, seconds: float | None):
+        self.remaining = seconds if seconds and seconds > 0 else None
+        self.exceeded = False
+        self._entered = None
+        self._deadline = None
+
+    def __enter__(self):
+        if self.remaining is not None:
+            self._entered = time.perf_counter()
+            self._deadline = self._entered + self.remaining
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._entered is not None:
+            self.remaining -= time.perf_counter() - self._entered
+            self._entered = self._deadline = None
+        return False
+
+    def expired(self) -> bool:
+        if self.exceeded:
+            return True
+        if self.remaining is None:
+            return False
+        if self._deadline is not None:
+            self.exceeded = time.perf_counter() >= self._deadline
+        else:
+            self.exceeded = self.remaining <= 0
+        return self.exceeded
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from app import extractor
+from app.config import settings
+from app.detector import KEYWORD_RULES, LINK_MARKERS, LINK_POINTS
+from app.memory import session_manager
+from app.metrics import DETECTION_CACHE, DETECTION_CACHE_EVICTIONS, REDIS_SECONDS
+
+# Bump when detection or extraction logic changes in ways the rule tables
+# below don't show, so shared (Redis) entries from older deploys are ignored.
+CACHE_FORMAT = 2
+RULES_ID = zlib.crc32(repr((
+    CACHE_FORMAT, KEYWORD_RULES, LINK_MARKERS, LINK_POINTS,
+    [p.pattern for p in (extractor.ANCHOR_PATTERN, extractor.URL_PATTERN, extractor.UPI_DOMAIN_PATTERN,
+                         extractor.INDIAN_MOBILE_PATTERN, extractor.GENERIC_PHONE_PATTERN,
+                         extractor.BANK_ACCOUNT_PATTERN)],
+    extractor.UPI_LOCAL_MAX, extractor.BANK_CONTEXT_KEYWORDS, extractor.BANK_CONTEXT_CHARS
+)).encode())
+
+# Approximate per-entry cost besides the key and value strings (OrderedDict
+# node and hash table slot)
+ENTRY_OVERHEAD = 100
+
+def message_key(message: str) -> str:
+    """
+    Cache key of a message. Only surrounding whitespace is normalized away:
+    it never changes detection or extraction results, while case and inner
+    spacing can (URLs, phone number formats).
+    """
+    return hashlib.blake2b(message.strip().encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+class CachedAnalysis:
+    """
+    Per-message results shared by every copy of the same text: the signal
+    mask (app.detector.scan_message) and, once some session needed it, the
+    extracted intelligence (as a plain dict). Anything session-dependent
+    (turn, stage, accumulated scores, reply) is not cached.
+    Callers fill in missing parts and set `dirty` so store() writes them back.
+    """
+
+    __slots__ = ("key", "hits", "extracted", "dirty")
+
+    def __init__(self, key: str | None, hits: int | None = None, extracted: dict | None = None):
+        self.key = key
+        self.hits = hits
+        self.extracted = extracted
+        self.dirty = False
+
+    @classmethod
+    def decode(cls, key: str, raw: str) -> "CachedAnalysis":
+        hits, extracted = json.loads(raw)
+        return cls(key, hits, extracted)
+
+    def encode(self) -> str:
+        return json.dumps([self.hits, self.extracted], separators=(",", ":"))
+
+class DetectionCache:
+    """
+    Bounded LRU of CachedAnalysis records (stored encoded) per message_key,
+    capped at `max_bytes` of key and value data. With a Redis client it also
+    reads and writes a second level shared by all workers, keyed by RULES_ID
+    so results of different rule sets never mix. max_bytes=0 disables both.
+    """
+
+    def __init__(self, max_bytes: int, redis_client=None, ttl: int = 3600):
+        self.max_bytes = max_bytes
+        self.redis_client = redis_client if max_bytes > 0 else None
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_local(self, key: str) -> CachedAnalysis | None:
+        raw = self.entries.get(key)
+        if raw is None:
+            return None
+        self.entries.move_to_end(key)
+        return CachedAnalysis.decode(key, raw)
+
+    def put_local(self, key: str, raw: str):
+        entries = self.entries
+        old = entries.pop(key, None)
+        if old is not None:
+            self.size -= entry_size(key, old)
+        size = entry_size(key, raw)
+        if size > self.max_bytes:
+            return
+        entries[key] = raw
+        self.size += size
+        # Full: drop the least recently used results
+        while self.size > self.max_bytes:
+            old_key, old_raw = entries.popitem(last=False)
+            self.size -= entry_size(old_key, old_raw)
+            DETECTION_CACHE_EVICTIONS.inc()
+
+    def redis_key(self, key: str) -> str:
+        return f"detect:{RULES_ID:08x}:{key}"
+
+    async def lookup(self, message: str) -> CachedAnalysis:
+        return (await self.lookup_many([message]))[0]
+
+    async def lookup_many(self, messages: list[str]) -> list[CachedAnalysis]:
+        """
+        A CachedAnalysis per message, filled in from the cache where possible.
+        Messages missing locally are fetched from Redis in one MGET.
+        Blank messages and a disabled cache give empty, uncached records.
+        """
+        if self.max_bytes <= 0:
+            return [CachedAnalysis(None) for _ in messages]
+
+        results = []
+        missing = []
+        for message in messages:
+            if not message.strip():
+                results.append(CachedAnalysis(None))
+                continue
+            key = message_key(message)
+            cached = self.get_local(key)
+            if cached is None:
+                cached = CachedAnalysis(key)
+                missing.append(cached)
+            else:
+                DETECTION_CACHE.inc("hit")
+            results.append(cached)
+
+        if missing and self.redis_client:
+            started = time.perf_counter()
+            raws = await self.redis_client.mget([self.redis_key(c.key) for c in missing])
+            REDIS_SECONDS.observe(time.perf_counter() - started, "cache_get")
+            for cached, raw in zip(missing, raws):
+                if raw is None:
+                    DETECTION_CACHE.inc("miss")
+                    continue
+                DETECTION_CACHE.inc("shared_hit")
+                shared = CachedAnalysis.decode(cached.key, raw)
+                cached.hits, cached.extracted = shared.hits, shared.extracted
+                self.put_local(cached.key, raw)
+        else:
+            DETECTION_CACHE.inc("miss", amount=len(missing))
+        return results
+
+    async def store(self, analysis: CachedAnalysis):
+        await self.store_many([analysis])
+
+    async def store_many(self, analyses: list[CachedAnalysis]):
+        """
+        Writes back the records that callers completed (dirty ones).
+        """
+        dirty = [a for a in analyses if a.dirty and a.key is not None and a.hits is not None]
+        if not dirty:
+            return
+        encoded = []
+        for analysis in dirty:
+            analysis.dirty = False
+            raw = analysis.encode()
+            self.put_local(analysis.key, raw)
+            encoded.append((analysis.key, raw))
+
+        if self.redis_client:
+            started = time.perf_counter()
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, raw in encoded:
+                pipe.set(self.redis_key(key), raw, ex=self.ttl)
+            await pipe.execute()
+            REDIS_SECONDS.observe(time.perf_counter() - started, "cache_set")
+
+def entry_size(key: str, raw: str) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(raw) + ENTRY_OVERHEAD
+
+detection_cache = DetectionCache(
+    settings.DETECTION_CACHE_BYTES,
+    session_manager.redis_client if settings.DETECTION_CACHE_REDIS else None,
+    ttl=settings.DETECTION_CACHE_TTL
+)
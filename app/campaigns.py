@@ -0,0 +1,386 @@
+import array
+import asyncio
+import hashlib
+import heapq
+import random
+import re
+import struct
+import time
+import zlib
+from collections import OrderedDict, deque
+from app.config import settings
+from app.memory import session_manager
+from app.metrics import CAMPAIGN_ASSIGNMENTS, REDIS_SECONDS
+
+# MinHash signature: SIGNATURE_SIZE values, split into BANDS bands of ROWS
+# values for LSH. Two messages share a band with probability
+# 1 - (1 - J^ROWS)^BANDS for shingle Jaccard similarity J: about 0.98 at
+# J = 0.75 (a template with its name, amount and link swapped), under 0.01
+# at J = 0.1.
+SIGNATURE_SIZE = 24
+BANDS = 8
+ROWS = SIGNATURE_SIZE // BANDS
+# Messages with fewer words than this get no campaign ("ok", "who is this?")
+MIN_WORDS = 5
+
+# Per-recipient parts of a template are collapsed before shingling:
+# links and handles (UPI IDs, emails) to one token each, every number to "0"
+VARIABLE_PATTERN = re.compile(r"(?:https?://|www\.)\S+|\S+@\S+")
+WORD_PATTERN = re.compile(r"[a-z]+|\d+|[^\x00-\x7f]+")
+MASK64 = 2 ** 64 - 1
+EMPTY_BUCKET = MASK64
+
+def shingle_hashes(message: str) -> list[int]:
+    """
+    64-bit hashes of the message's distinct word bigrams, after collapsing
+    links, handles and numbers.
+    """
+    text = VARIABLE_PATTERN.sub(lambda m: " link " if "@" not in m.group() else " handle ", message.lower())
+    words = [w if not w.isdigit() else "0" for w in WORD_PATTERN.findall(text)]
+    if len(words) < MIN_WORDS:
+        return []
+    hashes = set()
+    for a, b in zip(words, words[1:]):
+        # crc32 spread over 64 bits by a multiplicative (Fibonacci) hash
+        hashes.add(zlib.crc32(f"{a} {b}".encode()) * 0x9E3779B97F4A7C15 & MASK64)
+    return list(hashes)
+
+# Donor buckets tried, in order, by each empty bucket: a fixed pseudo-random
+# sequence per bucket, so the rows of one band borrow from unrelated buckets
+DONORS = [random.Random(bucket).sample(range(SIGNATURE_SIZE), SIGNATURE_SIZE) for bucket in range(SIGNATURE_SIZE)]
+
+def minhash_signature(hashes: list[int]) -> list[int]:
+    """
+    One-permutation MinHash: every shingle hash goes to one of SIGNATURE_SIZE
+    buckets and each bucket keeps its minimum, so a message costs one pass
+    over its shingles instead of one per signature value. Empty buckets copy
+    the first non-empty bucket of their DONORS sequence (optimal
+    densification), which keeps short messages' bands independent.
+    """
+    mins = [EMPTY_BUCKET] * SIGNATURE_SIZE
+    for h in hashes:
+        # Low bits pick the bucket, the rest is the value it competes with
+        bucket = h % SIGNATURE_SIZE
+        value = h >> 8
+        if value < mins[bucket]:
+            mins[bucket] = value
+    signature = list(mins)
+    for i in range(SIGNATURE_SIZE):
+        if mins[i] == EMPTY_BUCKET:
+            for donor in DONORS[i]:
+                if mins[donor] != EMPTY_BUCKET:
+                    signature[i] = mins[donor]
+                    break
+    return signature
+
+BAND = struct.Struct(f"<B{ROWS}Q")
+
+def fingerprint(message: str) -> list[int] | None:
+    """
+    LSH band keys of a message: one nonzero 64-bit key per band, stable
+    across processes. None for messages too short to fingerprint.
+    """
+    hashes = shingle_hashes(message)
+    if not hashes:
+        return None
+    signature = minhash_signature(hashes)
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(BAND.pack(band, *signature[band * ROWS:(band + 1) * ROWS]), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little") or 1)
+    return keys
+
+def campaign_label(campaign: int) -> str:
+    return f"{campaign:016x}"
+
+class CampaignEntry:
+    __slots__ = ("count", "first_seen", "last_seen", "scam_type")
+
+    def __init__(self, first_seen: float):
+        self.count = 0
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.scam_type = "unknown"
+
+class CampaignIndex:
+    """
+    In-process LSH index of campaigns. Band keys live in a fixed table of
+    `slots` (key, campaign) pairs, grouped in buckets of BUCKET_SLOTS like
+    app.limiter.SharedMemoryRateLimiter, so memory is 16 bytes per slot however
+    many messages arrive and a probe is one slice compare. A message joins the
+    campaign of its first band found in the table, or founds a new one named
+    after its first band key; its other band keys are then added for that
+    campaign, which lets a drifting template keep matching. When a bucket is
+    full a pseudo-random slot in it is overwritten.
+    Per-campaign counts are kept for the `max_campaigns` most recently seen.
+    """
+
+    BUCKET_SLOTS = 8
+
+    def __init__(self, slots: int = 2 ** 20, max_campaigns: int = 100_000):
+        buckets = 1
+        while buckets * self.BUCKET_SLOTS < slots:
+            buckets *= 2
+        self.bucket_mask = buckets - 1
+        self.keys = array.array("Q", bytes(8 * buckets * self.BUCKET_SLOTS))
+        self.campaigns_of = array.array("Q", bytes(8 * buckets * self.BUCKET_SLOTS))
+        self.max_campaigns = max_campaigns
+        # {campaign: CampaignEntry}, least recently seen first
+        self.campaigns = OrderedDict()
+
+    def assign_sync(self, keys: list[int], scam_type: str, now: float) -> int:
+        table = self.keys
+        campaigns_of = self.campaigns_of
+        width = self.BUCKET_SLOTS
+        positions = []
+        campaign = 0
+        for key in keys:
+            start = (key & self.bucket_mask) * width
+            bucket = table[start:start + width]
+            if key in bucket:
+                slot = start + bucket.index(key)
+                if not campaign:
+                    campaign = campaigns_of[slot]
+                positions.append((key, slot, True))
+            elif 0 in bucket:
+                positions.append((key, start + bucket.index(0), False))
+            else:
+                positions.append((key, start + (key >> 32) % width, False))
+
+        if campaign:
+            CAMPAIGN_ASSIGNMENTS.inc("joined")
+        else:
+            CAMPAIGN_ASSIGNMENTS.inc("new")
+            campaign = keys[0]
+        for key, slot, present in positions:
+            if not present:
+                table[slot] = key
+                campaigns_of[slot] = campaign
+
+        entries = self.campaigns
+        entry = entries.get(campaign)
+        if entry is None:
+            entry = entries[campaign] = CampaignEntry(now)
+            if len(entries) > self.max_campaigns:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(campaign)
+        entry.count += 1
+        entry.last_seen = now
+        if scam_type != "unknown":
+            entry.scam_type = scam_type
+        return campaign
+
+    async def assign_many(self, items: list[tuple[list[int], str]], now: float | None = None) -> list[str]:
+        """
+        Campaign ids for (band keys, scam type) pairs, applied in order.
+        """
+        now = time.time() if now is None else now
+        return [campaign_label(self.assign_sync(keys, scam_type, now)) for keys, scam_type in items]
+
+    async def flush(self, limit: int | None = None) -> int:
+        # Assignments are applied as they are made
+        return 0
+
+    async def top(self, limit: int = 20) -> list[dict]:
+        largest = heapq.nlargest(limit, self.campaigns.items(), key=lambda item: item[1].count)
+        return [
+            {"campaign_id": campaign_label(campaign), "count": entry.count, "first_seen": entry.first_seen,
+             "last_seen": entry.last_seen, "scam_type": entry.scam_type}
+            for campaign, entry in largest
+        ]
+
+# Assigns one message to a campaign.
+# KEYS = camp:band:<key> per band, then the campaigns sorted set (scored by
+# count) and the campaign info hash ({id: "first_seen|last_seen|scam_type"});
+# a script may only touch the keys it is given, and which campaign a message
+# joins is only known inside it, so per-campaign data lives in these two keys.
+# ARGV = new campaign id, now, scam_type, ttl, max campaigns
+# Returns the campaign id, and whether it already existed.
+ASSIGN_CAMPAIGN_SCRIPT = """
+local n = #KEYS - 2
+local ranking, info = KEYS[n + 1], KEYS[n + 2]
+local found = redis.call('MGET', unpack(KEYS, 1, n))
+local id
+for i = 1, n do
+    if found[i] then id = found[i]; break end
+end
+local joined = 1
+if not id then id = ARGV[1]; joined = 0 end
+for i = 1, n do
+    if not found[i] then redis.call('SET', KEYS[i], id, 'EX', ARGV[4])
+    elseif found[i] == id then redis.call('EXPIRE', KEYS[i], ARGV[4]) end
+end
+local first_seen, scam_type = ARGV[2], 'unknown'
+local entry = redis.call('HGET', info, id)
+if entry then first_seen, scam_type = string.match(entry, '^([^|]*)|[^|]*|(.*)$') end
+if ARGV[3] ~= 'unknown' then scam_type = ARGV[3] end
+redis.call('HSET', info, id, first_seen .. '|' .. ARGV[2] .. '|' .. scam_type)
+redis.call('ZINCRBY', ranking, 1, id)
+local dropped = redis.call('ZRANGE', ranking, 0, -tonumber(ARGV[5]) - 1)
+if #dropped > 0 then
+    redis.call('ZREMRANGEBYRANK', ranking, 0, #dropped - 1)
+    redis.call('HDEL', info, unpack(dropped))
+end
+redis.call('EXPIRE', ranking, ARGV[4])
+redis.call('EXPIRE', info, ARGV[4])
+return {id, joined}
+"""
+
+class RedisCampaignIndex:
+    """
+    CampaignIndex shared by all workers: band keys (camp:band:<key>) map to
+    campaign ids, a sorted set ranks the `max_campaigns` largest campaigns by
+    count and a hash holds their first/last seen times and scam type. Band
+    keys expire `ttl` seconds after they were last matched; campaigns not
+    seen for `ttl` seconds are left out of top().
+    Writes are kept off the request path like app.indicators.IndicatorRecorder:
+    assign_many() answers from this worker's map of band keys to the campaign
+    ids Redis last gave them (a message with no known band gets the id it
+    would found a campaign under) and queues the assignment; flush() (run
+    every `flush_interval` seconds by run_flusher) applies the queue in one
+    pipeline and learns the ids Redis chose. Until then, the first messages of
+    a campaign another worker founded can carry a provisional id.
+    """
+
+    CAMPAIGNS_KEY = "campaigns"
+    INFO_KEY = "campaigns:info"
+
+    def __init__(self, redis_client, max_campaigns: int = 100_000, ttl: int = 7 * 86400,
+                 flush_interval: float = 0.5, max_pending: int = 100_000, max_known: int = 1_000_000):
+        self.redis = redis_client
+        self.max_campaigns = max_campaigns
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.max_known = max_known
+        self.script = redis_client.register_script(ASSIGN_CAMPAIGN_SCRIPT)
+        # (band keys, scam_type, seen) waiting to be assigned in Redis
+        self.pending = deque(maxlen=max_pending)
+        # {band key: campaign id}, least recently used first
+        self.known = OrderedDict()
+
+    def learn(self, keys: list[int], campaign: str | None = None) -> str:
+        """
+        Maps the message's band keys to `campaign`, or to the campaign of its
+        first known band key (else its own new one), and returns that id.
+        """
+        known = self.known
+        if campaign is None:
+            campaign = next((known[key] for key in keys if key in known), None) or campaign_label(keys[0])
+        for key in keys:
+            known[key] = campaign
+            known.move_to_end(key)
+        while len(known) > self.max_known:
+            known.popitem(last=False)
+        return campaign
+
+    async def assign_many(self, items: list[tuple[list[int], str]], now: float | None = None) -> list[str]:
+        now = time.time() if now is None else now
+        pending = self.pending
+        labels = []
+        for keys, scam_type in items:
+            if len(pending) == pending.maxlen:
+                CAMPAIGN_ASSIGNMENTS.inc("dropped")
+            pending.append((keys, scam_type, now))
+            labels.append(self.learn(keys))
+        return labels
+
+    async def flush(self, limit: int | None = None) -> int:
+        """
+        Assigns every queued message (or the oldest `limit` ones) in one
+        pipeline. Returns how many were assigned.
+        """
+        pending = self.pending
+        if not pending:
+            return 0
+        batch = [pending.popleft() for _ in range(len(pending) if limit is None else min(limit, len(pending)))]
+        started = time.perf_counter()
+        pipe = self.redis.pipeline(transaction=False)
+        for keys, scam_type, seen in batch:
+            await self.script(
+                keys=[f"camp:band:{key:016x}" for key in keys] + [self.CAMPAIGNS_KEY, self.INFO_KEY],
+                args=[campaign_label(keys[0]), seen, scam_type, self.ttl, self.max_campaigns],
+                client=pipe
+            )
+        results = await pipe.execute()
+        REDIS_SECONDS.observe(time.perf_counter() - started, "campaign_assign")
+        for (keys, _, _), (campaign, joined) in zip(batch, results):
+            CAMPAIGN_ASSIGNMENTS.inc("joined" if int(joined) else "new")
+            self.learn(keys, campaign)
+        return len(batch)
+
+    async def run_flusher(self):
+        """
+        Background task: flushes the queue every flush_interval seconds,
+        yielding to the event loop between chunks.
+        """
+        chunk = 1000
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                while self.pending:
+                    await self.flush(chunk)
+                    await asyncio.sleep(0)
+            except Exception as e:
+                print(f"Campaign index flush failed: {e}")
+
+    async def top(self, limit: int = 20, now: float | None = None) -> list[dict]:
+        await self.flush()
+        now = time.time() if now is None else now
+        started = time.perf_counter()
+        ranked = await self.redis.zrevrange(self.CAMPAIGNS_KEY, 0, limit - 1, withscores=True)
+        entries = await self.redis.hmget(self.INFO_KEY, [campaign for campaign, _ in ranked]) if ranked else []
+        REDIS_SECONDS.observe(time.perf_counter() - started, "campaign_top")
+        campaigns = []
+        for (campaign, count), entry in zip(ranked, entries):
+            if not entry:
+                continue
+            first_seen, last_seen, scam_type = entry.split("|", 2)
+            if float(last_seen) + self.ttl < now:
+                continue
+            campaigns.append({"campaign_id": campaign, "count": int(count), "first_seen": float(first_seen),
+                              "last_seen": float(last_seen), "scam_type": scam_type})
+        return campaigns
+
+class CampaignTracker:
+    """
+    Fingerprints messages and places them in campaigns of the given index.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    async def assign(self, message: str, scam_type: str) -> str | None:
+        return (await self.assign_many([(message, scam_type)]))[0]
+
+    async def assign_many(self, items: list[tuple[str, str]]) -> list[str | None]:
+        """
+        Campaign id per (message, session scam type), in order; None for
+        messages too short to fingerprint and for benign sessions ("unknown"),
+        which then cost no index lookup (on Redis, no round trip).
+        """
+        fingerprints = [fingerprint(message) if scam_type != "unknown" else None for message, scam_type in items]
+        indexed = [(keys, scam_type) for keys, (_, scam_type) in zip(fingerprints, items) if keys]
+        labels = iter(await self.index.assign_many(indexed) if indexed else ())
+        return [next(labels) if keys else None for keys in fingerprints]
+
+    async def flush(self) -> int:
+        return await self.index.flush()
+
+    async def top(self, limit: int = 20) -> list[dict]:
+        return await self.index.top(limit)
+
+def create_campaign_tracker() -> CampaignTracker:
+    """
+    The index lives in Redis when the session store does, otherwise in process.
+    """
+    if session_manager.redis_client:
+        index = RedisCampaignIndex(
+            session_manager.redis_client, settings.CAMPAIGN_MAX_ENTRIES, settings.CAMPAIGN_TTL,
+            settings.CAMPAIGN_FLUSH_INTERVAL, settings.CAMPAIGN_MAX_PENDING
+        )
+    else:
+        index = CampaignIndex(settings.CAMPAIGN_INDEX_SLOTS, settings.CAMPAIGN_MAX_ENTRIES)
+    return CampaignTracker(index)
+
+campaigns = create_campaign_tracker()
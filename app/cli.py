@@ -0,0 +1,209 @@
+"""
+Offline scoring of message archives, outside the HTTP app.
+
+Run: python -m app.cli score messages.jsonl -o results.jsonl [--workers 8] [--chunk-size 4194304]
+
+Input is JSONL (one object per line) or CSV with a header row, picked by the
+file extension unless --format is given; the message is read from --field.
+The output has one JSON line per input record, in input order: detect_scam's
+verdict and the extracted intelligence, or an "error" for records without a
+usable message. Records keep their --id-field value, if they have one.
+"""
+import argparse
+import csv
+import io
+import json
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+from app.batch import detect_scam_batch
+from app.extractor import extract_all
+
+# Chunks submitted ahead of the one being written, per worker: keeps every
+# worker busy while bounding the results held in memory
+CHUNKS_AHEAD = 2
+PROGRESS_INTERVAL = 1.0
+
+def open_map(path: str) -> mmap.mmap | None:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def chunk_bounds(data: mmap.mmap, start: int, chunk_size: int, quoted: bool) -> Iterator[tuple[int, int]]:
+    """
+    Splits data[start:] into (start, end) ranges of about chunk_size bytes
+    that end at a line break. With quoted (CSV), a line break inside a quoted
+    field doesn't count: the quotes since the chunk start must be even
+    (escaped quotes are doubled, so they never change that).
+    """
+    size = len(data)
+    while start < size:
+        end = data.find(b"\n", min(start + chunk_size, size) - 1)
+        if quoted and end != -1:
+            quotes = data[start:end].count(b'"')
+            while end != -1 and quotes % 2:
+                next_end = data.find(b"\n", end + 1)
+                quotes += data[end:size if next_end == -1 else next_end].count(b'"')
+                end = next_end
+        end = size if end == -1 else end + 1
+        yield start, end
+        start = end
+
+def csv_header(data: mmap.mmap) -> tuple[list[str], int]:
+    """
+    Column names of a CSV file and the offset of its first record.
+    """
+    end = next(chunk_bounds(data, 0, 1, quoted=True))[1]
+    header = next(csv.reader(io.StringIO(data[:end].decode("utf-8-sig"))))
+    return header, end
+
+def read_records(text: str, fmt: str, fieldnames: list[str] | None) -> list[dict | None]:
+    """
+    Records of one chunk; None for lines that don't parse to an object.
+    """
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(text, newline=""), fieldnames=fieldnames))
+    records = []
+    for line in text.split("\n"):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        records.append(record if isinstance(record, dict) else None)
+    return records
+
+# Per worker process: the input file, mapped on first use
+_maps = {}
+
+def score_chunk(path: str, start: int, end: int, fmt: str, fieldnames: list[str] | None,
+                field: str, id_field: str) -> tuple[int, bytes]:
+    """
+    Worker: scores the records in path[start:end].
+    Returns (records, encoded JSONL output).
+    """
+    data = _maps.get(path)
+    if data is None:
+        data = _maps[path] = open_map(path)
+    records = read_records(data[start:end].decode("utf-8", errors="replace"), fmt, fieldnames)
+
+    messages = []
+    for record in records:
+        message = record.get(field) if record is not None else None
+        messages.append(message if isinstance(message, str) and message.strip() else None)
+    verdicts = iter(detect_scam_batch([m for m in messages if m is not None]))
+
+    lines = []
+    for record, message in zip(records, messages):
+        result = {}
+        if record is not None and record.get(id_field) is not None:
+            result["id"] = record[id_field]
+        if record is None:
+            result["error"] = "Invalid record"
+        elif message is None:
+            result["error"] = f"Missing {field!r}"
+        else:
+            result.update(next(verdicts))
+            result["extracted_intelligence"] = extract_all(message)
+        lines.append(json.dumps(result, ensure_ascii=False) + "\n")
+    return len(records), "".join(lines).encode("utf-8")
+
+class Progress:
+    """
+    Records scored, input consumed and throughput, redrawn on one stderr line.
+    """
+
+    def __init__(self, total_bytes: int, enabled: bool = True):
+        self.total_bytes = total_bytes
+        self.enabled = enabled
+        self.records = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.shown = 0.0
+
+    def update(self, records: int, consumed: int, final: bool = False):
+        self.records += records
+        self.bytes += consumed
+        now = time.perf_counter()
+        if not self.enabled or (not final and now - self.shown < PROGRESS_INTERVAL):
+            return
+        self.shown = now
+        elapsed = max(now - self.started, 1e-9)
+        percent = self.bytes / self.total_bytes * 100 if self.total_bytes else 100.0
+        print(
+            f"\r{self.records} records, {self.bytes / 2 ** 20:.1f}/{self.total_bytes / 2 ** 20:.1f} MiB ({percent:.0f}%), "
+            f"{self.records / elapsed:.0f} records/s, {self.bytes / 2 ** 20 / elapsed:.1f} MiB/s",
+            end="\n" if final else "", file=sys.stderr, flush=True
+        )
+
+def score_file(path: str, output, fmt: str, field: str = "message", id_field: str = "id",
+               workers: int = 1, chunk_size: int = 4 * 2 ** 20, progress: bool = True) -> int:
+    """
+    Scores every record of path into the binary stream output, in order.
+    Chunks go to a pool of `workers` processes (workers=1 scores in this
+    process); at most CHUNKS_AHEAD per worker are pending at any time.
+    Returns the number of records.
+    """
+    data = open_map(path)
+    if data is None:
+        return 0
+    fieldnames, start = csv_header(data) if fmt == "csv" else (None, 0)
+    tracker = Progress(len(data), progress)
+    bounds = chunk_bounds(data, start, chunk_size, quoted=fmt == "csv")
+    args = (fmt, fieldnames, field, id_field)
+
+    def write(scored: tuple[int, bytes], consumed: int):
+        records, encoded = scored
+        output.write(encoded)
+        tracker.update(records, consumed)
+
+    if workers <= 1:
+        for chunk_start, chunk_end in bounds:
+            write(score_chunk(path, chunk_start, chunk_end, *args), chunk_end - chunk_start)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Futures in input order; the oldest is written before more are submitted
+            pending = deque()
+            for chunk_start, chunk_end in bounds:
+                pending.append((pool.submit(score_chunk, path, chunk_start, chunk_end, *args), chunk_end - chunk_start))
+                if len(pending) >= workers * CHUNKS_AHEAD:
+                    future, consumed = pending.popleft()
+                    write(future.result(), consumed)
+            while pending:
+                future, consumed = pending.popleft()
+                write(future.result(), consumed)
+    data.close()
+    tracker.update(0, 0, final=True)
+    return tracker.records
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Honeypot detection outside the HTTP app.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    score = commands.add_parser("score", help="score a JSONL or CSV message archive")
+    score.add_argument("input")
+    score.add_argument("-o", "--output", default="-", help="JSONL results (default: stdout)")
+    score.add_argument("--format", choices=["jsonl", "csv"], help="default: from the input file extension")
+    score.add_argument("--field", default="message", help="JSON key or CSV column holding the message")
+    score.add_argument("--id-field", default="id", help="copied to each result when present")
+    score.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    score.add_argument("--chunk-size", type=int, default=4 * 2 ** 20, help="bytes of input per task")
+    score.add_argument("--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        score_file(args.input, output, fmt, args.field, args.id_field, args.workers, max(1, args.chunk_size),
+                   progress=not args.quiet)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+if __name__ == "__main__":
+    main()
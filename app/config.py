@@ -6,6 +6,65 @@ load_dotenv()
 class Settings:
     API_KEY = os.getenv("API_KEY", None)
     RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+    RATE_LIMIT_SWEEP_INTERVAL = float(os.getenv("RATE_LIMIT_SWEEP_INTERVAL", "10"))
+    # auto | redis | shm | memory (see app.limiter.create_limiter)
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "auto").lower()
+    RATE_LIMIT_SHM_PATH = os.getenv("RATE_LIMIT_SHM_PATH")
+    RATE_LIMIT_SHM_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SLOTS", "65536"))
+    RATE_LIMIT_LEASE_SIZE = int(os.getenv("RATE_LIMIT_LEASE_SIZE", "5"))
+    RATE_LIMIT_LEASE_TTL = float(os.getenv("RATE_LIMIT_LEASE_TTL", "1.0"))
+    REDIS_URL = os.getenv("REDIS_URL")
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+    REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+    # In-memory session store (no REDIS_URL): LRU cap and expiry sweep period (seconds)
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "100000"))
+    SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "10"))
+    # Most values kept per intelligence field (UPI IDs, URLs, ...) of one session
+    INTEL_MAX_PER_FIELD = int(os.getenv("INTEL_MAX_PER_FIELD", "100"))
+    # Cross-session indicator index (see app.indicators): in-process entry cap, sessions kept
+    # per indicator, Redis entry TTL (seconds), and the write buffer's flush period and size cap
+    INDICATOR_MAX_ENTRIES = int(os.getenv("INDICATOR_MAX_ENTRIES", "1000000"))
+    INDICATOR_MAX_SESSIONS = int(os.getenv("INDICATOR_MAX_SESSIONS", "1000"))
+    INDICATOR_TTL = int(os.getenv("INDICATOR_TTL", str(30 * 86400)))
+    INDICATOR_FLUSH_INTERVAL = float(os.getenv("INDICATOR_FLUSH_INTERVAL", "0.5"))
+    INDICATOR_MAX_PENDING = int(os.getenv("INDICATOR_MAX_PENDING", "100000"))
+    # Near-duplicate campaign clustering (see app.campaigns): in-process LSH table slots
+    # (16 bytes each), campaigns with counts kept, Redis entry TTL (seconds), and how often
+    # queued Redis assignments are flushed (seconds) with the most that may wait
+    CAMPAIGN_INDEX_SLOTS = int(os.getenv("CAMPAIGN_INDEX_SLOTS", str(2 ** 20)))
+    CAMPAIGN_MAX_ENTRIES = int(os.getenv("CAMPAIGN_MAX_ENTRIES", "100000"))
+    CAMPAIGN_TTL = int(os.getenv("CAMPAIGN_TTL", str(7 * 86400)))
+    CAMPAIGN_FLUSH_INTERVAL = float(os.getenv("CAMPAIGN_FLUSH_INTERVAL", "0.5"))
+    CAMPAIGN_MAX_PENDING = int(os.getenv("CAMPAIGN_MAX_PENDING", "100000"))
+    # Cache of detection/extraction results per message text: size cap in bytes (0 disables),
+    # plus an optional second level shared by all workers in Redis (entries expire after TTL seconds)
+    DETECTION_CACHE_BYTES = int(os.getenv("DETECTION_CACHE_BYTES", str(32 * 2 ** 20)))
+    DETECTION_CACHE_REDIS = os.getenv("DETECTION_CACHE_REDIS", "false").lower() == "true"
+    DETECTION_CACHE_TTL = int(os.getenv("DETECTION_CACHE_TTL", "3600"))
+    # Known-bad indicator feed file built by `python -m app.feeds build` (empty: none)
+    FEED_PATH = os.getenv("FEED_PATH", "")
+    # CPU time budget for one message's analysis stages (0 disables)
+    ANALYSIS_BUDGET_MS = float(os.getenv("ANALYSIS_BUDGET_MS", "50"))
+    # Directory for per-worker metric files, aggregated by /metrics (empty: this process only).
+    # gunicorn.conf.py sets a default and clears it when the server starts.
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "1000"))
+    # /honeypot/stream: lines read ahead of the one being processed, and the longest line (bytes)
+    STREAM_MAX_PENDING = int(os.getenv("STREAM_MAX_PENDING", "100"))
+    STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+    # Where scanning and extraction run (see app.offload): inline, thread or process,
+    # and the pool size (0: one per CPU)
+    ANALYSIS_EXECUTOR = os.getenv("ANALYSIS_EXECUTOR", "inline")
+    ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0"))
+    # Admission control for /honeypot and /honeypot/batch, per worker: requests processed at once
+    # (0 disables), requests waiting for a slot before new ones get 503, and their Retry-After (seconds)
+    ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "32"))
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+    # /honeypot/ws: seconds between writes of a connection's session state (also written on close)
+    WS_PERSIST_INTERVAL = float(os.getenv("WS_PERSIST_INTERVAL", "5"))
 
 settings = Settings()
 print(f"DEBUG: Loaded API_KEY: {settings.API_KEY}")
@@ -0,0 +1,106 @@
+"""
+Session state held by a live connection (the /honeypot/ws WebSocket).
+
+A Conversation loads its session once and advances it in memory, turn after
+turn; the store is written every WS_PERSIST_INTERVAL seconds while there are
+unsaved turns, and when the connection closes. Extracted intelligence is
+buffered the same way, except when a turn asks for the cumulative view.
+"""
+import asyncio
+from app.config import settings
+from app.memory import Session, get_or_create_session, merge_session_intelligence, save_session
+from app.metrics import SESSION_PERSISTS
+
+# Attempts to write a session that another request keeps changing
+PERSIST_RETRIES = 3
+
+class Conversation:
+    """
+    One session, owned by one connection while it is open.
+    Writes are compare-and-set on the version that was loaded (or last
+    written); if another request wrote the session in between, the unsaved
+    turns are replayed on top of the stored state: turns add up and signal
+    masks are OR'd, so nothing is lost.
+    """
+
+    def __init__(self, state: Session):
+        self.state = state
+        # Turn of the state the store holds, and intelligence not merged into it yet
+        self.saved_turn = state.turn
+        self.found: dict[str, set[str]] = {}
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    async def open(cls, session_id: str | None) -> "Conversation":
+        return cls(await get_or_create_session(session_id))
+
+    @property
+    def dirty(self) -> bool:
+        return self.state.turn != self.saved_turn or bool(self.found)
+
+    def advance(self, hits: int) -> Session:
+        """
+        Session.advance, in memory.
+        """
+        self.state = self.state.advance(hits)
+        return self.state
+
+    async def merge_intelligence(self, found: dict[str, list[str]], cumulative: bool = False) -> dict[str, list[str]] | None:
+        """
+        Buffers a turn's extracted values. With cumulative, persists first
+        and returns the session's whole collection.
+        """
+        for field, values in found.items():
+            if values:
+                self.found.setdefault(field, set()).update(values)
+        return await self.persist(cumulative=True) if cumulative else None
+
+    async def persist(self, cumulative: bool = False) -> dict[str, list[str]] | None:
+        """
+        Writes unsaved turns, then buffered intelligence (the in-process store
+        only keeps intelligence of stored sessions), to the store.
+        With cumulative, returns every value collected in the session.
+        """
+        async with self.lock:
+            for _ in range(PERSIST_RETRIES):
+                if self.state.turn == self.saved_turn:
+                    break
+                state = self.state
+                if await save_session(state, compare=True):
+                    SESSION_PERSISTS.inc("written")
+                    self.saved_turn = state.turn
+                    # Turns taken during the write continue from the stored version
+                    self.state.version = state.version
+                    continue
+                SESSION_PERSISTS.inc("conflict")
+                stored = await get_or_create_session(state.session_id)
+                self.rebase(stored)
+            if not self.found and not cumulative:
+                return None
+            found, self.found = self.found, {}
+            return await merge_session_intelligence(
+                self.state.session_id, {field: sorted(values) for field, values in found.items()}, cumulative
+            )
+
+    def rebase(self, stored: Session):
+        """
+        Replays the unsaved turns on top of a newer stored state.
+        """
+        state = self.state
+        turns = state.turn - self.saved_turn
+        rebased = stored.advance(state.signal_mask)
+        for _ in range(turns - 1):
+            rebased = rebased.advance(0)
+        self.state = rebased
+        self.saved_turn = stored.turn
+
+    async def run_persister(self, interval: float | None = None):
+        """
+        Background task: persists every `interval` seconds (WS_PERSIST_INTERVAL by default) while dirty.
+        """
+        interval = settings.WS_PERSIST_INTERVAL if interval is None else interval
+        while True:
+            await asyncio.sleep(interval)
+            if self.dirty:
+                # Shielded: cancelling the task must not leave a write's outcome unknown
+                await asyncio.shield(self.persist())
@@ -1,56 +1,125 @@
 import re
+import zlib
+from app.matcher import KeywordMatcher
 
-def detect_scam(message: str) -> dict:
+SCAM_TYPES = ["phishing", "otp_fraud", "upi_refund", "loan_scam", "job_scam", "impersonation"]
+
+# Link detection is a strong signal for phishing when combined with urgency
+LINK_MARKERS = ["http", "www.", ".com"]
+LINK_POINTS = 0.5
+
+# (scam_type, points per keyword, keywords), in scoring order
+KEYWORD_RULES = [
+    ("phishing", 1, ["verify", "kyc", "login", "update", "expire", "suspend"]),
+    ("otp_fraud", 1.5, ["otp", "code", "verification", "share code", "4 digit"]),
+    ("upi_refund", 1.2, ["refund", "cashback", "upi", "collect request", "scan", "qr code", "bhim", "gpay", "phonepe"]),
+    ("loan_scam", 1.2, ["instant loan", "no cibil", "processing fee", "low interest", "approve", "disburse"]),
+    ("job_scam", 1.2, ["job offer", "part time", "work from home", "registration fee", "telegram", "hr manager", "hiring"]),
+    ("impersonation", 1.5, ["police", "cbi", "customs", "bank officer", "manager", "arrest", "parcel"]),
+]
+
+def compile_rules(rules: list, link_markers: list[str]) -> tuple[list, KeywordMatcher]:
     """
-    Detects if a message is a scam and classifies it.
-    Returns: {
-        "is_scam": bool,
-        "scam_type": str,
-        "confidence": float,
-        "signals": list[str]
-    }
+    Flattens the rule tables into a pattern list and one automaton over it.
+    Pattern ids follow scoring order (link markers first, then each rule's
+    keywords), so iterating sorted hit ids reproduces the sequential checks.
+    Returns (patterns, matcher) where patterns[id] = (scam_type | None, points, keyword).
+    """
+    patterns = [(None, LINK_POINTS, marker) for marker in link_markers]
+    for type_key, points, keywords in rules:
+        patterns.extend((type_key, points, kw) for kw in keywords)
+    return patterns, KeywordMatcher([p[2] for p in patterns])
+
+PATTERNS, MATCHER = compile_rules(KEYWORD_RULES, LINK_MARKERS)
+
+# Up to this many keywords, one `in` check per keyword (a substring search in
+# C) beats a pass of the pure-Python automaton. The two meet between about 80
+# and 120 keywords on a typical 125-character message, and around 160 on a
+# 5000-character one; python -m benchmarks.bench_detector measures both.
+# Same crossover as app.batch.BLOCK_SCAN_MAX_KEYWORDS.
+# The shipped rules have 43 keywords, so with them detection always takes the
+# per-keyword checks; the automaton is there for rule sets grown past this.
+SCAN_MAX_KEYWORDS = 80
+INDEXED_KEYWORDS = list(enumerate(MATCHER.keywords))
+
+def match_ids(text: str) -> set[int]:
+    """
+    Ids of the keyword patterns occurring in a lowercased text, like MATCHER.scan.
+    """
+    if len(MATCHER) > SCAN_MAX_KEYWORDS:
+        return MATCHER.scan(text)
+    return {pattern_id for pattern_id, keyword in INDEXED_KEYWORDS if keyword in text}
+
+# Extracted indicators listed in a known-bad feed (see app.feeds) score like
+# keywords of the feed entry's scam type. They never occur in message text, so
+# one pattern per (scam type, kind) is appended after the matcher's.
+KNOWN_BAD_KINDS = ["upi_id", "bank_account", "phone_number", "domain"]
+KNOWN_BAD_POINTS = 1.5
+KNOWN_BAD_BITS = {}
+for _type_key in SCAM_TYPES:
+    for _kind in KNOWN_BAD_KINDS:
+        KNOWN_BAD_BITS[(_type_key, _kind)] = 1 << len(PATTERNS)
+        PATTERNS.append((_type_key, KNOWN_BAD_POINTS, f"known bad {_kind.replace('_', ' ')}"))
+
+# Identifies what the bits of a mask mean: adding, removing or reordering a
+# pattern shifts every later bit. Session records store masks along with it
+# (see app.memory.Session), so masks from another rule set are recognized.
+PATTERNS_ID = zlib.crc32(repr(PATTERNS).encode())
+
+def scan_message(message: str) -> int:
+    """
+    Scans a message once and returns its signal mask: bit i is set when
+    PATTERNS[i] occurs. Masks of several messages combine with |.
+    """
+    mask = 0
+    for pattern_id in match_ids(message.lower()):
+        mask |= 1 << pattern_id
+    return mask
+
+def signal_ids(mask: int) -> list[int]:
+    ids = []
+    pattern_id = 0
+    while mask:
+        if mask & 1:
+            ids.append(pattern_id)
+        mask >>= 1
+        pattern_id += 1
+    return ids
+
+def score_mask(mask: int) -> tuple[dict, list[str]]:
+    """
+    score_hits over the signals of a mask: one message's, or the union of a
+    whole conversation's. The cost is bounded by the number of patterns, not
+    by how many messages the mask covers.
+    """
+    return score_hits(signal_ids(mask))
+
+def score_hits(hit_ids) -> tuple[dict, list[str]]:
+    """
+    Turns matched pattern ids into per-type scores and signals.
+    A link marker adds LINK_POINTS to phishing once, without a signal.
     """
-    message_lower = message.lower()
+    scores = dict.fromkeys(SCAM_TYPES, 0)
     signals = []
-    scores = {
-        "phishing": 0,
-        "otp_fraud": 0,
-        "upi_refund": 0,
-        "loan_scam": 0,
-        "job_scam": 0,
-        "impersonation": 0
-    }
-    
-    # helper for checking keywords
-    def check(keywords, type_key, points=1):
-        for kw in keywords:
-            if kw in message_lower:
-                scores[type_key] += points
-                signals.append(f"{type_key}:{kw}")
-    
-    # Phishing Rules
-    # Link detection is a strong signal for phishing when combined with urgency
-    has_link = "http" in message_lower or "www." in message_lower or ".com" in message_lower
-    if has_link:
-        scores["phishing"] += 0.5 
-    
-    check(["verify", "kyc", "login", "update", "expire", "suspend"], "phishing", 1)
-    
-    # OTP Fraud
-    check(["otp", "code", "verification", "share code", "4 digit"], "otp_fraud", 1.5)
-    
-    # UPI Refund
-    check(["refund", "cashback", "upi", "collect request", "scan", "qr code", "bhim", "gpay", "phonepe"], "upi_refund", 1.2)
-    
-    # Loan Scam
-    check(["instant loan", "no cibil", "processing fee", "low interest", "approve", "disburse"], "loan_scam", 1.2)
-    
-    # Job Scam
-    check(["job offer", "part time", "work from home", "registration fee", "telegram", "hr manager", "hiring"], "job_scam", 1.2)
-    
-    # Impersonation
-    check(["police", "cbi", "customs", "bank officer", "manager", "arrest", "parcel"], "impersonation", 1.5)
-    
+    has_link = False
+
+    for pattern_id in sorted(hit_ids):
+        type_key, points, kw = PATTERNS[pattern_id]
+        if type_key is None:
+            if not has_link:
+                has_link = True
+                scores["phishing"] += points
+            continue
+        scores[type_key] += points
+        signals.append(f"{type_key}:{kw}")
+
+    return scores, signals
+
+def classify_scores(scores: dict) -> tuple[bool, str, float]:
+    """
+    Picks the winning scam type and maps its score to a confidence.
+    Returns (is_scam, scam_type, confidence).
+    """
     # Determine winner
     max_score = 0
     winner = "unknown"
@@ -100,9 +169,29 @@ def detect_scam(message: str) -> dict:
         else:
             confidence = 0.99
             
+    return is_scam, winner if is_scam else "unknown", round(confidence, 2)
+
+def detect_scam(message: str, known_bad: int = 0) -> dict:
+    """
+    Detects if a message is a scam and classifies it.
+    known_bad is a mask of KNOWN_BAD_BITS for indicators of the message
+    found in a known-bad feed (app.feeds.FeedIndex.hits).
+    Returns: {
+        "is_scam": bool,
+        "scam_type": str,
+        "confidence": float,
+        "signals": list[str]
+    }
+    """
+    hit_ids = match_ids(message.lower())
+    if known_bad:
+        hit_ids.update(signal_ids(known_bad))
+    scores, signals = score_hits(hit_ids)
+    is_scam, scam_type, confidence = classify_scores(scores)
+
     return {
         "is_scam": is_scam,
-        "scam_type": winner if is_scam else "unknown",
-        "confidence": round(confidence, 2),
+        "scam_type": scam_type,
+        "confidence": confidence,
         "signals": signals
     }
@@ -1,86 +1,214 @@
 import re
+from urllib.parse import urlsplit
+from typing import NamedTuple
+from app.budget import AnalysisBudget
 
-def extract_upi_ids(text: str) -> list[str]:
-    # Matches typical UPI pattern: username@bank
-    pattern = r'[a-zA-Z0-9.\-_]{2,256}@[a-zA-Z]{2,64}'
-    return list(set(re.findall(pattern, text)))
+class Entity(NamedTuple):
+    kind: str  # "upi_id" | "url" | "phone_number" | "bank_account"
+    value: str
+    start: int
+    end: int
 
-def extract_urls(text: str) -> list[str]:
-    # Matches http/https URLs
-    # Simplified pattern to catch most common links
-    pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[-\w./?%&=]*)?'
-    return list(set(re.findall(pattern, text)))
+# Entity kind -> ExtractedIntelligence field
+KIND_FIELDS = {
+    "upi_id": "upi_ids",
+    "bank_account": "bank_accounts",
+    "phone_number": "phone_numbers",
+    "url": "urls",
+}
 
-def extract_phone_numbers(text: str) -> list[str]:
-    # Matches: +91 9999988888, 9999988888, 999-999-9999
-    # BUT must avoid matching long bank account numbers (12+ digits)
-    
-    # Strategy: 
-    # 1. Identify all digit sequences.
-    # 2. If > 11 digits and no separators (+, -), ignore (likely bank).
-    # 3. If valid phone pattern, keep.
-    
-    # Regex explanation:
-    # (?<!\d) : ensure we are at start of number
-    # (?:(?:\+|0{0,2})91[\-\s]?)? : optional +91 or 091 prefix
-    # [6-9]\d{9} : 10 digit mobile starting with 6-9
-    # (?!\d) : ensure we end at 10 digits
-    indian_mobile_pattern = r'(?<!\d)(?:(?:\+|0{0,2})91[\-\s]?)?[6-9]\d{9}(?!\d)'
-    
-    # Generic Pattern (e.g. +1-555...)
-    # Min 10, Max 15 digits including separators.
-    # We must be careful not to match a substring of a 12 digit number.
-    
-    matches = []
-    
-    # 1. High confidence Indian mobile
-    matches.extend(re.findall(indian_mobile_pattern, text))
-    
-    # 2. Generic matches, but filter out pure long digits
-    # Pattern: Optional +code, then space/dash, then digits
-    generic = r'(?<!\d)\+?\d{1,4}[-.\s]?\(?\d{2,3}\)?[-.\s]?\d{3}[-.\s]?\d{4}(?!\d)'
-    candidates = re.findall(generic, text)
-    
-    for c in candidates:
-        digits = re.sub(r'\D', '', c)
-        if 10 <= len(digits) <= 11: # Strictly 10-11 for generic phones to avoid bank collision
-            matches.append(c)
-            
-    return list(set(matches))
+# Every pattern below can only start at one of these anchors:
+# - URLs at "http://" / "https://"
+# - UPI IDs are found from their "@"
+# - phones and bank accounts at a "+" or the first digit of a digit run,
+#   followed by at least 8 more phone characters (the shortest match, a
+#   9-digit account, needs that many; phones need more) and by a run of 4
+#   digits within the next 20 characters (every match ends in one, and none
+#   is longer). Floods of short digit groups ("9 9 9 ...") thus yield no anchors.
+ANCHOR_PATTERN = re.compile(r'https?://|@|(?<!\d)[+\d](?=[-+.\s()\d]{8})(?=[-+.\s()\d]{0,16}\d{4})')
 
-def extract_bank_accounts(text: str) -> list[str]:
-    # Strategy:
-    # 1. Find purely numeric sequences of 9-18 digits.
-    # 2. If matches a phone number found by extract_phone_numbers, DISCARD.
-    # 3. If 12-18 digits -> Accept (Bank)
-    # 4. If 9-11 digits -> Accept ONLY if context found (account, bank, etc)
-    
-    # Get phones first to filter them out
-    phones = extract_phone_numbers(text)
-    phone_digits = set(re.sub(r'\D', '', p) for p in phones)
-    
-    # Regex for potential bank numbers (pure digits only to avoid collision with formatted phones)
-    # Bank accounts usually don't have dashes/spaces in scams, usually raw digits
-    pattern = r'\b\d{9,18}\b'
-    matches = list(re.finditer(pattern, text))
-    
-    results = []
-    keywords = ["account", "a/c", "acc", "bank", "acct", "number", "no.", "ifsc"]
-    
-    for match in matches:
-        candidate = match.group()
-        
-        # Overlap check
+# How many anchors to process between budget checks
+BUDGET_CHECK_EVERY = 64
+
+# Matches http/https URLs
+# Simplified pattern to catch most common links
+URL_PATTERN = re.compile(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[-\w./?%&=]*)?')
+
+# Typical UPI pattern: username@bank
+# username is [a-zA-Z0-9.\-_]{2,256}, found by walking back from the "@"
+UPI_LOCAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.-_")
+UPI_LOCAL_MAX = 256
+UPI_DOMAIN_PATTERN = re.compile(r'[a-zA-Z]{2,64}')
+
+# Phones: +91 9999988888, 9999988888, 999-999-9999
+# (?<!\d) : ensure we are at start of number
+# (?:(?:\+|0{0,2})91[\-\s]?)? : optional +91 or 091 prefix
+# [6-9]\d{9} : 10 digit mobile starting with 6-9
+# (?!\d) : ensure we end at 10 digits
+INDIAN_MOBILE_PATTERN = re.compile(r'(?<!\d)(?:(?:\+|0{0,2})91[\-\s]?)?[6-9]\d{9}(?!\d)')
+
+# Generic Pattern (e.g. +1-555...): optional +code, then space/dash, then digits.
+# Only kept with 10-11 digits, to avoid bank collision.
+GENERIC_PHONE_PATTERN = re.compile(r'(?<!\d)\+?\d{1,4}[-.\s]?\(?\d{2,3}\)?[-.\s]?\d{3}[-.\s]?\d{4}(?!\d)')
+
+# Bank accounts: pure digit runs of 9-18 (formatted numbers are phones).
+# 12-18 digits are accepted as is, 9-11 digits only with account context before them.
+BANK_ACCOUNT_PATTERN = re.compile(r'\b\d{9,18}\b')
+BANK_CONTEXT_KEYWORDS = ["account", "a/c", "acc", "bank", "acct", "number", "no.", "ifsc"]
+BANK_CONTEXT_CHARS = 50
+
+NON_DIGITS = re.compile(r'\D')
+
+def extract_entities(text: str, budget: AnalysisBudget | None = None) -> list[Entity]:
+    """
+    Single-pass extraction of UPI IDs, URLs, phone numbers and bank accounts,
+    with their [start, end) offsets in text.
+    The text is scanned once for anchors; each pattern is only tried, anchored,
+    where it can start. Every kind keeps the non-overlapping findall semantics
+    of its own pattern, so entities of different kinds may overlap
+    (e.g. a phone number inside a UPI ID).
+    Work per anchor is bounded, so the scan is linear in the text length.
+    With a budget, the scan stops early once it expires and returns what was
+    found so far (budget.exceeded is then set).
+    """
+    entities = []
+    bank_candidates = []
+    phone_digits = set()
+    url_end = upi_end = indian_end = generic_end = 0
+
+    for count, anchor in enumerate(ANCHOR_PATTERN.finditer(text), 1):
+        if budget is not None and count % BUDGET_CHECK_EVERY == 0 and budget.expired():
+            break
+
+        pos = anchor.start()
+        ch = text[pos]
+
+        if ch == "h":
+            if pos >= url_end:
+                m = URL_PATTERN.match(text, pos)
+                if m:
+                    url_end = m.end()
+                    entities.append(Entity("url", m.group(), pos, url_end))
+
+        elif ch == "@":
+            # Walk back over the username, never into the previous UPI match
+            start = pos
+            lowest = max(upi_end, pos - UPI_LOCAL_MAX)
+            while start > lowest and text[start - 1] in UPI_LOCAL_CHARS:
+                start -= 1
+            if pos - start >= 2:
+                m = UPI_DOMAIN_PATTERN.match(text, pos + 1)
+                if m:
+                    upi_end = m.end()
+                    entities.append(Entity("upi_id", text[start:upi_end], start, upi_end))
+
+        else:
+            # 1. High confidence Indian mobile
+            indian = None
+            if pos >= indian_end:
+                indian = INDIAN_MOBILE_PATTERN.match(text, pos)
+                if indian:
+                    indian_end = indian.end()
+                    entities.append(Entity("phone_number", indian.group(), pos, indian_end))
+                    phone_digits.add(NON_DIGITS.sub("", indian.group()))
+
+            # 2. Generic matches, but filter out pure long digits
+            if pos >= generic_end:
+                m = GENERIC_PHONE_PATTERN.match(text, pos)
+                if m:
+                    generic_end = m.end()
+                    digits = NON_DIGITS.sub("", m.group())
+                    if 10 <= len(digits) <= 11:
+                        phone_digits.add(digits)
+                        # Both patterns often match the same span: report it once
+                        if not (indian and indian.span() == m.span()):
+                            entities.append(Entity("phone_number", m.group(), pos, generic_end))
+
+            # 3. Potential bank numbers, resolved once all phones are known
+            if ch != "+":
+                m = BANK_ACCOUNT_PATTERN.match(text, pos)
+                if m:
+                    bank_candidates.append(m)
+
+    for m in bank_candidates:
+        candidate = m.group()
+
+        # Overlap check: the same digits were found as a phone number
         if candidate in phone_digits:
             continue
-            
+
         if len(candidate) >= 12:
-            results.append(candidate)
+            entities.append(Entity("bank_account", candidate, m.start(), m.end()))
         else:
-             # Context check for 9-11 digits
-            start, end = match.span()
-            pre_text = text[max(0, start - 50):start].lower()
-            if any(k in pre_text for k in keywords):
-                results.append(candidate)
-                
-    return list(set(results))
+            # Context check for 9-11 digits
+            start = m.start()
+            pre_text = text[max(0, start - BANK_CONTEXT_CHARS):start].lower()
+            if any(k in pre_text for k in BANK_CONTEXT_KEYWORDS):
+                entities.append(Entity("bank_account", candidate, start, m.end()))
+
+    entities.sort(key=lambda e: e.start)
+    return entities
+
+def extract_all(text: str, budget: AnalysisBudget | None = None) -> dict[str, list[str]]:
+    """
+    Deduplicated values per ExtractedIntelligence field, in order of first occurrence.
+    """
+    found = {field: {} for field in KIND_FIELDS.values()}
+    for entity in extract_entities(text, budget):
+        found[KIND_FIELDS[entity.kind]][entity.value] = None
+    return {field: list(values) for field, values in found.items()}
+
+def extract_upi_ids(text: str) -> list[str]:
+    return extract_all(text)["upi_ids"]
+
+def extract_urls(text: str) -> list[str]:
+    return extract_all(text)["urls"]
+
+def extract_phone_numbers(text: str) -> list[str]:
+    # Excludes long bank account numbers (12+ digits without separators)
+    return extract_all(text)["phone_numbers"]
+
+def extract_bank_accounts(text: str) -> list[str]:
+    # Excludes numbers that were also found as phone numbers
+    return extract_all(text)["bank_accounts"]
+
+# Indicator kinds and the ExtractedIntelligence field each is taken from.
+# URLs are indexed by domain, so every link on a scam host shares one entry.
+INDICATOR_FIELDS = {
+    "upi_id": "upi_ids",
+    "bank_account": "bank_accounts",
+    "phone_number": "phone_numbers",
+    "domain": "urls",
+}
+
+def normalize_indicator(kind: str, value: str) -> str | None:
+    """
+    Canonical form of an indicator, so spellings of the same one share an
+    entry: lowercase UPI IDs and domains, digits-only numbers with Indian
+    mobile prefixes (+91, 0) dropped. "domain" also accepts a whole URL.
+    Returns None for values without a usable form.
+    """
+    if kind == "domain":
+        host = urlsplit(value if "//" in value else f"//{value}").hostname
+        return host.removeprefix("www.") if host else None
+    if kind == "upi_id":
+        return value.strip().lower() or None
+    digits = NON_DIGITS.sub("", value)
+    if kind == "phone_number":
+        if len(digits) == 12 and digits.startswith("91"):
+            digits = digits[2:]
+        elif len(digits) == 11 and digits.startswith("0"):
+            digits = digits[1:]
+    return digits or None
+
+def indicators_of(found: dict[str, list[str]]) -> list[tuple[str, str]]:
+    """
+    Distinct (kind, normalized value) pairs of one message's extracted intelligence.
+    """
+    indicators = {}
+    for kind, field in INDICATOR_FIELDS.items():
+        for value in found.get(field) or ():
+            normalized = normalize_indicator(kind, value)
+            if normalized:
+                indicators[(kind, normalized)] = None
+    return list(indicators)
@@ -0,0 +1,233 @@
+"""
+Known-bad indicator feeds: UPI IDs, bank accounts, phone numbers and domains
+already reported as fraudulent, compiled offline into one lookup file that
+every worker memory-maps read-only.
+
+Build: python -m app.feeds build -o feeds.bin --domains domains.txt --upi-ids upi.txt ...
+Check: python -m app.feeds lookup feeds.bin domain http://login.evil.example/x
+
+Input files hold one indicator per line, optionally followed by ",<scam_type>"
+(default: FEED_DEFAULT_TYPES); blank lines and lines starting with # are skipped.
+"""
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+from typing import Iterable, Iterator
+from app.config import settings
+from app.detector import SCAM_TYPES, KNOWN_BAD_BITS, KNOWN_BAD_KINDS
+from app.extractor import normalize_indicator, indicators_of
+from app.metrics import FEED_HITS
+
+# Scam type of feed entries that don't name one
+FEED_DEFAULT_TYPES = {
+    "upi_id": "upi_refund",
+    "bank_account": "upi_refund",
+    "phone_number": "impersonation",
+    "domain": "phishing",
+}
+
+MAGIC = b"HPFEED01"
+HEADER = struct.Struct("<8sQQI4x")  # magic, entry count, Bloom filter bits, hashes per key
+OFFSET = "I"
+
+def feed_key(kind: str, normalized: str) -> bytes:
+    return f"{kind}:{normalized}".encode()
+
+def bloom_positions(key: bytes, bits: int, hashes: int) -> Iterator[int]:
+    # Double hashing (Kirsch-Mitzenmacher) over one 128-bit digest
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    for i in range(hashes):
+        yield (h1 + i * h2) % bits
+
+class FeedIndex:
+    """
+    Read-only view of a feed file built by build_feed(). The file is mapped,
+    not loaded: workers share its pages through the OS page cache, and opening
+    it costs no parsing or copying whatever its size.
+
+    Layout after the header: a Bloom filter over all keys (bits rounded up to
+    whole 8-byte words), count + 1 uint32 offsets, then the records, sorted.
+    A record is the key "<kind>:<normalized value>" followed by one byte, the
+    entry's index in SCAM_TYPES. Lookups that miss the Bloom filter (nearly
+    all of them) cost a few hashes; the rest binary-search the records.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.bloom_bits, self.hashes = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a feed file")
+        view = memoryview(self.map)
+        start = HEADER.size
+        self.bloom = view[start:start + self.bloom_bits // 8]
+        start += self.bloom_bits // 8
+        self.offsets = view[start:start + (self.count + 1) * 4].cast(OFFSET)
+        self.records_start = start + (self.count + 1) * 4
+        self.path = path
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self.bloom.release()
+        self.offsets.release()
+        self.map.close()
+
+    def find(self, key: bytes) -> str | None:
+        """
+        Scam type of an exact feed key, or None.
+        """
+        bloom = self.bloom
+        for bit in bloom_positions(key, self.bloom_bits, self.hashes):
+            if not bloom[bit >> 3] >> (bit & 7) & 1:
+                return None
+
+        data = self.map
+        offsets = self.offsets
+        base = self.records_start
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            end = base + offsets[mid + 1] - 1
+            record = data[base + offsets[mid]:end]
+            if record < key:
+                lo = mid + 1
+            elif record > key:
+                hi = mid
+            else:
+                return SCAM_TYPES[data[end]]
+        return None
+
+    def lookup(self, kind: str, normalized: str) -> str | None:
+        """
+        Scam type of a normalized indicator (see app.extractor.normalize_indicator)
+        if the feed lists it. Domains also match through any parent domain
+        listed in the feed: an entry for evil.example covers login.evil.example.
+        """
+        if kind != "domain" or normalized.replace(".", "").isdigit():
+            return self.find(feed_key(kind, normalized))
+        labels = normalized.split(".")
+        # Down to the registered name; a bare TLD is never a feed entry
+        for i in range(max(1, len(labels) - 1)):
+            scam_type = self.find(feed_key(kind, ".".join(labels[i:])))
+            if scam_type is not None:
+                return scam_type
+        return None
+
+    def hits(self, found: dict[str, list[str]]) -> int:
+        """
+        KNOWN_BAD_BITS (a signal mask, see app.detector) of one message's
+        extracted intelligence found in the feed.
+        """
+        mask = 0
+        for kind, value in indicators_of(found):
+            scam_type = self.lookup(kind, value)
+            if scam_type is not None:
+                FEED_HITS.inc(kind)
+                mask |= KNOWN_BAD_BITS[(scam_type, kind)]
+        return mask
+
+def build_feed(entries: Iterable[tuple[str, str, str]], path: str, fp_rate: float = 0.01) -> int:
+    """
+    Writes a feed file from (kind, value, scam_type) entries; values are
+    normalized like extracted indicators, the first entry of duplicates wins.
+    The file is replaced atomically, so workers that have the old one mapped
+    keep reading it until they reopen. Returns the number of entries.
+    """
+    records = {}
+    for kind, value, scam_type in entries:
+        normalized = normalize_indicator(kind, value)
+        if normalized:
+            records.setdefault(feed_key(kind, normalized), SCAM_TYPES.index(scam_type))
+    keys = sorted(records)
+
+    # Optimal Bloom filter size for the target false positive rate
+    n = max(1, len(keys))
+    bits = max(64, math.ceil(-n * math.log(fp_rate) / math.log(2) ** 2 / 64) * 64)
+    hashes = max(1, round(bits / n * math.log(2)))
+    bloom = bytearray(bits // 8)
+    for key in keys:
+        for bit in bloom_positions(key, bits, hashes):
+            bloom[bit >> 3] |= 1 << (bit & 7)
+
+    offsets = [0]
+    for key in keys:
+        offsets.append(offsets[-1] + len(key) + 1)
+    if offsets[-1] >= 2 ** 32:
+        raise ValueError("Feed too large (records over 4 GiB)")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), bits, hashes))
+        f.write(bloom)
+        f.write(struct.pack(f"<{len(offsets)}{OFFSET}", *offsets))
+        for key in keys:
+            f.write(key)
+            f.write(bytes((records[key],)))
+    os.replace(tmp_path, path)
+    return len(keys)
+
+def read_entries(path: str, kind: str) -> Iterator[tuple[str, str, str]]:
+    """
+    (kind, value, scam_type) entries of one input file.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            value, _, scam_type = line.rpartition(",")
+            if scam_type.strip() not in SCAM_TYPES:
+                value, scam_type = line, FEED_DEFAULT_TYPES[kind]
+            yield kind, value.strip(), scam_type.strip()
+
+def open_feed(path: str) -> FeedIndex | None:
+    if not path:
+        return None
+    try:
+        feed = FeedIndex(path)
+    except (OSError, ValueError) as e:
+        print(f"Known-bad feed disabled: {e}")
+        return None
+    print(f"Loaded known-bad feed {path} ({len(feed)} entries)")
+    return feed
+
+known_bad = open_feed(settings.FEED_PATH)
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m app.feeds", description="Build or query a known-bad indicator feed file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile indicator lists into a feed file")
+    build.add_argument("-o", "--output", required=True)
+    build.add_argument("--fp-rate", type=float, default=0.01, help="Bloom filter false positive rate")
+    for kind in KNOWN_BAD_KINDS:
+        build.add_argument(f"--{kind.replace('_', '-')}s", dest=kind, action="append", default=[], metavar="FILE")
+    lookup = commands.add_parser("lookup", help="look up one indicator")
+    lookup.add_argument("path")
+    lookup.add_argument("kind", choices=KNOWN_BAD_KINDS)
+    lookup.add_argument("value")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        entries = (entry for kind in KNOWN_BAD_KINDS for path in getattr(args, kind) for entry in read_entries(path, kind))
+        count = build_feed(entries, args.output, args.fp_rate)
+        print(f"Wrote {count} entries to {args.output} ({os.path.getsize(args.output)} bytes)")
+        return
+
+    feed = FeedIndex(args.path)
+    normalized = normalize_indicator(args.kind, args.value)
+    scam_type = feed.lookup(args.kind, normalized) if normalized else None
+    print(scam_type or "not listed")
+    feed.close()
+    sys.exit(0 if scam_type else 1)
+
+if __name__ == "__main__":
+    main()
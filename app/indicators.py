@@ -0,0 +1,231 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from app.config import settings
+from app.extractor import normalize_indicator, indicators_of
+from app.memory import session_manager
+from app.metrics import INDICATOR_SIGHTINGS, REDIS_SECONDS
+
+class IndicatorEntry:
+    __slots__ = ("count", "session_count", "first_seen", "last_seen", "sessions")
+
+    def __init__(self, first_seen: float):
+        self.count = 0
+        self.session_count = 0
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        # {session_id: last seen}, least recently seen first
+        self.sessions = OrderedDict()
+
+class IndicatorIndex:
+    """
+    In-process inverted index: indicator -> sighting count, distinct session
+    count, first/last seen (unix time) and the sessions it appeared in.
+    Each entry keeps its `max_sessions` most recently seen sessions (the
+    session count keeps growing past that, so a session that drops out and
+    comes back is counted again); at most `max_entries` indicators are kept,
+    the least recently seen ones are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000, max_sessions: int = 1000):
+        self.max_entries = max_entries
+        self.max_sessions = max_sessions
+        # {(kind, value): IndicatorEntry}, least recently seen first
+        self.entries = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def apply(self, sightings: dict[tuple[str, str, str], list]):
+        """
+        Adds aggregated sightings: {(kind, value, session_id): [count, first_seen, last_seen]}.
+        """
+        entries = self.entries
+        for (kind, value, session_id), (count, first_seen, last_seen) in sightings.items():
+            key = (kind, value)
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = IndicatorEntry(first_seen)
+                if len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+                    self.evicted += 1
+            else:
+                entries.move_to_end(key)
+            entry.count += count
+            entry.first_seen = min(entry.first_seen, first_seen)
+            entry.last_seen = max(entry.last_seen, last_seen)
+            sessions = entry.sessions
+            if session_id in sessions:
+                sessions.move_to_end(session_id)
+            else:
+                entry.session_count += 1
+                if len(sessions) >= self.max_sessions:
+                    sessions.popitem(last=False)
+            sessions[session_id] = max(sessions.get(session_id, 0), last_seen)
+
+    async def lookup(self, kind: str, value: str, limit: int = 100) -> dict | None:
+        entry = self.entries.get((kind, value))
+        if entry is None:
+            return None
+        recent = []
+        for session_id in reversed(entry.sessions):
+            if len(recent) >= limit:
+                break
+            recent.append({"session_id": session_id, "last_seen": entry.sessions[session_id]})
+        return {
+            "count": entry.count,
+            "session_count": entry.session_count,
+            "first_seen": entry.first_seen,
+            "last_seen": entry.last_seen,
+            "sessions": recent,
+        }
+
+# Applies one aggregated sighting.
+# KEYS[1] = entry hash (count, session_count, first_seen, last_seen),
+# KEYS[2] = sorted set of session ids scored by last seen
+# ARGV = session_id, count, first_seen, last_seen, max_sessions, ttl
+INDEX_SIGHTING_SCRIPT = """
+local added = redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -tonumber(ARGV[5]) - 1)
+redis.call('HINCRBY', KEYS[1], 'count', ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'session_count', added)
+local first = redis.call('HGET', KEYS[1], 'first_seen')
+if not first or tonumber(ARGV[3]) < tonumber(first) then redis.call('HSET', KEYS[1], 'first_seen', ARGV[3]) end
+local last = redis.call('HGET', KEYS[1], 'last_seen')
+if not last or tonumber(ARGV[4]) > tonumber(last) then redis.call('HSET', KEYS[1], 'last_seen', ARGV[4]) end
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+"""
+
+class RedisIndicatorIndex:
+    """
+    IndicatorIndex shared by all workers: a hash and a sorted set of session
+    ids per indicator (ind:<kind>:<value>[:sessions]), trimmed to the
+    `max_sessions` most recently seen sessions. Entries expire `ttl` seconds
+    after their last sighting.
+    """
+
+    def __init__(self, redis_client, max_sessions: int = 1000, ttl: int = 30 * 86400):
+        self.redis = redis_client
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.script = redis_client.register_script(INDEX_SIGHTING_SCRIPT)
+
+    async def apply(self, sightings: dict[tuple[str, str, str], list]):
+        started = time.perf_counter()
+        pipe = self.redis.pipeline(transaction=False)
+        for (kind, value, session_id), (count, first_seen, last_seen) in sightings.items():
+            key = f"ind:{kind}:{value}"
+            await self.script(
+                keys=[key, f"{key}:sessions"],
+                args=[session_id, count, first_seen, last_seen, self.max_sessions, self.ttl],
+                client=pipe
+            )
+        await pipe.execute()
+        REDIS_SECONDS.observe(time.perf_counter() - started, "index_write")
+
+    async def lookup(self, kind: str, value: str, limit: int = 100) -> dict | None:
+        key = f"ind:{kind}:{value}"
+        started = time.perf_counter()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(key)
+        pipe.zrevrange(f"{key}:sessions", 0, limit - 1, withscores=True)
+        entry, sessions = await pipe.execute()
+        REDIS_SECONDS.observe(time.perf_counter() - started, "index_query")
+        if not entry:
+            return None
+        return {
+            "count": int(entry["count"]),
+            "session_count": int(entry["session_count"]),
+            "first_seen": float(entry["first_seen"]),
+            "last_seen": float(entry["last_seen"]),
+            "sessions": [{"session_id": session_id, "last_seen": seen} for session_id, seen in sessions],
+        }
+
+class IndicatorRecorder:
+    """
+    Keeps index writes off the request path: record() only appends a
+    message's extracted intelligence to an in-process buffer, and flush()
+    (run every `flush_interval` seconds by run_flusher) normalizes it,
+    aggregates sightings per indicator and session and applies them to the
+    index in one batch. Lookups therefore trail the latest requests by up to
+    one flush interval; at most `max_pending` messages wait, older ones are
+    dropped (and counted) if flushing falls behind.
+    """
+
+    def __init__(self, index, flush_interval: float = 0.5, max_pending: int = 100_000):
+        self.index = index
+        self.flush_interval = flush_interval
+        self.pending = deque(maxlen=max_pending)
+
+    def record(self, session_id: str, found: dict[str, list[str]], now: float | None = None):
+        """
+        Queues one message's extracted intelligence for the index.
+        """
+        pending = self.pending
+        if len(pending) == pending.maxlen:
+            INDICATOR_SIGHTINGS.inc("dropped")
+        pending.append((session_id, found, time.time() if now is None else now))
+
+    async def flush(self, limit: int | None = None) -> int:
+        """
+        Applies the indicators of every buffered message (or of the oldest
+        `limit` ones). Returns how many sightings were applied.
+        """
+        pending = self.pending
+        if not pending:
+            return 0
+        sightings = {}
+        n = 0
+        for _ in range(len(pending) if limit is None else min(limit, len(pending))):
+            session_id, found, seen = pending.popleft()
+            for kind, value in indicators_of(found):
+                n += 1
+                aggregate = sightings.get((kind, value, session_id))
+                if aggregate is None:
+                    sightings[(kind, value, session_id)] = [1, seen, seen]
+                else:
+                    aggregate[0] += 1
+                    aggregate[2] = seen
+        if sightings:
+            await self.index.apply(sightings)
+        INDICATOR_SIGHTINGS.inc("indexed", amount=n)
+        return n
+
+    async def lookup(self, kind: str, value: str, limit: int = 100) -> dict | None:
+        """
+        Index entry for an indicator, after flushing this worker's buffer.
+        """
+        normalized = normalize_indicator(kind, value)
+        if normalized is None:
+            return None
+        await self.flush()
+        return await self.index.lookup(kind, normalized, limit)
+
+    async def run_flusher(self):
+        """
+        Background task: flushes the buffer every flush_interval seconds,
+        yielding to the event loop between chunks.
+        """
+        chunk = 1000
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                while self.pending:
+                    await self.flush(chunk)
+                    await asyncio.sleep(0)
+            except Exception as e:
+                print(f"Indicator index flush failed: {e}")
+
+def create_indicator_recorder() -> IndicatorRecorder:
+    """
+    The index lives in Redis when the session store does, otherwise in process.
+    """
+    if session_manager.redis_client:
+        index = RedisIndicatorIndex(session_manager.redis_client, settings.INDICATOR_MAX_SESSIONS, settings.INDICATOR_TTL)
+    else:
+        index = IndicatorIndex(settings.INDICATOR_MAX_ENTRIES, settings.INDICATOR_MAX_SESSIONS)
+    return IndicatorRecorder(index, settings.INDICATOR_FLUSH_INTERVAL, settings.INDICATOR_MAX_PENDING)
+
+indicators = create_indicator_recorder()
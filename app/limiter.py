@@ -1,41 +1,444 @@
+import asyncio
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
 import time
-from collections import defaultdict
+from collections import OrderedDict
 from fastapi import Request, HTTPException, status
 from app.config import settings
+from app.metrics import STAGE, RATE_LIMIT_REJECTIONS
+
+# Optional Redis support
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
 
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 60):
+    """
+    GCRA (generic cell rate algorithm) limiter: up to `requests_per_minute`
+    requests in a burst, refilled at requests_per_minute / 60 per second.
+    Each client is a single float (its theoretical arrival time, TAT), so a
+    check is O(1) regardless of the limit.
+    This instance is per process; see create_limiter() for the shared backends.
+    """
+
+    def __init__(self, requests_per_minute: int = 60, max_clients: int = 100_000, sweep_interval: float = 10.0):
+        self.limit = requests_per_minute
+        self.window = 60  # seconds
+        self.interval = self.window / self.limit  # emission interval per request
+        self.max_clients = max_clients
+        self.sweep_interval = sweep_interval
+        # {ip: TAT}, ordered by last accepted request (oldest first)
+        self.clients = OrderedDict()
+        self.evicted = 0
+
+    def take(self, client_key: str, tokens: int = 1, now: float | None = None,
+             exact: bool = False) -> tuple[int, float]:
+        """
+        Takes up to `tokens` requests' worth of allowance for client_key, or
+        all of them or none with exact=True.
+        Returns (granted, retry_after): granted >= 1 on success, otherwise 0
+        and the seconds until the request would be allowed.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        clients = self.clients
+        tat = clients.get(client_key)
+        if tat is None or tat < now:
+            tat = now
+
+        granted, tat, retry_after = gcra(tat, now, self.interval, self.window, tokens, exact)
+        if not granted:
+            return 0, retry_after
+
+        if client_key in clients:
+            clients.move_to_end(client_key)
+        elif len(clients) >= self.max_clients:
+            # Hard cap: forget the least recently seen client
+            clients.popitem(last=False)
+            self.evicted += 1
+        clients[client_key] = tat
+        return granted, 0.0
+
+    def hit(self, client_key: str, now: float | None = None) -> float:
+        """
+        Records a request for client_key.
+        Returns 0.0 if allowed, otherwise the seconds until a request would be allowed.
+        """
+        return self.take(client_key, 1, now)[1]
+
+    async def acquire(self, client_key: str, cost: int = 1) -> float:
+        if cost == 1:
+            return self.hit(client_key)
+        return self.take(client_key, cost, exact=True)[1]
+
+    def sweep(self, now: float | None = None, budget: int = 1000) -> int:
+        """
+        Drops clients whose bucket has fully refilled (TAT <= now); forgetting
+        them changes nothing. Walks from the oldest entry and stops at the first
+        active one, or after `budget` removals. Returns the number removed.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        clients = self.clients
+        removed = 0
+        while clients and removed < budget:
+            client_key, tat = next(iter(clients.items()))
+            if tat > now:
+                # Entries are ordered by last update and a TAT is at most one
+                # window past its update, so everything behind this one is recent too.
+                break
+            del clients[client_key]
+            removed += 1
+        return removed
+
+    async def run_sweeper(self):
+        """
+        Background task: sweeps idle clients every sweep_interval seconds,
+        yielding to the event loop between chunks.
+        """
+        chunk = 1000
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            while self.sweep(budget=chunk) == chunk:
+                await asyncio.sleep(0)
+
+def gcra(tat: float, now: float, interval: float, window: float, tokens: int,
+         exact: bool = False) -> tuple[int, float, float]:
+    """
+    Core GCRA step for a client whose TAT is already clamped to >= now.
+    Grants up to `tokens`, or all of them or none with exact=True.
+    Returns (granted, new_tat, retry_after).
+    """
+    # Small epsilon so accumulated float error never denies an exact fit
+    available = math.floor((now + window - tat) / interval + 1e-9)
+    needed = tokens if exact else 1
+    if available < needed:
+        return 0, tat, tat + needed * interval - window - now
+    granted = min(tokens, available)
+    return granted, tat + granted * interval, 0.0
+
+def client_fingerprint(client_key: str) -> int:
+    # Stable across processes (unlike hash()), never 0 (0 marks an empty slot)
+    return int.from_bytes(hashlib.blake2b(client_key.encode(), digest_size=8).digest(), "little") or 1
+
+class SharedMemoryRateLimiter:
+    """
+    GCRA state shared by every worker on the host through a memory-mapped file.
+    The file is a fixed hash table of (fingerprint, TAT) slots grouped in
+    buckets; a bucket is locked with a byte-range fcntl lock while it is updated.
+    TATs use CLOCK_MONOTONIC, which is the same for all processes on a host.
+    When a bucket is full, the slot with the oldest TAT is reused.
+    """
+
+    SLOT = struct.Struct("<Qd")  # key fingerprint, TAT
+    BUCKET_SLOTS = 8
+    BUCKET_SIZE = SLOT.size * BUCKET_SLOTS
+
+    def __init__(self, path: str, slots: int = 65536, requests_per_minute: int = 60):
+        self.limit = requests_per_minute
+        self.window = 60  # seconds
+        self.interval = self.window / self.limit
+        self.path = path
+        self.buckets = max(1, slots // self.BUCKET_SLOTS)
+
+        size = self.buckets * self.BUCKET_SIZE
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        # Every worker runs this; growing is idempotent and shrinking never happens
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+
+    async def take(self, client_key: str, tokens: int = 1, returned: int = 0,
+                   exact: bool = False) -> tuple[int, float]:
+        return self.take_sync(client_key, tokens, returned=returned, exact=exact)
+
+    def take_sync(self, client_key: str, tokens: int = 1, now: float | None = None,
+                  returned: int = 0, exact: bool = False) -> tuple[int, float]:
+        """
+        Takes up to `tokens` requests' worth of allowance (all or none with
+        exact=True), after crediting back `returned` unspent ones taken earlier.
+        Returns (granted, retry_after); with tokens=0 it only credits.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        fingerprint = client_fingerprint(client_key)
+        offset = (fingerprint % self.buckets) * self.BUCKET_SIZE
+        slot_struct = self.SLOT
+        shared = self.map
+
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, self.BUCKET_SIZE, offset)
+        try:
+            target = None
+            found = False
+            tat = now
+            oldest = None
+            for i in range(self.BUCKET_SLOTS):
+                pos = offset + i * slot_struct.size
+                slot_fp, slot_tat = slot_struct.unpack_from(shared, pos)
+                if slot_fp == fingerprint:
+                    target = pos
+                    found = True
+                    # A TAT more than a window ahead can only be left over from
+                    # an earlier boot (different monotonic epoch): ignore it
+                    if now < slot_tat <= now + self.window:
+                        tat = slot_tat
+                    break
+                if oldest is None or slot_tat < oldest[1]:
+                    oldest = (pos, slot_tat)
+            if target is None:
+                # Empty and idle slots have a TAT in the past; otherwise evict the stalest
+                target = oldest[0]
+
+            if not found:
+                # Nothing charged left to credit: the client's slot was reused
+                returned = 0
+            if returned:
+                tat = max(now, tat - returned * self.interval)
+            granted, retry_after = 0, 0.0
+            if tokens:
+                granted, tat, retry_after = gcra(tat, now, self.interval, self.window, tokens, exact)
+            if granted or returned:
+                slot_struct.pack_into(shared, target, fingerprint, tat)
+            return granted, retry_after
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, self.BUCKET_SIZE, offset)
+
+# GCRA in Redis, timed by the server clock so hosts don't need synced clocks.
+# Times are integer microseconds so they survive Lua's number/string conversions.
+# Unspent tokens of an earlier take are credited back first (tokens may be 0).
+# With exact = 1 the take is all the tokens or none.
+# KEYS[1] = rate limit key
+# ARGV = interval_us, window_us, tokens, returned tokens, exact
+RATE_LIMIT_SCRIPT = """
+-- Needed before writing after TIME on Redis < 5; a no-op or absent later
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local returned = tonumber(ARGV[4])
+if returned > 0 then tat = math.max(now, tat - returned * interval) end
+
+local granted, retry_after = 0, 0
+local tokens = tonumber(ARGV[3])
+if tokens > 0 then
+    local available = math.floor((now + window - tat) / interval)
+    local needed = 1
+    if ARGV[5] == '1' then needed = tokens end
+    if available < needed then
+        retry_after = tat + needed * interval - window - now
+    else
+        granted = math.min(tokens, available)
+        tat = tat + granted * interval
+    end
+end
+
+if granted > 0 or returned > 0 then
+    if tat > now then
+        redis.call('SET', KEYS[1], string.format('%.0f', tat), 'PX', math.ceil((tat - now) / 1000))
+    else
+        redis.call('DEL', KEYS[1])
+    end
+end
+return {granted, retry_after}
+"""
+
+class RedisRateLimiter:
+    """
+    GCRA state shared by every worker and host through Redis, one atomic
+    script call per take(). Keys expire once the client's bucket has refilled.
+    """
+
+    def __init__(self, redis_client, requests_per_minute: int = 60):
         self.limit = requests_per_minute
         self.window = 60  # seconds
-        # Dictionary to store request timestamps: {ip: [timestamp1, timestamp2, ...]}
-        self.requests = defaultdict(list)
-
-    def check_rate_limit(self, request: Request):
-        if not settings.RATE_LIMIT_ENABLED:
-            return
-
-        client_ip = request.client.host
-        current_time = time.time()
-        
-        # Get history for this IP
-        history = self.requests[client_ip]
-        
-        # Filter out requests older than the window
-        valid_requests = [t for t in history if current_time - t < self.window]
-        self.requests[client_ip] = valid_requests
-        
-        # Check limit
-        if len(valid_requests) >= self.limit:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Please try again later."
-            )
-            
-        # Add current request
-        self.requests[client_ip].append(current_time)
+        self.interval_us = round(self.window / self.limit * 1_000_000)
+        self.window_us = self.window * 1_000_000
+        self.redis_client = redis_client
+        self.script = redis_client.register_script(RATE_LIMIT_SCRIPT)
+
+    async def take(self, client_key: str, tokens: int = 1, returned: int = 0,
+                   exact: bool = False) -> tuple[int, float]:
+        granted, retry_after_us = await self.script(
+            keys=[f"ratelimit:{client_key}"],
+            args=[self.interval_us, self.window_us, tokens, returned, int(exact)]
+        )
+        return int(granted), int(retry_after_us) / 1_000_000
+
+class LeasedRateLimiter:
+    """
+    Local fast path in front of a shared backend.
+    A worker takes up to `lease_size` requests' worth of allowance at once and
+    spends it locally for `lease_ttl` seconds, so most requests never leave the
+    process. Tokens a lease didn't spend are credited back to the shared bucket
+    when it lapses: with the client's next take, or by the sweeper, so sparse
+    traffic spread over workers gets the same allowance as traffic on one.
+    Denials are cached locally until their retry-after, so a client hammering
+    past its limit doesn't cost a backend call per request either.
+    A request costing several tokens (a batch) gives back the lease and takes
+    its whole cost from the backend at once.
+    """
+
+    def __init__(self, backend, lease_size: int = 5, lease_ttl: float = 1.0,
+                 max_clients: int = 100_000, sweep_interval: float = 10.0):
+        self.backend = backend
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+        self.max_clients = max_clients
+        self.sweep_interval = sweep_interval
+        # {ip: [tokens_left, expires_at]}, tokens_left == -1 means denied until expires_at
+        self.leases = OrderedDict()
+        # (ip, unspent tokens) of leases the sweeper dropped, to credit back
+        self.lapsed = []
+
+    async def acquire(self, client_key: str, cost: int = 1) -> float:
+        now = time.monotonic()
+        lease = self.leases.get(client_key)
+        returned = 0
+        if cost > 1:
+            if lease is not None:
+                if lease[0] < 0 and lease[1] > now:
+                    return lease[1] - now
+                del self.leases[client_key]
+                returned = max(lease[0], 0)
+            return (await self.backend.take(client_key, cost, returned, exact=True))[1]
+        if lease is not None:
+            if lease[1] > now:
+                if lease[0] > 0:
+                    lease[0] -= 1
+                    return 0.0
+                if lease[0] < 0:
+                    return lease[1] - now
+                # Spent lease: fall through and take a new one
+            elif lease[0] > 0:
+                # Lapsed with tokens left: credited back by the same call
+                returned = lease[0]
+
+        granted, retry_after = await self.backend.take(client_key, self.lease_size, returned)
+        if granted:
+            lease = [granted - 1, now + self.lease_ttl]
+        else:
+            lease = [-1, now + retry_after]
+
+        leases = self.leases
+        leases[client_key] = lease
+        leases.move_to_end(client_key)
+        if len(leases) > self.max_clients:
+            evicted_key, evicted = leases.popitem(last=False)
+            if evicted[0] > 0:
+                self.lapsed.append((evicted_key, evicted[0]))
+        return retry_after
+
+    def sweep(self, now: float | None = None, budget: int = 1000) -> int:
+        """
+        Drops lapsed leases from the oldest end. Returns the number removed.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        leases = self.leases
+        removed = 0
+        while leases and removed < budget:
+            client_key, lease = next(iter(leases.items()))
+            if lease[1] > now:
+                break
+            del leases[client_key]
+            if lease[0] > 0:
+                self.lapsed.append((client_key, lease[0]))
+            removed += 1
+        return removed
+
+    async def return_lapsed(self):
+        """
+        Credits the unspent tokens of swept leases back to the shared bucket.
+        """
+        lapsed, self.lapsed = self.lapsed, []
+        for client_key, tokens in lapsed:
+            await self.backend.take(client_key, 0, tokens)
+
+    async def run_sweeper(self):
+        chunk = 1000
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            while self.sweep(budget=chunk) == chunk:
+                await asyncio.sleep(0)
+            await self.return_lapsed()
+
+def default_shm_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+    return os.path.join(base, "honeypot-ratelimit")
+
+def create_limiter():
+    """
+    Builds the limiter selected by RATE_LIMIT_BACKEND:
+    - "redis": shared through Redis (needs REDIS_URL)
+    - "shm": shared between workers on this host through a memory-mapped file
+    - "memory": per process
+    - "auto" (default): "redis" if REDIS_URL is set, otherwise "shm"
+    Shared backends sit behind a LeasedRateLimiter.
+    """
+    rpm = settings.RATE_LIMIT_PER_MINUTE
+    backend = settings.RATE_LIMIT_BACKEND
+    if backend == "auto":
+        backend = "redis" if settings.REDIS_URL and redis else "shm"
+
+    if backend == "redis":
+        client = redis.from_url(settings.REDIS_URL, max_connections=settings.REDIS_MAX_CONNECTIONS)
+        shared = RedisRateLimiter(client, requests_per_minute=rpm)
+    elif backend == "shm":
+        shared = SharedMemoryRateLimiter(
+            settings.RATE_LIMIT_SHM_PATH or default_shm_path(),
+            slots=settings.RATE_LIMIT_SHM_SLOTS,
+            requests_per_minute=rpm
+        )
+    elif backend == "memory":
+        return RateLimiter(
+            requests_per_minute=rpm,
+            max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+            sweep_interval=settings.RATE_LIMIT_SWEEP_INTERVAL
+        )
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+    return LeasedRateLimiter(
+        shared,
+        lease_size=settings.RATE_LIMIT_LEASE_SIZE,
+        lease_ttl=settings.RATE_LIMIT_LEASE_TTL,
+        max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+        sweep_interval=settings.RATE_LIMIT_SWEEP_INTERVAL
+    )
 
 # Global instance
-limiter = RateLimiter(requests_per_minute=60)
+limiter = create_limiter()
 
 async def check_rate_limit(request: Request):
-    limiter.check_rate_limit(request)
+    await charge_rate_limit(request, 1)
+
+async def charge_rate_limit(request: Request, cost: int):
+    """
+    Charges `cost` requests' worth of allowance to the client, all or nothing.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    started = time.perf_counter()
+    retry_after = await limiter.acquire(request.client.host, cost)
+    STAGE["rate_limit"].observe_since(started)
+    if retry_after:
+        RATE_LIMIT_REJECTIONS.inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded. Please try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
@@ -1,10 +1,41 @@
-from fastapi import FastAPI, Depends, Request, status
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.exceptions import RequestValidationError, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from app.admission import AdmissionMiddleware, BUSY_BODY, admitted
 from app.auth import verify_api_key
-from app.models import HoneypotRequest, HoneypotResponse, ExtractedIntelligence, SessionState
+from app.limiter import limiter
+from app.campaigns import campaigns
+from app.extractor import INDICATOR_FIELDS, normalize_indicator
+from app.indicators import indicators
+from app.memory import session_manager
+from app.offload import analysis_pool
+from app.metrics import registry, CONTENT_TYPE as METRICS_CONTENT_TYPE, STAGE, MESSAGES
+from app.models import (
+    HoneypotRequest, HoneypotResponse, BatchHoneypotRequest, BatchHoneypotResponse, IndicatorResponse, CampaignsResponse
+)
 
-app = FastAPI(title="Honey-Pot API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    analysis_pool.start()
+    sweepers = [asyncio.create_task(limiter.run_sweeper()), asyncio.create_task(indicators.run_flusher())]
+    if session_manager.redis_client:
+        sweepers.append(asyncio.create_task(campaigns.index.run_flusher()))
+    else:
+        sweepers.append(asyncio.create_task(session_manager.local_storage.run_sweeper()))
+    yield
+    for sweeper in sweepers:
+        sweeper.cancel()
+    await indicators.flush()
+    await campaigns.flush()
+    analysis_pool.shutdown()
+    # Release pooled Redis connections on shutdown
+    await session_manager.close()
+
+app = FastAPI(title="Honey-Pot API", lifespan=lifespan)
+# Bounds in-flight /honeypot requests; over the limit they get a 503 before any other work
+app.add_middleware(AdmissionMiddleware)
 
 # Global Exception Handlers
 @app.exception_handler(RequestValidationError)
@@ -19,6 +50,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": "HTTPException", "message": exc.detail, "details": None},
+        headers=exc.headers,
     )
 
 @app.exception_handler(Exception)
@@ -32,140 +64,327 @@ async def generic_exception_handler(request: Request, exc: Exception):
 def health_check():
     return {"status": "ok"}
 
-from app.extractor import extract_upi_ids, extract_urls, extract_phone_numbers, extract_bank_accounts
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics, summed over every worker of this server.
+    """
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
 
+import functools
+import json
+import time
+import uuid
 from fastapi import Body
+from app.config import settings
+from app.cache import detection_cache
+from app.limiter import check_rate_limit, charge_rate_limit
+from app.memory import (
+    get_or_create_session, advance_session_turn, advance_session_turns, merge_session_intelligence,
+    merge_sessions_intelligence
+)
+from app.pipeline import (
+    extract_message, check_message_length, new_budget, cached_scan, cached_extraction, known_bad_scan,
+    detect_stage, extraction_stage, build_response, empty_response, dump_json
+)
+from app.streaming import DuplexStreamingResponse, stream_results, error_body
+from app.conversation import Conversation
 
-# No change to imports above...
-
-from app.limiter import check_rate_limit
-
-@app.post("/honeypot", response_model=HoneypotResponse, dependencies=[Depends(verify_api_key), Depends(check_rate_limit)])
-def honeypot_entry(request_data: dict = Body(default={})):
+async def analyze_message(request_data: dict, conversation: Conversation | None = None) -> dict:
+    """
+    The /honeypot flow for one request body, up to the response data
+    (HoneypotResponse's fields, see build_response).
+    With a conversation (a /honeypot/ws connection), its in-memory session is
+    used instead of the one named by session_id.
+    """
     # 1. Flexible Message Extraction
-    # Keys to check in order of priority
-    possible_keys = ["message", "text", "input", "query", "prompt"]
-    message = ""
-    
-    for key in possible_keys:
-        if key in request_data and isinstance(request_data[key], str):
-            message = request_data[key]
-            break
-            
+    message = extract_message(request_data)
+
     # Session ID extraction (optional)
     session_id_in = request_data.get("session_id")
-    
+
     # 2. Handle Empty/Missing Message -> Return Benign Response immediately
-    # We must generate session state even for benign to keep contract valid
-    from app.memory import get_or_create_session
-    
-    # If using existing session, we might want to increment turn?
-    # Requirement: "return ... next_message="" ... explanation 'No message provided'"
-    # If no message, we shouldn't really advance the scam state logic much, but we need valid objects.
-    
+    # If no message, we shouldn't advance the scam state logic, but we need valid objects.
     if not message.strip():
         # Get or create valid session ID
-        real_session_id, _ = get_or_create_session(session_id_in)
-        
-        return HoneypotResponse(
-            is_scam=False,
-            scam_type="unknown",
-            confidence=0.0,
-            persona_used="none",
-            next_message="",
-            extracted_intelligence=ExtractedIntelligence(),
-            session_state=SessionState(
-                session_id=real_session_id,
-                turn=0, # Or keep as is? Let's say 0 or 1.
-                stage="hook"
-            )
-        )
+        session = conversation.state if conversation is not None else await get_or_create_session(session_id_in)
+        return empty_response(session.session_id)
 
     # 3. Validate body size (only if message exists)
-    if len(message) > 5000:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Message too long (max 5000 chars)")
-        
-    # 4. Detect scam
-    from app.detector import detect_scam
-    detection_result = detect_scam(message)
-    
-    # 5. Session Management
-    from app.memory import get_or_create_session, save_session
-    session_id, session_data = get_or_create_session(session_id_in)
-    
-    # Update logic
-    current_turn = session_data.get("turn", 0) + 1
-    
-    # Update scam type if detected
-    current_scam_type = detection_result["scam_type"]
-    if current_scam_type == "unknown" and session_data.get("scam_type") != "unknown":
-        current_scam_type = session_data.get("scam_type", "unknown")
-
-    # Determine Stage
-    stage = "hook"
-    if current_turn == 1:
-        stage = "hook"
-    elif current_turn == 2:
-        stage = "trust_building"
-    elif 3 <= current_turn <= 5:
-        stage = "extraction"
-    else:
-        stage = "exit"
-        
-    # Generate Response & Extraction
-    if current_scam_type != "unknown":
-        from app.agent import generate_response
-        persona, next_msg = generate_response(
-            current_scam_type, 
-            stage, 
-            session_id, 
-            current_turn
-        )
-        extracted_data = ExtractedIntelligence(
-            upi_ids=extract_upi_ids(message),
-            bank_accounts=extract_bank_accounts(message),
-            phone_numbers=extract_phone_numbers(message),
-            urls=extract_urls(message)
-        )
+    check_message_length(message)
+
+    # 4. Detect scam (charged to the analysis budget, like extraction below)
+    # The message is scanned once for signals; copies of a message already seen reuse
+    # its cached scan and extraction results.
+    # Each stage's duration goes to the honeypot_stage_seconds histogram
+    started = time.perf_counter()
+    budget = new_budget()
+    analysis = await detection_cache.lookup(message)
+    # Indicators listed in the known-bad feed (if one is loaded) add their own signals.
+    # Scanning and extraction run in the analysis pool when one is configured (app.offload).
+    hits, extracted_data = await detect_stage(analysis, message, budget)
+    started = STAGE["detect"].observe_since(started)
+
+    # 5. Session Management: one atomic read-increment-write in the store, which also
+    # merges the message's signals into the conversation's; scam type and confidence
+    # come from the accumulated signals
+    # (a conversation advances in memory and writes to the store later)
+    if conversation is not None:
+        new_state = conversation.advance(hits)
     else:
-        persona = "none"
-        next_msg = ""
-        extracted_data = ExtractedIntelligence()
-        
-    # Generate Explanation
-    # If benign (is_scam=False), signals=[] summary="No scam indicators detected."
-    # If scam, signals=detection_result["signals"], summary="Detected {scam_type} with confidence {confidence}"
-    
-    from app.models import Explanation
-    if current_scam_type != "unknown":
-        expl_summary = f"Detected {current_scam_type} pattern with {detection_result['confidence']} confidence."
-        expl_signals = detection_result.get("signals", [])
+        new_state = await advance_session_turn(session_id_in, hits)
+    started = STAGE["session"].observe_since(started)
+    MESSAGES.inc(new_state.scam_type, new_state.stage)
+
+    # 6. Extraction (scams only) & Response
+    # If the budget runs out, the response is flagged partial instead of stalling the worker.
+    # Finds are added to the session's intelligence sets; with "cumulative": true the
+    # response also carries everything collected in the session so far.
+    if new_state.scam_type == "unknown":
+        extracted_data = None
+    elif extracted_data is None:
+        extracted_data = await extraction_stage(analysis, message, budget)
+    await detection_cache.store(analysis)
+    if extracted_data is not None:
+        # Buffered; written to the cross-session index in the background
+        indicators.record(new_state.session_id, extracted_data.model_dump())
+    found = extracted_data.model_dump() if extracted_data else {}
+    if conversation is not None:
+        cumulative = await conversation.merge_intelligence(found, cumulative=request_data.get("cumulative") is True)
     else:
-        expl_summary = "No scam indicators detected."
-        expl_signals = []
-        
-    explanation_obj = Explanation(signals=expl_signals, summary=expl_summary)
-
-    # Save State
-    new_state = {
-        "turn": current_turn,
-        "stage": stage,
-        "scam_type": current_scam_type,
-        "session_id": session_id
-    }
-    save_session(session_id, new_state)
-
-    return HoneypotResponse(
-        is_scam=(current_scam_type != "unknown"),
-        scam_type=current_scam_type,
-        confidence=detection_result["confidence"],
-        persona_used=persona,
-        next_message=next_msg,
-        extracted_intelligence=extracted_data,
-        session_state=SessionState(
-            session_id=session_id,
-            turn=current_turn,
-            stage=stage
-        ),
-        explanation=explanation_obj
+        cumulative = await merge_session_intelligence(
+            new_state.session_id, found, cumulative=request_data.get("cumulative") is True
+        )
+    # Near-duplicates of this text (same template, other names, amounts, links) share a campaign;
+    # benign sessions skip the index, and Redis writes are queued for the background flusher
+    campaign_id = await campaigns.assign(message, new_state.scam_type)
+    started = STAGE["extract"].observe_since(started)
+    response = build_response(
+        new_state, extracted_data, partial=budget.exceeded, cumulative=cumulative, campaign_id=campaign_id
     )
+    STAGE["respond"].observe_since(started)
+    return response
+
+@app.post("/honeypot", response_model=HoneypotResponse, dependencies=[Depends(verify_api_key), Depends(check_rate_limit)])
+async def honeypot_entry(request_data: dict = Body(default={})):
+    response = await analyze_message(request_data)
+
+    # 7. Serialize here instead of leaving it to FastAPI, so it can be timed too
+    # (and the response data isn't validated against response_model a second time)
+    started = time.perf_counter()
+    rendered = Response(dump_json(response), media_type="application/json")
+    STAGE["serialize"].observe_since(started)
+    return rendered
+
+async def analyze_frame(frame: str | bytes, conversation: Conversation | None = None) -> bytes:
+    """
+    The /honeypot response (as JSON) for one JSON request object received
+    in a stream line or WebSocket frame, or an error body in the shape the
+    exception handlers above return.
+    """
+    try:
+        request_data = json.loads(frame)
+    except ValueError:
+        request_data = None
+    if not isinstance(request_data, dict):
+        return error_body("ValidationError", "Invalid request parameters", "Each message must be a JSON object").encode()
+    try:
+        response = await analyze_message(request_data, conversation)
+    except HTTPException as exc:
+        return error_body("HTTPException", exc.detail).encode()
+    except Exception as exc:
+        return error_body("InternalServerError", "An unexpected error occurred", str(exc)).encode()
+    started = time.perf_counter()
+    rendered = dump_json(response)
+    STAGE["serialize"].observe_since(started)
+    return rendered
+
+async def charged_frame(connection: Request | WebSocket, frame: str | bytes,
+                        conversation: Conversation | None = None) -> bytes:
+    """
+    analyze_frame, charged like a /honeypot request: against the client's
+    rate limit, and for an admission slot. Over either, the reply is the
+    error body of the HTTP 429 or 503.
+    """
+    try:
+        await check_rate_limit(connection)
+    except HTTPException as exc:
+        return error_body("HTTPException", exc.detail).encode()
+    rendered = await admitted(lambda: analyze_frame(frame, conversation))
+    return BUSY_BODY if rendered is None else rendered
+
+async def stream_line(request: Request, line: bytes) -> bytes:
+    return await charged_frame(request, line) + b"\n"
+
+@app.post("/honeypot/stream", dependencies=[Depends(verify_api_key), Depends(check_rate_limit)])
+async def honeypot_stream(request: Request):
+    """
+    /honeypot over one long-lived request: the body is NDJSON (one /honeypot
+    request object per line) and the response streams one NDJSON line per
+    non-blank input line, in input order, as each completes.
+    Lines are processed one at a time, so a session's turns keep their order;
+    at most STREAM_MAX_PENDING lines are read ahead of the one being processed.
+    Opening the stream and every line count as requests for rate limiting, and
+    each line takes an admission slot.
+    """
+    return DuplexStreamingResponse(stream_results(
+        request.stream(), functools.partial(stream_line, request), settings.STREAM_MAX_PENDING,
+        settings.STREAM_MAX_LINE_BYTES
+    ))
+
+@app.post("/honeypot/batch", response_model=BatchHoneypotResponse, dependencies=[Depends(verify_api_key)])
+async def honeypot_batch(request: Request, batch: BatchHoneypotRequest):
+    """
+    Classifies a burst of messages in one round trip.
+    Each pipeline stage runs over the whole batch before the next one starts,
+    and all session turn advances go to the store as one bulk operation.
+    Results are returned in input order. Each message is charged as one request
+    for rate limiting, and the batch is rejected whole if the client's allowance
+    can't cover it.
+    """
+    if len(batch.messages) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch too large (max {settings.BATCH_MAX_SIZE} messages)"
+        )
+    if settings.RATE_LIMIT_ENABLED and len(batch.messages) > settings.RATE_LIMIT_PER_MINUTE:
+        # Could never fit in the client's allowance: say so instead of a 429 to retry
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch larger than the rate limit (max {settings.RATE_LIMIT_PER_MINUTE} messages per minute)"
+        )
+    for item in batch.messages:
+        check_message_length(item.message)
+    await charge_rate_limit(request, max(1, len(batch.messages)))
+
+    stages = {}
+    batch_start = stage_start = time.perf_counter()
+
+    def end_stage(name: str):
+        nonlocal stage_start
+        now = time.perf_counter()
+        stages[name] = round((now - stage_start) * 1000, 3)
+        stage_start = now
+
+    # 1. Detect scam over every non-empty message (plus known-bad feed hits), each with its own analysis budget
+    budgets = [new_budget() for _ in batch.messages]
+    analyses = await detection_cache.lookup_many([item.message for item in batch.messages])
+    scans = []
+    extracted = []
+    for item, analysis, budget in zip(batch.messages, analyses, budgets):
+        if not item.message.strip():
+            scans.append(None)
+            extracted.append(None)
+            continue
+        hits = cached_scan(analysis, item.message, budget)
+        known_bad, extracted_data = known_bad_scan(analysis, item.message, budget)
+        scans.append(hits | known_bad)
+        extracted.append(extracted_data)
+    end_stage("detect")
+
+    # 2. Bulk session advance, applied in order so repeated session_ids see each other's turns
+    indexes = [i for i, hits in enumerate(scans) if hits is not None]
+    advanced = await advance_session_turns([
+        (batch.messages[i].session_id, scans[i]) for i in indexes
+    ])
+    states = [None] * len(scans)
+    for i, new_state in zip(indexes, advanced):
+        states[i] = new_state
+    end_stage("session")
+
+    # 3. Extraction (scams only)
+    for i, (item, state, analysis, budget) in enumerate(zip(batch.messages, states, analyses, budgets)):
+        if not state or state.scam_type == "unknown":
+            extracted[i] = None
+        elif extracted[i] is None:
+            extracted[i] = cached_extraction(analysis, item.message, budget)
+    await detection_cache.store_many(analyses)
+    for state, extracted_data in zip(states, extracted):
+        if extracted_data is not None:
+            indicators.record(state.session_id, extracted_data.model_dump())
+    cumulative = await merge_sessions_intelligence([
+        (state.session_id, extracted_data.model_dump() if extracted_data else {}, item.cumulative) if state
+        else (None, {}, False)
+        for item, state, extracted_data in zip(batch.messages, states, extracted)
+    ])
+    campaign_ids = iter(await campaigns.assign_many([
+        (batch.messages[i].message, states[i].scam_type) for i in indexes
+    ]))
+    campaign_ids = [next(campaign_ids) if state else None for state in states]
+    end_stage("extract")
+
+    # 4. Persona replies & explanations (empty messages don't touch their session)
+    results = [
+        build_response(state, extracted_data, partial=budget.exceeded, cumulative=collected, campaign_id=campaign_id)
+        if state else empty_response(item.session_id or str(uuid.uuid4()))
+        for item, state, extracted_data, budget, collected, campaign_id
+        in zip(batch.messages, states, extracted, budgets, cumulative, campaign_ids)
+    ]
+    end_stage("respond")
+
+    # Serialized directly, like /honeypot (the shape of BatchHoneypotResponse)
+    return Response(dump_json({
+        "results": results,
+        "timings": {"total_ms": round((time.perf_counter() - batch_start) * 1000, 3), "stages_ms": stages}
+    }), media_type="application/json")
+
+@app.get("/indicators", response_model=IndicatorResponse, dependencies=[Depends(verify_api_key)])
+async def indicator_lookup(kind: str, value: str, limit: int = 100):
+    """
+    Where an indicator (kind: upi_id, bank_account, phone_number or domain;
+    a domain may be given as a full URL) was seen across all sessions.
+    Sightings reach the index within INDICATOR_FLUSH_INTERVAL seconds.
+    """
+    if kind not in INDICATOR_FIELDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown indicator kind (one of {', '.join(INDICATOR_FIELDS)})"
+        )
+    entry = await indicators.lookup(kind, value, max(1, min(limit, settings.INDICATOR_MAX_SESSIONS)))
+    if entry is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Indicator not found")
+    return IndicatorResponse(kind=kind, value=normalize_indicator(kind, value), **entry)
+
+@app.get("/campaigns", response_model=CampaignsResponse, dependencies=[Depends(verify_api_key)])
+async def top_campaigns(limit: int = 20):
+    """
+    The largest campaigns (clusters of near-duplicate messages) by message count.
+    """
+    return CampaignsResponse(campaigns=await campaigns.top(max(1, min(limit, 1000))))
+
+@app.websocket("/honeypot/ws")
+async def honeypot_ws(websocket: WebSocket, session_id: str | None = None, api_key: str | None = None):
+    """
+    One honeypot conversation per connection (?session_id=..., a new session
+    if absent). The API key (x-api-key header, or the api_key query parameter
+    for browser clients) is checked once, on connect; the rate limit on
+    connect and for every frame.
+    Each text frame is a /honeypot request object and is answered with its
+    /honeypot response (or an error object) as soon as it is ready. Frames
+    take admission slots like /honeypot requests.
+    The session stays in memory: it is written to the store every
+    WS_PERSIST_INTERVAL seconds while it has unsaved turns, and on close.
+    """
+    try:
+        await verify_api_key(websocket.headers.get("x-api-key") or api_key)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    try:
+        await check_rate_limit(websocket)
+    except HTTPException:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+    conversation = await Conversation.open(session_id)
+    persister = asyncio.create_task(conversation.run_persister())
+    try:
+        while True:
+            frame = await websocket.receive_text()
+            await websocket.send_text((await charged_frame(websocket, frame, conversation)).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        persister.cancel()
+        await conversation.persist()
@@ -0,0 +1,86 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed list of keywords.
+    Built once; scan() finds every keyword occurring in a text in a single
+    pass, so the cost depends on the text length, not on the keyword count.
+    """
+
+    def __init__(self, keywords: list[str]):
+        self.keywords = list(keywords)
+
+        # goto[state] maps a character to the next state, fail[state] is the
+        # longest proper suffix state, out[state] holds the keyword ids ending there.
+        goto = [{}]
+        out = [[]]
+        for kw_id, kw in enumerate(self.keywords):
+            if not kw:
+                raise ValueError("Keywords must be non-empty")
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(kw_id)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # Inherit matches of the suffix state (BFS order guarantees it is final)
+                out[nxt].extend(out[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(ids) for ids in out]
+        self._alphabet = frozenset(ch for kw in self.keywords for ch in kw)
+        # Transition table filled lazily from goto/fail so the scan loop never
+        # walks failure links twice for the same (state, char) pair.
+        self._delta = [dict(edges) for edges in goto]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def scan(self, text: str) -> set[int]:
+        """
+        Returns the ids (indexes into self.keywords) of every keyword that
+        occurs in text, equivalent to {i for i, kw in enumerate(keywords) if kw in text}.
+        """
+        delta = self._delta
+        out = self._out
+        hits = set()
+        state = 0
+        for ch in text:
+            nxt = delta[state].get(ch)
+            if nxt is None:
+                nxt = self._resolve(state, ch)
+            state = nxt
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
+    def _resolve(self, state: int, ch: str) -> int:
+        # Characters no keyword contains always lead back to the root; not
+        # caching them keeps the table bounded by states x alphabet.
+        if ch not in self._alphabet:
+            return 0
+        s = state
+        nxt = self._goto[s].get(ch)
+        while nxt is None and s:
+            s = self._fail[s]
+            nxt = self._goto[s].get(ch)
+        nxt = nxt or 0
+        self._delta[state][ch] = nxt
+        return nxt
@@ -1,65 +1,685 @@
-import os
+import asyncio
 import json
+import time
 import uuid
+from collections import OrderedDict
 from typing import Dict, Any
+from app.config import settings
+from app.detector import PATTERNS_ID, SCAM_TYPES, classify_scores, score_mask
+from app.extractor import KIND_FIELDS
+from app.metrics import REDIS_SECONDS
 
 # Optional Redis support
 try:
-    import redis
+    import redis.asyncio as redis
 except ImportError:
     redis = None
 
+SESSION_TTL = 3600 * 24  # 24h expiry
+# ExtractedIntelligence fields collected per session (see SessionManager.merge_intelligence)
+INTEL_FIELDS = list(KIND_FIELDS.values())
+
+def stage_for_turn(turn: int) -> str:
+    if turn <= 1:
+        return "hook"
+    elif turn == 2:
+        return "trust_building"
+    elif turn <= 5:
+        return "extraction"
+    return "exit"
+
+# Stored codes are list indexes: append new values, never reorder.
+STAGES = ["hook", "trust_building", "extraction", "exit"]
+# Code 0 is "unknown", i.e. no scam found in the session yet
+SCAM_TYPE_NAMES = ["unknown"] + SCAM_TYPES
+STAGE_CODES = {name: code for code, name in enumerate(STAGES)}
+SCAM_TYPE_CODES = {name: code for code, name in enumerate(SCAM_TYPE_NAMES)}
+
+# stage_for_turn(1..n) as stage codes; every later turn keeps the last stage.
+# Passed to the Lua script so the stage rules live only in Python.
+STAGE_LADDER = "".join(chr(STAGE_CODES[stage_for_turn(turn)]) for turn in range(1, 7))
+
+# First character of a compact record. JSON records (from before the compact
+# format) start with "{"; V1 records have no signal mask, V2 records a signal
+# mask but not the PATTERNS_ID it was built with.
+FORMAT_V1 = "\x01"
+FORMAT_V2 = "\x02"
+FORMAT_V3 = "\x03"
+# PATTERNS_ID of the rules V2 records were written with: masks of V2 records
+# still around when the rules change are dropped like any other stale mask.
+V2_PATTERNS_ID = 3198382179
+
+def encode_varint(n: int) -> str:
+    """
+    Little-endian base-64 varint: 6 value bits per character, 0x40 marks
+    "more follows". Every character is 7-bit ASCII.
+    """
+    if n < 64:
+        return chr(n)
+    out = []
+    while n >= 64:
+        out.append(chr(64 | (n & 63)))
+        n >>= 6
+    out.append(chr(n))
+    return "".join(out)
+
+def decode_varint(raw: str, pos: int) -> tuple[int, int]:
+    """
+    Returns (value, position after it).
+    """
+    value = shift = 0
+    while True:
+        b = ord(raw[pos])
+        pos += 1
+        if b < 64:
+            return value | (b << shift), pos
+        value |= (b - 64) << shift
+        shift += 6
+
+class Session:
+    """
+    State of one conversation.
+    `signal_mask` is the union of every message's signal mask so far (see
+    app.detector.scan_message); `scores`, `signals` and `confidence` are
+    derived from it, so detection covers the whole conversation while each
+    message is scanned only once. The accumulated evidence decides
+    `scam_type`; without any scam evidence the stored type is kept.
+    Stored compactly (session_id is already the key):
+      FORMAT_V3 | varint version | varint turn | stage code | scam_type code | varint PATTERNS_ID
+        | varint signal_mask | extra
+    A mask stored under another PATTERNS_ID (before a rules change; V2
+    records count as V2_PATTERNS_ID) is dropped when the record is read: its
+    bits would stand for other signals.
+    The session keeps its turn and stored scam type and collects evidence again.
+    `version` counts writes (see SessionManager); `extra` holds any further
+    fields as a JSON object and is left out when empty. Codes are < 64, so a
+    record is 7-bit ASCII and passes unchanged through UTF-8 decoding clients
+    and Lua string functions.
+    """
+
+    __slots__ = ("session_id", "turn", "stage", "scam_type", "version", "extra",
+                 "signal_mask", "scores", "signals", "confidence")
+
+    def __init__(self, session_id: str, turn: int = 0, stage: str = "hook", scam_type: str = "unknown",
+                 version: int = 0, extra: Dict[str, Any] | None = None, signal_mask: int = 0,
+                 scored: "Session | None" = None):
+        self.session_id = session_id
+        self.turn = turn
+        self.stage = stage
+        self.version = version
+        self.extra = extra
+        self.signal_mask = signal_mask
+        if scored is not None:
+            # Same signals as `scored`: reuse its derived fields
+            self.scores, self.signals, self.confidence = scored.scores, scored.signals, scored.confidence
+            self.scam_type = scored.scam_type
+            return
+        self.scores, self.signals = score_mask(signal_mask)
+        is_scam, winner, self.confidence = classify_scores(self.scores)
+        self.scam_type = winner if is_scam else scam_type
+
+    def __repr__(self) -> str:
+        return (f"Session({self.session_id!r}, turn={self.turn}, stage={self.stage!r}, "
+                f"scam_type={self.scam_type!r}, version={self.version}, signal_mask={self.signal_mask:#x})")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Session):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def advance(self, hits: int) -> "Session":
+        """
+        Computes the next session state from this one and the current message's signal mask.
+        """
+        turn = self.turn + 1
+        signal_mask = self.signal_mask | hits
+        return Session(self.session_id, turn, stage_for_turn(turn), self.scam_type, self.version, self.extra,
+                       signal_mask, scored=self if signal_mask == self.signal_mask else None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **(self.extra or {}),
+            "turn": self.turn,
+            "stage": self.stage,
+            "scam_type": self.scam_type,
+            "session_id": self.session_id
+        }
+
+    def encode_body(self) -> str:
+        # Everything after the version; the Redis set script prepends that
+        body = (encode_varint(self.turn) + chr(STAGE_CODES[self.stage]) + chr(SCAM_TYPE_CODES[self.scam_type])
+                + encode_varint(PATTERNS_ID) + encode_varint(self.signal_mask))
+        if self.extra:
+            body += json.dumps(self.extra, separators=(",", ":"))
+        return body
+
+    def encode(self) -> str:
+        return FORMAT_V3 + encode_varint(self.version) + self.encode_body()
+
+    @classmethod
+    def decode(cls, session_id: str, raw: str | bytes) -> "Session":
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        if raw[0] == "{":
+            # JSON record written before the compact format
+            data = json.loads(raw)
+            extra = {k: v for k, v in data.items() if k not in ("turn", "stage", "scam_type", "session_id", "version")}
+            return cls(session_id, data.get("turn", 0), data.get("stage", "hook"), data.get("scam_type", "unknown"),
+                       data.get("version", 0), extra or None)
+        marker = raw[0]
+        if marker not in (FORMAT_V3, FORMAT_V2, FORMAT_V1):
+            raise ValueError(f"Unknown session record format {marker!r}")
+
+        version, pos = decode_varint(raw, 1)
+        turn, pos = decode_varint(raw, pos)
+        stage, scam_type = STAGES[ord(raw[pos])], SCAM_TYPE_NAMES[ord(raw[pos + 1])]
+        pos += 2
+        patterns_id = V2_PATTERNS_ID
+        if marker == FORMAT_V3:
+            patterns_id, pos = decode_varint(raw, pos)
+        signal_mask, pos = decode_varint(raw, pos) if marker != FORMAT_V1 else (0, pos)
+        if patterns_id != PATTERNS_ID:
+            signal_mask = 0
+        extra = json.loads(raw[pos:]) if len(raw) > pos else None
+        return cls(session_id, turn, stage, scam_type, version, extra, signal_mask)
+
+# Lua versions of the codec above, shared by the scripts below.
+# parse() returns version, turn, scam_type code, signal mask digits and the
+# extra tail of a stored record; older formats are converted (scam_codes maps
+# names to codes for JSON records), and a mask built under another
+# patterns_id than the given one is dropped.
+# Signal masks can be wider than Lua's exact number range, so they stay
+# lists of 6-bit varint digits, least significant first.
+LUA_CODEC = f"local V2_PATTERNS_ID = {V2_PATTERNS_ID}\n" + """
+local function read_varint(s, pos)
+    local value, scale = 0, 1
+    while true do
+        local b = string.byte(s, pos)
+        pos = pos + 1
+        if b < 64 then return value + b * scale, pos end
+        value = value + (b - 64) * scale
+        scale = scale * 64
+    end
+end
+
+local function varint(n)
+    local out = ''
+    while n >= 64 do
+        out = out .. string.char(64 + n % 64)
+        n = math.floor(n / 64)
+    end
+    return out .. string.char(n)
+end
+
+local function read_digits(s, pos)
+    local digits = {}
+    while true do
+        local b = string.byte(s, pos)
+        pos = pos + 1
+        if b < 64 then
+            digits[#digits + 1] = b
+            return digits, pos
+        end
+        digits[#digits + 1] = b - 64
+    end
+end
+
+local function write_digits(digits)
+    local n = #digits
+    while n > 1 and digits[n] == 0 do n = n - 1 end
+    local out = ''
+    for i = 1, n - 1 do out = out .. string.char(64 + digits[i]) end
+    return out .. string.char(digits[n])
+end
+
+local function or_digits(a, b)
+    local out = {}
+    for i = 1, math.max(#a, #b) do
+        local x, y, v, bit = a[i] or 0, b[i] or 0, 0, 1
+        for _ = 1, 6 do
+            if x % 2 == 1 or y % 2 == 1 then v = v + bit end
+            x, y, bit = math.floor(x / 2), math.floor(y / 2), bit * 2
+        end
+        out[i] = v
+    end
+    return out
+end
+
+local function parse(raw, scam_codes, patterns_id)
+    local format = string.sub(raw, 1, 1)
+    if format == '{' then
+        local state = cjson.decode(raw)
+        local extra, has_extra = {}, false
+        for k, v in pairs(state) do
+            if k ~= 'turn' and k ~= 'stage' and k ~= 'scam_type' and k ~= 'session_id' and k ~= 'version' then
+                extra[k] = v
+                has_extra = true
+            end
+        end
+        return tonumber(state['version']) or 0, tonumber(state['turn']) or 0,
+            scam_codes[state['scam_type']] or 0, {0}, has_extra and cjson.encode(extra) or ''
+    end
+    local version, turn, pos, signals
+    version, pos = read_varint(raw, 2)
+    turn, pos = read_varint(raw, pos)
+    local scam = string.byte(raw, pos + 1)
+    pos = pos + 2
+    local stored_id = V2_PATTERNS_ID
+    if format == '\\3' then stored_id, pos = read_varint(raw, pos) end
+    if format == '\\1' then
+        signals = {0}
+    else
+        signals, pos = read_digits(raw, pos)
+    end
+    if stored_id ~= patterns_id then signals = {0} end
+    return version, turn, scam, signals, string.sub(raw, pos)
+end
+"""
+
+# Every write increments a session's version, so workers can tell whether a
+# copy they hold is still current.
+
+# Server-side Session.advance: read, increment, derive stage, merge the
+# message's signals and write back with a fresh TTL in one atomic round trip.
+# The scam type is derived from the signals when the record is decoded.
+# The session's intelligence sets get the same fresh TTL.
+# KEYS[1] = session key, KEYS[2..] = intelligence set keys
+# ARGV = encode_varint(message signal mask), ttl, STAGE_LADDER, PATTERNS_ID, SCAM_TYPE_NAMES...
+ADVANCE_TURN_SCRIPT = LUA_CODEC + """
+local hits = read_digits(ARGV[1], 1)
+local ladder = ARGV[3]
+local patterns_id = tonumber(ARGV[4])
+local scam_codes = {}
+for i = 5, #ARGV do scam_codes[ARGV[i]] = i - 5 end
+
+local version, turn, scam, signals, extra = 0, 0, 0, {0}, ''
+local raw = redis.call('GET', KEYS[1])
+if raw then version, turn, scam, signals, extra = parse(raw, scam_codes, patterns_id) end
+
+turn = turn + 1
+local stage = string.byte(ladder, math.min(turn, #ladder))
+
+local encoded = '\\3' .. varint(version + 1) .. varint(turn) .. string.char(stage, scam)
+    .. varint(patterns_id) .. write_digits(or_digits(signals, hits)) .. extra
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[2])
+for i = 2, #KEYS do redis.call('EXPIRE', KEYS[i], ARGV[2]) end
+return encoded
+"""
+
+# Writes a whole session with the next version, optionally only if the stored
+# version is still the one the caller read (compare-and-set).
+# KEYS[1] = session key
+# ARGV = Session.encode_body(), ttl, expected version ('' = unconditional)
+# Returns {1, stored record} or, if the version moved on, {0, current record or ''}.
+SET_SESSION_SCRIPT = LUA_CODEC + """
+local version = 0
+local raw = redis.call('GET', KEYS[1])
+if raw then version = parse(raw, {}) end
+if ARGV[3] ~= '' and tonumber(ARGV[3]) ~= version then
+    return {0, raw or ''}
+end
+
+local encoded = '\\3' .. varint(version + 1) .. ARGV[1]
+redis.call('SET', KEYS[1], encoded, 'EX', ARGV[2])
+return {1, encoded}
+"""
+
+# Adds values to a session's intelligence sets (one Redis set per field),
+# stopping at `cap` members per set, and optionally returns every member.
+# KEYS = intelligence set keys, in INTEL_FIELDS order
+# ARGV = cap, ttl, '1' to return members, then per key: value count, values...
+# Returns a list of members per key, or an empty list.
+MERGE_INTEL_SCRIPT = """
+local cap, ttl, want = tonumber(ARGV[1]), ARGV[2], ARGV[3] == '1'
+local pos = 4
+local members = {}
+for k = 1, #KEYS do
+    local n = tonumber(ARGV[pos])
+    pos = pos + 1
+    if n > 0 then
+        local size = redis.call('SCARD', KEYS[k])
+        for i = pos, pos + n - 1 do
+            if size >= cap then break end
+            size = size + redis.call('SADD', KEYS[k], ARGV[i])
+        end
+        redis.call('EXPIRE', KEYS[k], ttl)
+    end
+    pos = pos + n
+    if want then members[k] = redis.call('SMEMBERS', KEYS[k]) end
+end
+return members
+"""
+
+def intel_keys(session_id: str) -> list[str]:
+    # Not under "session:": session ids come from clients, and "session:<id>:urls"
+    # would be the record key of the session named "<id>:urls"
+    return [f"intel:{session_id}:{field}" for field in INTEL_FIELDS]
+
+class LocalSessionStore:
+    """
+    In-process session store with the Redis path's behavior: every write
+    (re)sets a `ttl` expiry, reads don't extend it.
+    Entries are ordered by last write; with one TTL for all of them that is
+    also expiry order, so the sweeper only pops expired entries off the front,
+    and once `max_entries` is reached a write evicts the least recently
+    written session.
+    Sessions are kept in their compact encoded form, next to their
+    intelligence sets (see merge_intel), which share their expiry.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_entries: int = 100_000, sweep_interval: float = 10.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        # {session_id: (expires_at, encoded session, intelligence sets or None)}, oldest write first
+        self.entries = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, session_id: str, now: float | None = None) -> Session | None:
+        record = self.entries.get(session_id)
+        if record is None:
+            return None
+        if record[0] <= (time.monotonic() if now is None else now):
+            del self.entries[session_id]
+            return None
+        return Session.decode(session_id, record[1])
+
+    def set(self, session: Session, now: float | None = None):
+        if now is None:
+            now = time.monotonic()
+        entries = self.entries
+        old = entries.get(session.session_id)
+        intel = old[2] if old is not None and old[0] > now else None
+        entries[session.session_id] = (now + self.ttl, session.encode(), intel)
+        entries.move_to_end(session.session_id)
+        # Full: drop the least recently written sessions
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evicted += 1
+
+    def write(self, session: Session, compare: bool = False, now: float | None = None) -> bool:
+        """
+        Stores a session as the next version of the stored one, like
+        SET_SESSION_SCRIPT; with compare, only if the stored version is still
+        session.version (False otherwise). On success session.version is the
+        stored version.
+        """
+        if now is None:
+            now = time.monotonic()
+        record = self.entries.get(session.session_id)
+        # Records here are always compact: the version directly follows the format byte
+        version = decode_varint(record[1], 1)[0] if record is not None and record[0] > now else 0
+        if compare and version != session.version:
+            return False
+        session.version = version + 1
+        self.set(session, now)
+        return True
+
+    def merge_intel(self, session_id: str, found: dict[str, list[str]], cap: int,
+                    now: float | None = None) -> dict[str, dict] | None:
+        """
+        Adds found values to a live session's intelligence sets, at most `cap`
+        per field, and returns the sets ({field: {value: None}}, in order of
+        first sighting). None if the session doesn't exist.
+        """
+        record = self.entries.get(session_id)
+        if record is None or record[0] <= (time.monotonic() if now is None else now):
+            return None
+        intel = record[2]
+        if intel is None:
+            intel = {field: {} for field in INTEL_FIELDS}
+            self.entries[session_id] = (record[0], record[1], intel)
+        for field, values in found.items():
+            known = intel[field]
+            for value in values:
+                if len(known) >= cap:
+                    break
+                known[value] = None
+        return intel
+
+    def sweep(self, now: float | None = None, budget: int = 1000) -> int:
+        """
+        Drops expired sessions from the oldest end, stopping at the first live
+        one or after `budget` removals. Returns the number removed.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        entries = self.entries
+        removed = 0
+        while entries and removed < budget:
+            session_id, record = next(iter(entries.items()))
+            if record[0] > now:
+                break
+            del entries[session_id]
+            removed += 1
+        return removed
+
+    async def run_sweeper(self):
+        """
+        Background task: sweeps expired sessions every sweep_interval seconds,
+        yielding to the event loop between chunks.
+        """
+        chunk = 1000
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            while self.sweep(budget=chunk) == chunk:
+                await asyncio.sleep(0)
+
 class SessionManager:
-    def __init__(self):
-        self.redis_url = os.getenv("REDIS_URL")
-        self.redis_client = None
-        self.local_storage = {}
-        
-        if self.redis_url and redis:
+    """
+    Asyncio-native session store.
+    Redis is used through a bounded connection pool when REDIS_URL is set;
+    otherwise sessions live in process memory.
+
+    Stored sessions carry a version that every write increments, and
+    update_session(..., compare=True) is compare-and-set, so a copy held
+    across other writers' updates is detected when it is written back
+    instead of overwriting newer state.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis_url = settings.REDIS_URL
+        self.redis_client = redis_client
+        self.local_storage = LocalSessionStore(
+            max_entries=settings.SESSION_MAX_ENTRIES,
+            sweep_interval=settings.SESSION_SWEEP_INTERVAL
+        )
+
+        if self.redis_client is None and self.redis_url and redis:
             try:
-                self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
-                print(f"Connected to Redis at {self.redis_url}")
+                # Blocking pool: at most REDIS_MAX_CONNECTIONS sockets; callers
+                # wait up to REDIS_POOL_TIMEOUT for a free one instead of opening more.
+                pool = redis.BlockingConnectionPool.from_url(
+                    self.redis_url,
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    timeout=settings.REDIS_POOL_TIMEOUT,
+                    decode_responses=True
+                )
+                self.redis_client = redis.Redis(connection_pool=pool)
+                print(f"Using Redis at {self.redis_url} (pool size {settings.REDIS_MAX_CONNECTIONS})")
             except Exception as e:
                 print(f"Failed to connect to Redis: {e}. Using in-memory storage.")
 
-    def get_session(self, session_id: str) -> Dict[str, Any]:
+        self.advance_script = self.redis_client.register_script(ADVANCE_TURN_SCRIPT) if self.redis_client else None
+        self.set_script = self.redis_client.register_script(SET_SESSION_SCRIPT) if self.redis_client else None
+        self.merge_intel_script = self.redis_client.register_script(MERGE_INTEL_SCRIPT) if self.redis_client else None
+
+    async def close(self):
+        if self.redis_client:
+            await self.redis_client.aclose()
+
+    async def get_session(self, session_id: str) -> Session | None:
+        """
+        The stored session, or None.
+        """
         if not session_id:
             # Should not happen if caller generates ID, but safe handling
-            return {}
-            
-        if self.redis_client:
-            data = self.redis_client.get(f"session:{session_id}")
-            if data:
-                return json.loads(data)
-            return {}
-        else:
-            return self.local_storage.get(session_id, {})
+            return None
 
-    def update_session(self, session_id: str, data: Dict[str, Any]):
+        if not self.redis_client:
+            return self.local_storage.get(session_id)
+
+        started = time.perf_counter()
+        raw = await self.redis_client.get(f"session:{session_id}")
+        REDIS_SECONDS.observe(time.perf_counter() - started, "get")
+        return Session.decode(session_id, raw) if raw else None
+
+    async def update_session(self, session: Session, compare: bool = False) -> bool:
+        """
+        Replaces a session. With compare, the write only happens if nobody
+        wrote the session since it was read at session.version; otherwise
+        returns False and the caller should read it again. On success
+        session.version is the stored version.
+        In process memory, versions matter too: a /honeypot/ws connection
+        holds its own copy of a session while other requests advance it.
+        """
+        if not self.redis_client:
+            return self.local_storage.write(session, compare)
+
+        started = time.perf_counter()
+        written, raw = await self.set_script(
+            keys=[f"session:{session.session_id}"],
+            args=[session.encode_body(), SESSION_TTL, session.version if compare else ""]
+        )
+        REDIS_SECONDS.observe(time.perf_counter() - started, "set")
+        if not written:
+            return False
+        session.version = Session.decode(session.session_id, raw).version
+        return True
+
+    async def advance_turn(self, session_id: str, hits: int) -> Session:
+        """
+        Atomically moves a session to its next turn, merging the current
+        message's signal mask (see app.detector.scan_message) into the
+        session's, and returns the new state.
+        Concurrent messages on one session_id always get distinct, sequential turns.
+        """
         if self.redis_client:
-            self.redis_client.set(f"session:{session_id}", json.dumps(data), ex=3600*24) # 24h expiry
+            started = time.perf_counter()
+            raw = await self.advance_script(
+                keys=[f"session:{session_id}", *intel_keys(session_id)],
+                args=[encode_varint(hits), SESSION_TTL, STAGE_LADDER, PATTERNS_ID, *SCAM_TYPE_NAMES]
+            )
+            REDIS_SECONDS.observe(time.perf_counter() - started, "advance_turn")
+            return Session.decode(session_id, raw)
         else:
-            self.local_storage[session_id] = data
+            # No await between read and write: the event loop cannot interleave
+            # another advance on the same key, so no lock is needed.
+            session = self.local_storage.get(session_id) or Session(session_id)
+            new_session = session.advance(hits)
+            self.local_storage.write(new_session)
+            return new_session
+
+    async def advance_turns(self, updates: list[tuple[str, int]]) -> list[Session]:
+        """
+        Bulk advance_turn for (session_id, signal mask) pairs, applied in order.
+        On Redis every script call goes out in one pipelined round trip.
+        """
+        if not self.redis_client:
+            return [await self.advance_turn(session_id, hits) for session_id, hits in updates]
+
+        started = time.perf_counter()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for session_id, hits in updates:
+            await self.advance_script(
+                keys=[f"session:{session_id}", *intel_keys(session_id)],
+                args=[encode_varint(hits), SESSION_TTL, STAGE_LADDER, PATTERNS_ID, *SCAM_TYPE_NAMES],
+                client=pipe
+            )
+        results = await pipe.execute()
+        REDIS_SECONDS.observe(time.perf_counter() - started, "advance_turns")
+        return [Session.decode(session_id, raw) for (session_id, _), raw in zip(updates, results)]
+
+    def merge_intel_args(self, found: dict[str, list[str]], cumulative: bool) -> list:
+        args = [settings.INTEL_MAX_PER_FIELD, SESSION_TTL, "1" if cumulative else "0"]
+        for field in INTEL_FIELDS:
+            values = found.get(field) or []
+            args.append(len(values))
+            args.extend(values)
+        return args
+
+    async def merge_intelligence(self, session_id: str, found: dict[str, list[str]],
+                                 cumulative: bool = False) -> dict[str, list[str]] | None:
+        """
+        Adds this turn's extracted values ({field: values}) to the session's
+        deduplicated intelligence sets, capped at INTEL_MAX_PER_FIELD values
+        per field; the work depends on what was found, not on how much the
+        session already holds. With cumulative, returns every value collected
+        so far ({field: sorted values}), otherwise None.
+        On Redis each field is a native set, updated with SADD.
+        """
+        return (await self.merge_intelligence_many([(session_id, found, cumulative)]))[0]
+
+    async def merge_intelligence_many(self, merges: list[tuple[str, dict[str, list[str]], bool]]) -> list:
+        """
+        Bulk merge_intelligence for (session_id, found, cumulative) triples,
+        one pipelined round trip on Redis. Merges with nothing found and no
+        cumulative view requested are skipped.
+        """
+        results = [None] * len(merges)
+        todo = [
+            (i, session_id, found, cumulative) for i, (session_id, found, cumulative) in enumerate(merges)
+            if cumulative or any(found.values())
+        ]
+        if not self.redis_client:
+            for i, session_id, found, cumulative in todo:
+                intel = self.local_storage.merge_intel(session_id, found, settings.INTEL_MAX_PER_FIELD)
+                if cumulative:
+                    results[i] = {field: sorted(intel[field]) if intel else [] for field in INTEL_FIELDS}
+            return results
+        if not todo:
+            return results
+
+        started = time.perf_counter()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for _, session_id, found, cumulative in todo:
+            await self.merge_intel_script(keys=intel_keys(session_id), args=self.merge_intel_args(found, cumulative),
+                                          client=pipe)
+        replies = await pipe.execute()
+        REDIS_SECONDS.observe(time.perf_counter() - started, "merge_intel")
+        for (i, _, _, cumulative), members in zip(todo, replies):
+            if cumulative:
+                results[i] = {field: sorted(values) for field, values in zip(INTEL_FIELDS, members)}
+        return results
 
 session_manager = SessionManager()
 
-def get_or_create_session(session_id: str | None) -> tuple[str, Dict[str, Any]]:
+async def get_or_create_session(session_id: str | None) -> Session:
     """
-    Returns (session_id, session_data).
-    If session_id is None, generates a new one.
-    If session exists, loads it.
-    If new, initializes default state.
+    Loads the session, or starts a new one (turn 0) if session_id is None
+    (a new id is generated), unknown or expired.
+    """
+    if not session_id:
+        return Session(str(uuid.uuid4()))
+    return await session_manager.get_session(session_id) or Session(session_id)
+
+async def advance_session_turn(session_id: str | None, hits: int) -> Session:
+    """
+    Advances (or starts, if session_id is None/unknown) a session by one turn
+    with the current message's signal mask.
+    Returns the new state, including its session_id.
     """
     if not session_id:
         session_id = str(uuid.uuid4())
-        session_data = {"turn": 0, "stage": "hook", "scam_type": "unknown"}
-    else:
-        session_data = session_manager.get_session(session_id)
-        if not session_data:
-            # Session ID provided but not found (expired/new)
-            session_data = {"turn": 0, "stage": "hook", "scam_type": "unknown"}
-            
-    return session_id, session_data
-
-def save_session(session_id: str, data: Dict[str, Any]):
-    session_manager.update_session(session_id, data)
+    return await session_manager.advance_turn(session_id, hits)
+
+async def advance_session_turns(updates: list[tuple[str | None, int]]) -> list[Session]:
+    """
+    Batch version of advance_session_turn, one bulk store operation.
+    """
+    updates = [(session_id or str(uuid.uuid4()), hits) for session_id, hits in updates]
+    return await session_manager.advance_turns(updates)
+
+async def merge_session_intelligence(session_id: str, found: dict[str, list[str]],
+                                     cumulative: bool = False) -> dict[str, list[str]] | None:
+    return await session_manager.merge_intelligence(session_id, found, cumulative)
+
+async def merge_sessions_intelligence(merges: list[tuple[str, dict[str, list[str]], bool]]) -> list:
+    return await session_manager.merge_intelligence_many(merges)
+
+async def save_session(session: Session, compare: bool = False) -> bool:
+    return await session_manager.update_session(session, compare)
@@ -0,0 +1,260 @@
+import array
+import bisect
+import glob
+import mmap
+import os
+import time
+import zlib
+from app.config import settings
+from app.detector import SCAM_TYPES, KNOWN_BAD_KINDS
+
+# Latency buckets (seconds), from tens of microseconds to seconds
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Registry:
+    """
+    Fixed set of counters and histograms stored as one flat array of doubles.
+    Every label combination is declared up front, so each series owns a fixed
+    slot range and recording is a plain in-place add: no locks, no allocation.
+    Writes only happen on the event loop thread of their own process.
+
+    With a directory, the array is a memory-mapped file per worker process
+    (<dir>/<pid>.metrics); render() sums the files of every worker, including
+    workers that have exited, so counters never go backwards. The directory
+    is cleared when the server starts (see gunicorn.conf.py).
+    Without one, metrics cover this process only.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.size = 1  # slot 0 holds the layout checksum
+        self.values = None
+        self.directory = None
+        self.path = None
+
+    def allocate(self, slots: int) -> int:
+        if self.values is not None:
+            raise RuntimeError("Metrics must be declared before the registry is opened")
+        offset = self.size
+        self.size += slots
+        return offset
+
+    def counter(self, name: str, doc: str, labels: dict[str, list[str]] | None = None) -> "Metric":
+        metric = Metric(self, "counter", name, doc, labels or {}, slots_per_series=1)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, doc: str, labels: dict[str, list[str]] | None = None,
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> "Metric":
+        # Per series: one count per bucket, one for +Inf, then the sum
+        metric = Metric(self, "histogram", name, doc, labels or {}, slots_per_series=len(buckets) + 2, buckets=buckets)
+        self.metrics.append(metric)
+        return metric
+
+    @property
+    def layout_id(self) -> int:
+        # Files written by a different set of metrics (e.g. an older deploy) are skipped
+        layout = ";".join(f"{m.name}:{m.labelnames}:{list(m.series)}:{m.buckets}" for m in self.metrics)
+        return zlib.crc32(layout.encode())
+
+    def open(self, directory: str | None = None):
+        """
+        Allocates this process' storage. Called once every metric is declared,
+        and again in forked children so they never share a parent's slots.
+        """
+        self.directory = directory or None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self.path = os.path.join(self.directory, f"{os.getpid()}.metrics")
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                os.ftruncate(fd, self.size * 8)
+                storage = mmap.mmap(fd, self.size * 8)
+            finally:
+                os.close(fd)
+        else:
+            self.path = None
+            storage = bytearray(self.size * 8)
+        self.values = memoryview(storage).cast("d")
+        self.values[0] = self.layout_id
+
+    def collect(self) -> array.array:
+        """
+        Element-wise sum of every worker's values (or just this process').
+        """
+        if not self.directory:
+            return array.array("d", self.values)
+
+        total = array.array("d", bytes(self.size * 8))
+        layout_id = self.layout_id
+        for path in glob.glob(os.path.join(self.directory, "*.metrics")):
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            if len(data) != self.size * 8:
+                continue
+            values = array.array("d", data)
+            if values[0] != layout_id:
+                continue
+            for i in range(1, self.size):
+                total[i] += values[i]
+        return total
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format.
+        """
+        values = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for label_values, series in metric.series.items():
+                labels = ",".join(f'{k}="{v}"' for k, v in zip(metric.labelnames, label_values))
+                label_block = f"{{{labels}}}" if labels else ""
+                if metric.kind == "counter":
+                    lines.append(f"{metric.name}{label_block} {format_value(values[series.offset])}")
+                    continue
+                sep = "," if labels else ""
+                cumulative = 0.0
+                for i, bound in enumerate((*metric.buckets, "+Inf")):
+                    cumulative += values[series.offset + i]
+                    lines.append(f'{metric.name}_bucket{{{labels}{sep}le="{bound}"}} {format_value(cumulative)}')
+                lines.append(f"{metric.name}_sum{label_block} {format_value(values[series.sum_offset])}")
+                lines.append(f"{metric.name}_count{label_block} {format_value(cumulative)}")
+        return "\n".join(lines) + "\n"
+
+def format_value(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class Metric:
+    """
+    A counter or histogram with one Series per combination of label values.
+    """
+
+    def __init__(self, registry: Registry, kind: str, name: str, doc: str, labels: dict[str, list[str]],
+                 slots_per_series: int, buckets: tuple[float, ...] = ()):
+        self.kind = kind
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labels)
+        self.buckets = buckets
+        combos = [()]
+        for values in labels.values():
+            combos = [combo + (value,) for combo in combos for value in values]
+        self.series = {
+            combo: Series(registry, registry.allocate(slots_per_series), buckets)
+            for combo in combos
+        }
+
+    def labels(self, *label_values: str) -> "Series | None":
+        # Undeclared label values are not recorded rather than failing the request
+        return self.series.get(label_values)
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        series = self.series.get(label_values)
+        if series is not None:
+            series.inc(amount)
+
+    def observe(self, value: float, *label_values: str):
+        series = self.series.get(label_values)
+        if series is not None:
+            series.observe(value)
+
+class Series:
+    __slots__ = ("registry", "offset", "buckets", "sum_offset")
+
+    def __init__(self, registry: Registry, offset: int, buckets: tuple[float, ...]):
+        self.registry = registry
+        self.offset = offset
+        self.buckets = buckets
+        self.sum_offset = offset + len(buckets) + 1
+
+    def inc(self, amount: float = 1.0):
+        self.registry.values[self.offset] += amount
+
+    def observe(self, value: float):
+        values = self.registry.values
+        values[self.offset + bisect.bisect_left(self.buckets, value)] += 1
+        values[self.sum_offset] += value
+
+    def observe_since(self, start: float) -> float:
+        """
+        Observes the time elapsed since start (a perf_counter value) and
+        returns the current perf_counter, to chain consecutive stages.
+        """
+        now = time.perf_counter()
+        self.observe(now - start)
+        return now
+
+registry = Registry()
+
+# Stages of one /honeypot request, in order
+STAGES = ["auth", "rate_limit", "detect", "session", "extract", "respond", "serialize"]
+SCAM_TYPE_LABELS = SCAM_TYPES + ["unknown"]
+# Values of app.memory.stage_for_turn (not imported: app.memory records into REDIS_SECONDS)
+CONVERSATION_STAGES = ["hook", "trust_building", "extraction", "exit"]
+
+STAGE_SECONDS = registry.histogram(
+    "honeypot_stage_seconds", "Time spent in each stage of a /honeypot request.",
+    {"stage": STAGES}
+)
+MESSAGES = registry.counter(
+    "honeypot_messages_total", "Analyzed messages by session scam type and conversation stage.",
+    {"scam_type": SCAM_TYPE_LABELS, "stage": CONVERSATION_STAGES}
+)
+REDIS_SECONDS = registry.histogram(
+    "honeypot_redis_seconds", "Session store round trips to Redis, including waiting for a pooled connection.",
+    {"command": ["get", "set", "advance_turn", "advance_turns", "merge_intel", "cache_get", "cache_set",
+                 "index_write", "index_query", "campaign_assign", "campaign_top"]}
+)
+DETECTION_CACHE = registry.counter(
+    "honeypot_detection_cache_total",
+    "Detection cache lookups: hit (this worker), shared_hit (Redis) or miss.",
+    {"result": ["hit", "shared_hit", "miss"]}
+)
+DETECTION_CACHE_EVICTIONS = registry.counter(
+    "honeypot_detection_cache_evictions_total", "Detection cache entries evicted to stay under the byte cap."
+)
+INDICATOR_SIGHTINGS = registry.counter(
+    "honeypot_indicator_sightings_total",
+    "Indicator sightings written to the cross-session index (indexed), or messages dropped when its write buffer was full.",
+    {"result": ["indexed", "dropped"]}
+)
+FEED_HITS = registry.counter(
+    "honeypot_feed_hits_total",
+    "Extracted indicators found in the known-bad feed.",
+    {"kind": KNOWN_BAD_KINDS}
+)
+CAMPAIGN_ASSIGNMENTS = registry.counter(
+    "honeypot_campaign_assignments_total",
+    "Messages placed in a campaign: joined an existing one, founded a new one, or dropped when the Redis write queue was full.",
+    {"result": ["joined", "new", "dropped"]}
+)
+SESSION_PERSISTS = registry.counter(
+    "honeypot_session_persists_total",
+    "Deferred session writes from /honeypot/ws connections: written, or conflict (another request wrote the session first).",
+    {"result": ["written", "conflict"]}
+)
+ADMISSIONS = registry.counter(
+    "honeypot_admissions_total",
+    "Requests given a processing slot by admission control, or rejected with 503 when its wait queue was full.",
+    {"result": ["admitted", "rejected"]}
+)
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "honeypot_rate_limit_rejections_total", "Requests rejected by the rate limiter."
+)
+
+registry.open(settings.METRICS_DIR)
+# A forked child must not write into its parent's file
+os.register_at_fork(after_in_child=lambda: registry.open(registry.directory))
+
+# Hot-path handles for the /honeypot stages
+STAGE = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
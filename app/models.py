@@ -6,6 +6,8 @@ class HoneypotRequest(BaseModel):
     session_id: Optional[str] = None
     sender: Optional[str] = None
     language: Optional[str] = None
+    # Also return everything collected over the whole session (cumulative_intelligence)
+    cumulative: bool = False
 
 class ExtractedIntelligence(BaseModel):
     upi_ids: List[str] = []
@@ -31,3 +33,45 @@ class HoneypotResponse(BaseModel):
     extracted_intelligence: ExtractedIntelligence
     session_state: SessionState
     explanation: Optional[Explanation] = None
+    # Every value extracted in this session so far, when the request asked for it
+    cumulative_intelligence: Optional[ExtractedIntelligence] = None
+    # Near-duplicate cluster of this message (see GET /campaigns); None for very short messages and benign sessions
+    campaign_id: Optional[str] = None
+    # True when the analysis time budget ran out and some stages were cut short
+    partial: bool = False
+
+class BatchHoneypotRequest(BaseModel):
+    messages: List[HoneypotRequest]
+
+class BatchTimings(BaseModel):
+    total_ms: float
+    stages_ms: Dict[str, float]
+
+class BatchHoneypotResponse(BaseModel):
+    results: List[HoneypotResponse]
+    timings: BatchTimings
+
+class IndicatorSession(BaseModel):
+    session_id: str
+    last_seen: float
+
+class IndicatorResponse(BaseModel):
+    kind: str
+    value: str  # normalized form
+    count: int  # sightings, over all sessions
+    session_count: int
+    first_seen: float  # unix time
+    last_seen: float
+    # Most recently seen first
+    sessions: List[IndicatorSession]
+
+class CampaignSummary(BaseModel):
+    campaign_id: str
+    count: int  # messages
+    first_seen: float  # unix time
+    last_seen: float
+    scam_type: str  # latest scam type of a session sending it, "unknown" if none was a scam
+
+class CampaignsResponse(BaseModel):
+    # Largest first
+    campaigns: List[CampaignSummary]
@@ -0,0 +1,77 @@
+"""
+Where the CPU-bound analysis stages (keyword scan, extraction) run.
+
+ANALYSIS_EXECUTOR picks the executor:
+- `inline` (default): on the event loop, inside the request
+- `thread`: a pool of ANALYSIS_WORKERS threads, which overlaps analysis with
+  I/O waits but not with other analysis (the work holds the GIL)
+- `process`: a pool of ANALYSIS_WORKERS processes, for analysis in parallel
+  with the event loop and with each other; messages and results are pickled
+
+Session and cache I/O stays on the event loop either way.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from app.budget import AnalysisBudget
+from app.config import settings
+from app.detector import scan_message
+from app.extractor import extract_all
+
+EXECUTORS = ("inline", "thread", "process")
+
+def analyze_text(message: str, scan: bool, extract: bool,
+                 seconds: float | None) -> tuple[int | None, dict | None, float | None, bool]:
+    """
+    Worker side: the signal mask (scan) and the extracted intelligence
+    (extract) of a message, within an analysis budget of `seconds`.
+    Returns (mask, extracted, budget remaining, budget exceeded).
+    """
+    budget = AnalysisBudget(seconds)
+    hits = extracted = None
+    with budget:
+        if scan:
+            hits = scan_message(message)
+        if extract and not budget.expired():
+            extracted = extract_all(message, budget)
+    return hits, extracted, budget.remaining, budget.exceeded
+
+class AnalysisPool:
+    """
+    The executor analyze_text runs in, created by start() (or on first use).
+    """
+
+    def __init__(self, kind: str = "inline", workers: int = 0):
+        if kind not in EXECUTORS:
+            raise ValueError(f"Unknown analysis executor {kind!r} (one of {', '.join(EXECUTORS)})")
+        self.kind = kind
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.executor: Executor | None = None
+
+    @property
+    def offloaded(self) -> bool:
+        return self.kind != "inline"
+
+    def start(self):
+        if self.executor is not None or not self.offloaded:
+            return
+        if self.kind == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+        else:
+            # Spawned, not forked: the server process has threads and open sockets
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            # Start every worker now rather than on the first requests
+            for _ in range(self.workers):
+                self.executor.submit(int)
+
+    async def run(self, fn, *args):
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+analysis_pool = AnalysisPool(settings.ANALYSIS_EXECUTOR, settings.ANALYSIS_WORKERS)
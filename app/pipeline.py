@@ -0,0 +1,214 @@
+import json
+from fastapi import HTTPException, status
+from app import feeds
+from app.agent import generate_response
+from app.budget import AnalysisBudget
+from app.cache import CachedAnalysis
+from app.config import settings
+from app.detector import scan_message
+from app.extractor import extract_all
+from app.memory import Session
+from app.models import ExtractedIntelligence
+from app.offload import analysis_pool, analyze_text
+
+# Optional orjson: serializes response bodies several times faster than the
+# json module (or pydantic); the bytes are the same either way.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Keys to check in order of priority
+MESSAGE_KEYS = ["message", "text", "input", "query", "prompt"]
+MAX_MESSAGE_LENGTH = 5000
+INTELLIGENCE_FIELDS = tuple(ExtractedIntelligence.model_fields)
+
+def extract_message(request_data: dict) -> str:
+    """
+    Flexible message extraction: first string value found under MESSAGE_KEYS.
+    """
+    for key in MESSAGE_KEYS:
+        if key in request_data and isinstance(request_data[key], str):
+            return request_data[key]
+    return ""
+
+def check_message_length(message: str):
+    if len(message) > MAX_MESSAGE_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Message too long (max {MAX_MESSAGE_LENGTH} chars)"
+        )
+
+def new_budget() -> AnalysisBudget:
+    return AnalysisBudget(settings.ANALYSIS_BUDGET_MS / 1000)
+
+def extract_intelligence(message: str, budget: AnalysisBudget | None = None) -> ExtractedIntelligence | None:
+    """
+    One extraction pass for all four kinds.
+    Returns None without extracting if the budget is already spent.
+    """
+    if budget is not None and budget.expired():
+        return None
+    return ExtractedIntelligence(**extract_all(message, budget))
+
+def cached_scan(analysis: CachedAnalysis, message: str, budget: AnalysisBudget) -> int:
+    """
+    The signal mask of a message, from the cache record when it has one.
+    """
+    if analysis.hits is None:
+        with budget:
+            analysis.hits = scan_message(message)
+        analysis.dirty = True
+    return analysis.hits
+
+def cached_extraction(analysis: CachedAnalysis, message: str, budget: AnalysisBudget) -> ExtractedIntelligence | None:
+    """
+    extract_intelligence through the cache record. Results cut short by the
+    budget are returned but not cached.
+    """
+    if analysis.extracted is not None:
+        return ExtractedIntelligence(**analysis.extracted)
+    with budget:
+        extracted_data = extract_intelligence(message, budget)
+    if extracted_data is not None and not budget.exceeded:
+        analysis.extracted = extracted_data.model_dump()
+        analysis.dirty = True
+    return extracted_data
+
+def known_bad_scan(analysis: CachedAnalysis, message: str,
+                   budget: AnalysisBudget) -> tuple[int, ExtractedIntelligence | None]:
+    """
+    With a known-bad feed loaded, extracts the message's indicators up front
+    (feed hits are signals, so they must be known before the session update)
+    and returns the KNOWN_BAD_BITS of those the feed lists, with the
+    extraction. Feed lookups are not cached, so a rebuilt feed applies to
+    cached messages too. Without a feed: (0, None).
+    """
+    if feeds.known_bad is None:
+        return 0, None
+    extracted_data = cached_extraction(analysis, message, budget)
+    if extracted_data is None:
+        return 0, None
+    return feeds.known_bad.hits(extracted_data.model_dump()), extracted_data
+
+async def pooled_analysis(analysis: CachedAnalysis, message: str, budget: AnalysisBudget,
+                          extract: bool) -> ExtractedIntelligence | None:
+    """
+    cached_scan and (with extract) cached_extraction for an offloaded
+    analysis pool: what the cache record lacks is computed in one pool call,
+    charged to the budget, and filled in. Returns the extraction if requested.
+    """
+    scan = analysis.hits is None
+    todo = extract and analysis.extracted is None and not budget.expired()
+    if scan or todo:
+        hits, extracted, remaining, exceeded = await analysis_pool.run(
+            analyze_text, message, scan, todo, budget.remaining
+        )
+        if budget.remaining is not None:
+            budget.remaining = remaining
+        budget.exceeded = budget.exceeded or exceeded
+        if scan:
+            analysis.hits = hits
+            analysis.dirty = True
+        if todo and extracted is not None:
+            if not exceeded:
+                analysis.extracted = extracted
+                analysis.dirty = True
+            return ExtractedIntelligence(**extracted)
+    if extract and analysis.extracted is not None:
+        return ExtractedIntelligence(**analysis.extracted)
+    return None
+
+async def detect_stage(analysis: CachedAnalysis, message: str,
+                       budget: AnalysisBudget) -> tuple[int, ExtractedIntelligence | None]:
+    """
+    The message's signal mask, with its known-bad feed hits (see known_bad_scan),
+    and the extraction if the feed lookup needed one. Runs in the analysis pool
+    when it is offloaded.
+    """
+    if not analysis_pool.offloaded:
+        hits = cached_scan(analysis, message, budget)
+        known_bad, extracted_data = known_bad_scan(analysis, message, budget)
+        return hits | known_bad, extracted_data
+    extracted_data = await pooled_analysis(analysis, message, budget, extract=feeds.known_bad is not None)
+    if extracted_data is None:
+        return analysis.hits, None
+    return analysis.hits | feeds.known_bad.hits(extracted_data.model_dump()), extracted_data
+
+async def extraction_stage(analysis: CachedAnalysis, message: str, budget: AnalysisBudget) -> ExtractedIntelligence | None:
+    """
+    cached_extraction, in the analysis pool when it is offloaded.
+    """
+    if not analysis_pool.offloaded:
+        return cached_extraction(analysis, message, budget)
+    return await pooled_analysis(analysis, message, budget, extract=True)
+
+def intelligence_data(values: dict[str, list[str]] | None) -> dict[str, list[str]]:
+    return {field: list(values.get(field) or ()) if values else [] for field in INTELLIGENCE_FIELDS}
+
+def empty_response(session_id: str) -> dict:
+    """
+    Benign response for a missing/empty message.
+    We must generate session state even for benign to keep contract valid.
+    """
+    return {
+        "is_scam": False,
+        "scam_type": "unknown",
+        "confidence": 0.0,
+        "persona_used": "none",
+        "next_message": "",
+        "extracted_intelligence": intelligence_data(None),
+        "session_state": {"session_id": session_id, "turn": 0, "stage": "hook"},
+        "explanation": None,
+        "cumulative_intelligence": None,
+        "campaign_id": None,
+        "partial": False
+    }
+
+def build_response(state: Session, extracted_data: ExtractedIntelligence | None = None,
+                   partial: bool = False, cumulative: dict[str, list[str]] | None = None,
+                   campaign_id: str | None = None) -> dict:
+    """
+    Generates the persona reply and explanation for an advanced session state.
+    Confidence and signals cover the whole conversation so far.
+    extracted_data is only used for scams; benign turns report nothing extracted.
+    cumulative is the session's collected intelligence, if requested.
+    Built as plain data in HoneypotResponse's field order and types (what its
+    model_dump() would give), so it is serialized without building and
+    validating the nested models.
+    """
+    scam_type = state.scam_type
+
+    if scam_type != "unknown":
+        persona, next_msg = generate_response(scam_type, state.stage, state.session_id, state.turn)
+        expl_summary = f"Detected {scam_type} pattern with {state.confidence} confidence."
+        expl_signals = list(state.signals)
+    else:
+        persona = "none"
+        next_msg = ""
+        extracted_data = None
+        expl_summary = "No scam indicators detected."
+        expl_signals = []
+
+    return {
+        "is_scam": scam_type != "unknown",
+        "scam_type": scam_type,
+        "confidence": float(state.confidence),
+        "persona_used": persona,
+        "next_message": next_msg,
+        "extracted_intelligence": intelligence_data(extracted_data.model_dump() if extracted_data else None),
+        "session_state": {"session_id": state.session_id, "turn": state.turn, "stage": state.stage},
+        "explanation": {"signals": expl_signals, "summary": expl_summary},
+        "cumulative_intelligence": intelligence_data(cumulative) if cumulative is not None else None,
+        "campaign_id": campaign_id,
+        "partial": partial
+    }
+
+def dump_json(data) -> bytes:
+    """
+    Compact UTF-8 JSON, byte for byte what pydantic's model_dump_json gives
+    for the same data; with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
@@ -0,0 +1,102 @@
+"""
+NDJSON streaming for /honeypot/stream: one long-lived request whose body is
+read a line at a time while results are written back as they complete.
+
+Flow control is end to end: lines waiting to be processed are capped, so
+when the handler falls behind the body stops being read and the server's
+receive buffer and TCP window push back on the producer; a client that
+doesn't read its results fills the send buffer, which stalls the handler
+the same way.
+"""
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+NDJSON = "application/x-ndjson"
+
+class LineTooLong(ValueError):
+    pass
+
+def error_body(error: str, message: str, details=None) -> str:
+    """
+    The API's error body shape, as JSON.
+    """
+    return json.dumps(
+        {"error": error, "message": message, "details": details}, ensure_ascii=False, separators=(",", ":")
+    )
+
+def error_line(error: str, message: str, details=None) -> bytes:
+    return error_body(error, message, details).encode() + b"\n"
+
+async def read_lines(chunks: AsyncIterator[bytes], max_line: int) -> AsyncIterator[bytes]:
+    """
+    Non-blank lines of a chunked body, without their line breaks.
+    Raises LineTooLong once a line passes max_line bytes, before buffering more of it.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            if end - start > max_line:
+                raise LineTooLong
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            if line:
+                yield line
+        del buffer[:start]
+        if len(buffer) > max_line:
+            raise LineTooLong
+    line = bytes(buffer).strip()
+    if line:
+        yield line
+
+async def stream_results(chunks: AsyncIterator[bytes], handle: Callable[[bytes], Awaitable[bytes]],
+                         max_pending: int, max_line: int) -> AsyncIterator[bytes]:
+    """
+    Yields handle(line) for every line of the body, in order, while a reader
+    task keeps up to max_pending lines read ahead. A line over max_line bytes
+    ends the stream with an error line.
+    """
+    queue = asyncio.Queue(maxsize=max_pending)
+
+    async def reader():
+        # Ends the queue with None, or with the exception that stopped the body
+        end = None
+        try:
+            async for line in read_lines(chunks, max_line):
+                await queue.put(line)
+        except ClientDisconnect:
+            pass
+        except Exception as exc:
+            end = exc
+        await queue.put(end)
+
+    task = asyncio.create_task(reader())
+    try:
+        while (line := await queue.get()) is not None:
+            if isinstance(line, LineTooLong):
+                yield error_line("HTTPException", f"Line too long (max {max_line} bytes)")
+                break
+            if isinstance(line, Exception):
+                raise line
+            yield await handle(line)
+    finally:
+        task.cancel()
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse sent while the request body is still being read.
+    The base class (under ASGI spec < 2.4) also waits on receive() for a
+    disconnect, which would take body chunks away from the reader; here a
+    disconnect ends the body instead.
+    """
+    media_type = NDJSON
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,167 @@
+"""
+Overload: /honeypot latency when requests arrive faster than the server can
+process them, without admission control (the handler as before) and with
+it, with analysis inline and in a process pool.
+
+Each configuration runs in its own uvicorn process. Its capacity is measured
+first with a closed loop. Then requests are sent open loop at --overload
+times that rate for --seconds, whether or not earlier ones have finished.
+Latency counts from each request's scheduled send time. Successful (200)
+and rejected (503) requests are reported separately.
+
+Run: python -m benchmarks.bench_admission [--seconds 5] [--overload 2.0] [--port 8766]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.bench_stream import API_KEY, SESSIONS, start_server
+from benchmarks.corpus import generate_corpus
+from benchmarks.harness import percentile, print_table
+
+
+class Connections:
+    """
+    Minimal keep-alive HTTP/1.1 client over raw sockets: far cheaper per
+    request than a full client library, so the load generator (on the same
+    machine) doesn't become the bottleneck. One request per connection at a
+    time; a new connection is opened whenever none is idle.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.idle = []
+        self.opened = []
+
+    async def post(self, body: dict) -> int:
+        if self.idle:
+            reader, writer = self.idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+            self.opened.append(writer)
+        data = json.dumps(body).encode()
+        writer.write(
+            b"POST /honeypot HTTP/1.1\r\nHost: bench\r\nx-api-key: %s\r\nContent-Type: application/json\r\n"
+            b"Content-Length: %d\r\n\r\n%s" % (API_KEY.encode(), len(data), data)
+        )
+        head = await reader.readuntil(b"\r\n\r\n")
+        status = int(head[9:12])
+        length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+        self.idle.append((reader, writer))
+        return status
+
+    def close(self):
+        for writer in self.opened:
+            writer.close()
+
+
+async def capacity(port: int, bodies: list[dict], seconds: float = 2.0) -> float:
+    """
+    Requests per second with 8 requests always in flight.
+    """
+    connections = Connections(port)
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(offset: int):
+        nonlocal done
+        i = offset
+        while time.perf_counter() < deadline:
+            if await connections.post(bodies[i % len(bodies)]) == 200:
+                done += 1
+            i += 8
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(k) for k in range(8)))
+    elapsed = time.perf_counter() - t0
+    connections.close()
+    return done / elapsed
+
+
+async def overload(port: int, bodies: list[dict], rate: float, seconds: float) -> dict:
+    connections = Connections(port)
+    ok = []
+    busy = []
+    other = 0
+
+    async def send(body: dict, scheduled: float):
+        nonlocal other
+        status = await connections.post(body)
+        latency = time.perf_counter() - scheduled
+        if status == 200:
+            ok.append(latency)
+        elif status == 503:
+            busy.append(latency)
+        else:
+            other += 1
+
+    tasks = []
+    count = int(rate * seconds)
+    t0 = time.perf_counter()
+    for i in range(count):
+        scheduled = t0 + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(bodies[i % len(bodies)], scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - t0
+    connections.close()
+
+    ok.sort()
+    busy.sort()
+    return {
+        "sent_per_sec": round(count / seconds),
+        "ok_per_sec": round(len(ok) / elapsed),
+        "ok_p50_ms": round(percentile(ok, 50) * 1000, 1),
+        "ok_p99_ms": round(percentile(ok, 99) * 1000, 1),
+        "rejected": len(busy),
+        "rejected_p99_ms": round(percentile(busy, 99) * 1000, 1) if busy else "-",
+        "errors": other,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--overload", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="analysis pool processes")
+    args = parser.parse_args()
+
+    bodies = [
+        {"message": m.text, "session_id": f"bench-{i % SESSIONS}"}
+        for i, m in enumerate(generate_corpus(2000, seed=5))
+    ]
+    configs = [
+        ("no admission control", {"ADMISSION_MAX_INFLIGHT": "0"}),
+        ("admission control", {}),
+        ("admission + process pool", {"ANALYSIS_EXECUTOR": "process", "ANALYSIS_WORKERS": str(args.workers)}),
+    ]
+    rows = []
+    for name, env in configs:
+        previous = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            server = start_server(args.port)
+        finally:
+            for key, value in previous.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+        try:
+            rate = asyncio.run(capacity(args.port, bodies))
+            row = asyncio.run(overload(args.port, bodies, rate * args.overload, args.seconds))
+            rows.append({"server": name, "capacity_per_sec": round(rate), **row})
+        finally:
+            server.terminate()
+            server.wait()
+    print_table(f"/honeypot at {args.overload}x capacity for {args.seconds}s", rows)
+
+
+if __name__ == "__main__":
+    main()
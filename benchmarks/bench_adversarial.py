@@ -0,0 +1,68 @@
+"""
+Worst-case latency on adversarial 5000-char inputs (MAX_MESSAGE_LENGTH):
+long separator/digit/"@" runs that make backtracking patterns retry at
+every position.
+
+Run: python -m benchmarks.bench_adversarial
+"""
+import gc
+import random
+import string
+
+from app.detector import detect_scam
+from app.extractor import extract_all
+from app.pipeline import MAX_MESSAGE_LENGTH
+from benchmarks import legacy
+from benchmarks.harness import measure, print_table
+
+
+def adversarial_corpus(seed: int = 0) -> dict[str, str]:
+    rnd = random.Random(seed)
+    n = MAX_MESSAGE_LENGTH
+    return {
+        "alnum_no_at": "".join(rnd.choice(string.ascii_letters + string.digits) for _ in range(n)),
+        "upi_chars_no_at": ("a.b-c_9" * n)[:n],
+        "long_local_part": "a" * (n - 10) + "@bank",
+        "at_flood": ("ab@" * n)[:n],
+        "digit_flood": "9" * n,
+        "digit_space_flood": ("9 " * n)[:n],
+        "separator_flood": ("12-3.4 (5) " * n)[:n],
+        "plus_flood": ("+9" * n)[:n],
+        "url_flood": ("http://a" * n)[:n],
+    }
+
+
+def legacy_extract_all(text):
+    return {
+        "upi_ids": legacy.extract_upi_ids(text),
+        "bank_accounts": legacy.extract_bank_accounts(text),
+        "phone_numbers": legacy.extract_phone_numbers(text),
+        "urls": legacy.extract_urls(text),
+    }
+
+
+IMPLS = [
+    ("legacy extract", legacy_extract_all),
+    ("single-pass extract", extract_all),
+    ("legacy detect_scam", legacy.detect_scam),
+    ("detect_scam", detect_scam),
+]
+
+
+def main():
+    corpus = adversarial_corpus()
+    rows = []
+    for impl, fn in IMPLS:
+        for case, text in corpus.items():
+            gc.collect()  # keep earlier runs' garbage out of the worst case
+            stats = measure(fn, [text], rounds=20)
+            rows.append({"impl": impl, "input": case, "p50_us": stats["p50_us"], "max_us": stats["p99_us"]})
+    print_table(f"Adversarial inputs ({MAX_MESSAGE_LENGTH} chars)", rows)
+
+    for impl, _ in IMPLS:
+        worst = max((row for row in rows if row["impl"] == impl), key=lambda row: row["max_us"])
+        print(f"{impl}: worst case {worst['max_us'] / 1000:.2f} ms ({worst['input']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Offline corpus classification: detect_scam once per message against
+detect_scam_batch (block keyword scan + array scoring), with and without
+NumPy, on an archive of distinct messages and on one where campaign texts
+repeat. Results are checked to be identical.
+
+Run: python -m benchmarks.bench_batch_scoring [--count 100000] [--length 300]
+"""
+import argparse
+import random
+import time
+
+from app import batch
+from app.detector import detect_scam
+from benchmarks.corpus import generate_corpus
+from benchmarks.harness import print_table
+
+
+def timed(fn, messages: list[str]) -> tuple[float, list]:
+    t0 = time.perf_counter()
+    results = fn(messages)
+    return time.perf_counter() - t0, results
+
+
+def compare(name: str, messages: list[str]) -> dict:
+    loop_s, expected = timed(lambda ms: [detect_scam(m) for m in ms], messages)
+    row = {"archive": name, "messages": len(messages), "loop_msgs/s": round(len(messages) / loop_s)}
+
+    numpy = batch.np
+    for label, module in (("numpy", numpy), ("python", None)):
+        if label == "numpy" and numpy is None:
+            row["numpy_msgs/s"] = row["numpy_speedup"] = "n/a"
+            continue
+        batch.np = module
+        try:
+            elapsed, results = timed(batch.detect_scam_batch, messages)
+        finally:
+            batch.np = numpy
+        assert results == expected, f"{label} batch results differ from detect_scam"
+        row[f"{label}_msgs/s"] = round(len(messages) / elapsed)
+        row[f"{label}_speedup"] = round(loop_s / elapsed, 1)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--length", type=int, default=300)
+    args = parser.parse_args()
+
+    distinct = [m.text for m in generate_corpus(args.count, seed=1, length=args.length)]
+    # Campaign archive: a tenth as many texts, each sent about ten times
+    rnd = random.Random(2)
+    repeated = rnd.choices(distinct[:args.count // 10], k=args.count)
+    print_table("Batch scoring vs detect_scam per message", [
+        compare("distinct", distinct),
+        compare("repeated", repeated),
+    ])
+
+
+if __name__ == "__main__":
+    main()
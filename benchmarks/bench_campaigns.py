@@ -0,0 +1,111 @@
+"""
+Campaign clustering: how well near-duplicate variants of scam templates
+(other names, amounts, links, UPI IDs, an occasional edited word) land in one
+campaign, what fingerprinting costs per message, and assignment latency in
+an LSH table already holding tens of millions of band keys.
+
+Run: python -m benchmarks.bench_campaigns [--templates 2000] [--variants 20] [--slots 33554432]
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import time
+from array import array
+from collections import Counter
+
+from app.campaigns import CampaignIndex, CampaignTracker, fingerprint
+from benchmarks.harness import measure, print_table
+
+NAMES = ["Ravi", "Priya", "Anil", "Sunita", "Mohammed", "Kavya", "Arjun", "Fatima", "Rahul", "Deepa"]
+
+
+def make_templates(count: int, rnd: random.Random) -> list[list[str]]:
+    """
+    Templates of 20-40 words from a shared vocabulary, with placeholders.
+    """
+    vocabulary = ["".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(3, 9))) for _ in range(5000)]
+    templates = []
+    for _ in range(count):
+        words = rnd.choices(vocabulary, k=rnd.randint(20, 40))
+        for placeholder in ("{name}", "{amount}", "{link}", "{upi}"):
+            words.insert(rnd.randrange(len(words) + 1), placeholder)
+        templates.append(words)
+    return templates
+
+
+def variant(words: list[str], rnd: random.Random) -> str:
+    words = list(words)
+    if rnd.random() < 0.3:
+        # A reworded spot: one word dropped or replaced
+        i = rnd.randrange(len(words))
+        if not words[i].startswith("{"):
+            words[i] = rnd.choice(["", "kindly", "now"])
+    text = " ".join(w for w in words if w)
+    return text.format(
+        name=rnd.choice(NAMES),
+        amount=rnd.randint(99, 99999),
+        link=f"https://{''.join(rnd.choices(string.ascii_lowercase, k=8))}.in/{rnd.randint(1, 9999)}",
+        upi=f"{''.join(rnd.choices(string.ascii_lowercase, k=6))}{rnd.randint(1, 99)}@ybl",
+    )
+
+
+def clustering(templates: int, variants: int) -> dict:
+    rnd = random.Random(0)
+    plays = [(t, variant(words, rnd)) for t, words in enumerate(make_templates(templates, rnd)) for _ in range(variants)]
+    rnd.shuffle(plays)
+    tracker = CampaignTracker(CampaignIndex(slots=2 ** 20, max_campaigns=10 ** 6))
+    t0 = time.perf_counter()
+    ids = asyncio.run(tracker.assign_many([(text, "phishing") for _, text in plays]))
+    elapsed = time.perf_counter() - t0
+
+    by_template = {}
+    by_campaign = {}
+    for (t, _), campaign in zip(plays, ids):
+        by_template.setdefault(t, Counter())[campaign] += 1
+        by_campaign.setdefault(campaign, set()).add(t)
+    # Recall: variants in their template's main campaign; purity: campaigns holding one template
+    recall = sum(c.most_common(1)[0][1] for c in by_template.values()) / len(plays)
+    purity = sum(len(t) == 1 for t in by_campaign.values()) / len(by_campaign)
+    return {
+        "messages": len(plays),
+        "campaigns": len(by_campaign),
+        "recall": round(recall, 4),
+        "purity": round(purity, 4),
+        "us_per_message": round(elapsed / len(plays) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates", type=int, default=2000)
+    parser.add_argument("--variants", type=int, default=20)
+    parser.add_argument("--slots", type=int, default=2 ** 25)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    print_table("Clustering quality", [clustering(args.templates, args.variants)])
+
+    # A full table: every slot holds a band key, so every new key evicts one
+    index = CampaignIndex(slots=args.slots)
+    slots = len(index.keys)
+    index.keys = array("Q", os.urandom(8 * slots))
+    index.campaigns_of = array("Q", os.urandom(8 * slots))
+    rnd = random.Random(1)
+    templates = make_templates(args.queries // 10, rnd)
+    messages = [variant(words, rnd) for words in templates for _ in range(10)]
+    rnd.shuffle(messages)
+    keys = [fingerprint(m) for m in messages]
+    now = time.time()
+
+    rows = [
+        {"case": "fingerprint", **measure(fingerprint, messages)},
+        {"case": "assign (new + joins)", **measure(lambda k: index.assign_sync(k, "phishing", now), keys, rounds=1)},
+        {"case": "assign (repeat)", **measure(lambda k: index.assign_sync(k, "phishing", now), keys, rounds=1)},
+    ]
+    print_table(f"Latency, table of {slots} band keys ({slots * 16 / 2 ** 20:.0f} MiB)", rows)
+
+
+if __name__ == "__main__":
+    main()
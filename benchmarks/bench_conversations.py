@@ -0,0 +1,113 @@
+"""
+Conversation-level detection: per-message detection (the session kept only
+the last detected scam type) against signals accumulated across turns.
+
+Scam conversations drip one keyword per turn: mostly from their own scam
+type, sometimes from another type (e.g. "manager" in a job scam) and
+sometimes none. Accuracy is the share of conversations whose session ends
+with the right scam type (benign ones: still "unknown").
+The cost table times one turn (scan + advance) at growing conversation
+lengths; it should stay flat.
+
+Run: python -m benchmarks.bench_conversations [--conversations 2000] [--seed 0]
+"""
+import argparse
+import random
+
+from app.detector import KEYWORD_RULES, LINK_MARKERS, detect_scam, scan_message
+from app.memory import Session
+from benchmarks.corpus import BENIGN_REPLIES, FILLER
+from benchmarks.harness import measure, print_table
+
+KEYWORDS = {scam_type: keywords for scam_type, _, keywords in KEYWORD_RULES}
+
+
+def scam_conversation(rnd: random.Random, scam_type: str, turns: int) -> list[str]:
+    messages = []
+    for _ in range(turns):
+        roll = rnd.random()
+        if roll < 0.6:
+            keyword = rnd.choice(KEYWORDS[scam_type])
+        elif roll < 0.8:
+            keyword = rnd.choice(KEYWORDS[rnd.choice([t for t in KEYWORDS if t != scam_type])])
+        else:
+            keyword = None
+        text = rnd.choice(FILLER)
+        messages.append(f"{text} About the {keyword}." if keyword else text)
+    return messages
+
+
+def benign_conversation(rnd: random.Random, turns: int) -> list[str]:
+    # Everyday chat, now and then with a link
+    return [
+        f"{rnd.choice(BENIGN_REPLIES)} See {rnd.choice(LINK_MARKERS)}" if rnd.random() < 0.2 else rnd.choice(FILLER)
+        for _ in range(turns)
+    ]
+
+
+def per_message(messages: list[str]) -> str:
+    scam_type = "unknown"
+    for message in messages:
+        detected = detect_scam(message)["scam_type"]
+        if detected != "unknown":
+            scam_type = detected
+    return scam_type
+
+
+def accumulated(messages: list[str]) -> str:
+    session = Session("bench")
+    for message in messages:
+        session = session.advance(scan_message(message))
+    return session.scam_type
+
+
+def accuracy(conversations: int, turns: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    right = {"per_message": 0, "accumulated": 0}
+    false_positives = {"per_message": 0, "accumulated": 0}
+    benign = 0
+    for _ in range(conversations):
+        if rnd.random() < 0.2:
+            benign += 1
+            expected, messages = "unknown", benign_conversation(rnd, turns)
+        else:
+            expected = rnd.choice(list(KEYWORDS))
+            messages = scam_conversation(rnd, expected, turns)
+        for name, classify in (("per_message", per_message), ("accumulated", accumulated)):
+            result = classify(messages)
+            right[name] += result == expected
+            false_positives[name] += expected == "unknown" and result != "unknown"
+    return {
+        "turns": turns,
+        "per_message_acc": round(right["per_message"] / conversations, 3),
+        "accumulated_acc": round(right["accumulated"] / conversations, 3),
+        "per_message_fp": false_positives["per_message"],
+        "accumulated_fp": false_positives["accumulated"],
+        "benign": benign,
+    }
+
+
+def turn_cost(history: int, rounds: int) -> dict:
+    rnd = random.Random(history)
+    session = Session("bench")
+    for message in scam_conversation(rnd, "otp_fraud", history):
+        session = session.advance(scan_message(message))
+    messages = scam_conversation(rnd, "otp_fraud", 1000)
+    return {"history_turns": history, **measure(lambda m: session.advance(scan_message(m)), messages, rounds)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print_table("Conversation-level accuracy", [
+        accuracy(args.conversations, turns, args.seed) for turns in (1, 3, 6, 10, 20)
+    ])
+    print_table("Cost per turn", [turn_cost(history, args.rounds) for history in (0, 10, 100, 1000)])
+
+
+if __name__ == "__main__":
+    main()
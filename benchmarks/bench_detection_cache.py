@@ -0,0 +1,77 @@
+"""
+Detection cache on a campaign-style stream: a few thousand distinct texts,
+each blasted many times with Zipf-like popularity, as scam campaigns do.
+Compares scan_message + extract_all on every message against the same work
+through the detection cache (and, with --redis, through a fakeredis shared
+level with a cold local one, i.e. what a second worker sees).
+
+Run: python -m benchmarks.bench_detection_cache [--unique 2000] [--messages 50000] [--max-bytes 33554432]
+"""
+import argparse
+import asyncio
+import random
+
+from app.budget import AnalysisBudget
+from app.cache import DetectionCache
+from app.detector import scan_message
+from app.extractor import extract_all
+from app.pipeline import cached_scan, cached_extraction
+from benchmarks.corpus import generate_corpus
+from benchmarks.harness import measure, measure_async, print_table
+
+
+def campaign_stream(unique: int, messages: int, seed: int = 0) -> list[str]:
+    texts = [m.text for m in generate_corpus(unique, seed=seed)]
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(unique)]
+    return rng.choices(texts, weights=weights, k=messages)
+
+
+def uncached(message: str):
+    scan_message(message)
+    extract_all(message)
+
+
+def run_cached(cache: DetectionCache, stream: list[str], rounds: int) -> dict:
+    hits = 0
+
+    async def analyze(message: str):
+        nonlocal hits
+        analysis = await cache.lookup(message)
+        hits += analysis.hits is not None
+        budget = AnalysisBudget(None)
+        cached_scan(analysis, message, budget)
+        cached_extraction(analysis, message, budget)
+        await cache.store(analysis)
+
+    stats = asyncio.run(measure_async(analyze, stream, rounds))
+    lookups = len(stream) * rounds + min(100, len(stream))
+    return {**stats, "hit_rate": round(hits / lookups, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--unique", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--max-bytes", type=int, default=32 * 2 ** 20)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--redis", action="store_true", help="also measure a worker served by a shared fakeredis level")
+    args = parser.parse_args()
+
+    stream = campaign_stream(args.unique, args.messages)
+    rows = [{"benchmark": "uncached", **measure(uncached, stream, args.rounds)}]
+    rows.append({"benchmark": "cached", **run_cached(DetectionCache(args.max_bytes), stream, args.rounds)})
+    small = max(1, args.max_bytes // 100)
+    rows.append({"benchmark": f"cached ({small} B cap)", **run_cached(DetectionCache(small), stream, args.rounds)})
+    if args.redis:
+        import fakeredis
+        shared = fakeredis.FakeAsyncRedis(decode_responses=True)
+        run_cached(DetectionCache(args.max_bytes, shared), stream, args.rounds)
+        rows.append({"benchmark": "cached (shared level)", **run_cached(DetectionCache(args.max_bytes, shared), stream, args.rounds)})
+    for row in rows:
+        row.setdefault("hit_rate", "")
+    print_table(f"{args.messages} messages, {args.unique} distinct texts", rows)
+
+
+if __name__ == "__main__":
+    main()
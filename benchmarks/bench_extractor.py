@@ -0,0 +1,39 @@
+"""
+Extraction throughput: single-pass engine vs. the old four-regex code.
+
+Run: python -m benchmarks.bench_extractor
+"""
+from app.extractor import extract_all
+from benchmarks import legacy
+from benchmarks.harness import measure, print_table
+
+MESSAGES = [
+    "Urgent! Login immediately to verify account: http://scam-link.com/login",
+    "Pay the processing fee to loanhelp.desk@okaxis or call +91 98765 43210 today.",
+    "Transfer Rs 4999 to account no. 123456789012 IFSC SBIN0001234, then share the receipt.",
+    "Refund pending. Scan QR at https://refund-portal.in/claim?id=8842 or pay to 9876543210@ybl",
+    "HR Manager here. Registration fee 1500 to A/C 98765432101, call 555-123-4567 after payment.",
+    "Hey, just checking in. How are you? Are we still meeting for lunch tomorrow at the usual place?",
+    "Your parcel is held by customs. Call officer on 9123456780 or +1-555-123-4567, case 20231145.",
+    "Claim cashback on phonepe: https://bit.ly/3xYz or send 1 rupee to cashback.win@paytm",
+] * 25
+
+
+def legacy_extract_all(text):
+    return {
+        "upi_ids": legacy.extract_upi_ids(text),
+        "bank_accounts": legacy.extract_bank_accounts(text),
+        "phone_numbers": legacy.extract_phone_numbers(text),
+        "urls": legacy.extract_urls(text),
+    }
+
+
+def main():
+    rows = []
+    for name, fn in (("legacy (4 regex passes)", legacy_extract_all), ("single pass", extract_all)):
+        rows.append({"impl": name, **measure(fn, MESSAGES)})
+    print_table("Full extraction per message", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Known-bad feed lookups: latency of FeedIndex hits, Bloom-filtered misses and
+parent-domain matches against a large feed file, next to a Python set of the
+same keys, and the resident memory each costs a worker. Memory is measured in
+fresh processes: the feed's pages are file-backed (shared by every worker
+through the page cache), the set is private to each worker.
+
+Run: python -m benchmarks.bench_feeds [--entries 1000000] [--queries 20000]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from app.feeds import FeedIndex, build_feed, feed_key
+from benchmarks.harness import measure, print_table
+
+KINDS = ["upi_id", "phone_number", "domain", "bank_account"]
+
+
+def value_of(kind: str, i: int) -> str:
+    if kind == "upi_id":
+        return f"payee{i}@ybl"
+    if kind == "phone_number":
+        return f"9{i:09d}"
+    if kind == "domain":
+        return f"scam{i}.example"
+    return f"{10 ** 11 + i}"
+
+
+def entries(count: int):
+    for i in range(count):
+        kind = KINDS[i % len(KINDS)]
+        yield kind, value_of(kind, i), "phishing"
+
+
+def memory_kb() -> dict:
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def worker_memory(path: str, mode: str, probes: int, results):
+    """
+    Runs in a fresh process: RSS growth from opening the feed (or loading it
+    into a set) and answering `probes` lookups.
+    """
+    before = memory_kb()
+    rng = random.Random(2)
+    count = int(path.rsplit(".", 2)[1])
+    keys = [feed_key(KINDS[i % 4], value_of(KINDS[i % 4], i)) for i in (rng.randrange(count) for _ in range(probes))]
+    feed = FeedIndex(path)
+    if mode == "set":
+        data, offsets, base = feed.map, feed.offsets, feed.records_start
+        table = {data[base + offsets[i]:base + offsets[i + 1] - 1] for i in range(len(feed))}
+        assert all(key in table for key in keys)
+    else:
+        assert all(feed.find(key) for key in keys)
+    after = memory_kb()
+    results.put({name: after[name] - before[name] for name in after})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"feeds.{args.entries}.bin")
+        t0 = time.perf_counter()
+        build_feed(entries(args.entries), path)
+        build_s = time.perf_counter() - t0
+        print(f"Built {args.entries} entries in {build_s:.1f}s, {os.path.getsize(path) / 2 ** 20:.1f} MiB")
+
+        feed = FeedIndex(path)
+        rng = random.Random(1)
+        listed = [(KINDS[i % 4], value_of(KINDS[i % 4], i)) for i in (rng.randrange(args.entries) for _ in range(args.queries))]
+        unlisted = [(kind, value.replace("9", "8", 1) + "x") for kind, value in listed]
+        domains = [f"login.secure.{value_of('domain', i * 4 + 2)}" for i in (rng.randrange(args.entries // 4) for _ in range(args.queries))]
+        table = {feed_key(kind, value) for kind, value, _ in entries(args.entries)}
+
+        rows = [
+            {"case": "feed hit", **measure(lambda q: feed.lookup(*q), listed)},
+            {"case": "feed miss (Bloom)", **measure(lambda q: feed.lookup(*q), unlisted)},
+            {"case": "feed parent domain", **measure(lambda host: feed.lookup("domain", host), domains)},
+            {"case": "message hits()", **measure(feed.hits, [
+                {"upi_ids": [f"payee{i}@ybl"], "phone_numbers": ["+91 9000000001"], "urls": [f"http://{host}/kyc"]}
+                for i, host in zip(range(len(domains)), domains)
+            ])},
+            {"case": "python set hit", **measure(lambda q: feed_key(*q) in table, listed)},
+        ]
+        print_table(f"Lookup latency, {args.entries} entries", [
+            {k: v for k, v in row.items() if k in ("case", "ops_per_sec", "p50_us", "p99_us")} for row in rows
+        ])
+        feed.close()
+        del table
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        memory = []
+        for mode in ("feed", "set"):
+            process = context.Process(target=worker_memory, args=(path, mode, args.queries, results))
+            process.start()
+            memory.append({"worker": mode, **{f"{k}_MiB": round(v / 1024, 1) for k, v in results.get().items()}})
+            process.join()
+        print_table("Resident memory added per worker (RssFile pages are shared)", memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Cross-session indicator index: what the /honeypot hot path pays to record
+a message's indicators (a buffer append), how fast the background flush
+applies them, and lookup latency once the index holds many indicators.
+The in-process index is measured at full size; --redis adds a (much
+smaller, fakeredis is slow to fill) Redis-backed run.
+
+Run: python -m benchmarks.bench_indicators [--sessions 200000] [--indicators 1000000] [--redis]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.indicators import IndicatorIndex, IndicatorRecorder, RedisIndicatorIndex
+from benchmarks.harness import measure, measure_async, print_table
+
+
+def finds(sessions: int, indicators: int, seed: int = 0) -> list[tuple[str, dict]]:
+    """
+    Each session reveals one UPI ID, one phone and one link, drawn with a
+    skew so campaign indicators recur across many sessions.
+    """
+    rng = random.Random(seed)
+    pool = indicators // 3
+
+    def pick() -> int:
+        return min(pool - 1, int(rng.paretovariate(1.2)) - 1 + rng.randrange(pool) * (rng.random() < 0.5))
+
+    return [
+        (f"session-{s}", {
+            "upi_ids": [f"payee{pick()}@ybl"],
+            "phone_numbers": [f"9{pick():09d}"],
+            "urls": [f"http://scam{pick()}.example/login"],
+        })
+        for s in range(sessions)
+    ]
+
+
+async def run(index, plays: list, queries: int) -> dict:
+    recorder = IndicatorRecorder(index, max_pending=len(plays))
+    t0 = time.perf_counter()
+    for session_id, found in plays:
+        recorder.record(session_id, found)
+    record_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sightings = await recorder.flush()
+    flush_s = time.perf_counter() - t0
+
+    rng = random.Random(1)
+    targets = [plays[rng.randrange(len(plays))][1]["upi_ids"][0] for _ in range(queries)]
+    lookups = await measure_async(lambda value: recorder.lookup("upi_id", value, limit=20), targets, rounds=1)
+    return {
+        "record_us_per_msg": round(record_s / len(plays) * 1e6, 2),
+        "flush_sightings/s": round(sightings / flush_s),
+        "lookup_p50_us": lookups["p50_us"],
+        "lookup_p99_us": lookups["p99_us"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--indicators", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--redis", action="store_true")
+    args = parser.parse_args()
+
+    rows = []
+    plays = finds(args.sessions, args.indicators)
+    index = IndicatorIndex(max_entries=args.indicators)
+    rows.append({"backend": "memory", **asyncio.run(run(index, plays, args.queries)), "entries": len(index)})
+    if args.redis:
+        import fakeredis
+        small = plays[:max(1, args.sessions // 50)]
+        rows.append({"backend": "fakeredis", **asyncio.run(run(
+            RedisIndicatorIndex(fakeredis.FakeAsyncRedis(decode_responses=True)), small, args.queries // 10
+        )), "entries": ""})
+    print_table(f"{args.sessions} sessions", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Rate limiter cost and memory under a spray of distinct client IPs.
+
+Feeds N distinct IPs (default 1M) through the GCRA limiter and the old
+timestamp-list limiter, reporting per-request cost and traced memory per
+100k-IP chunk. Also times a single hot client at the limit, where the old
+limiter rebuilt a list of `limit` timestamps on every call.
+
+Run: python -m benchmarks.bench_limiter [--ips 1000000] [--max-clients 100000]
+"""
+import argparse
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from app.limiter import RateLimiter
+from benchmarks import legacy
+from benchmarks.harness import print_table
+
+
+def ip(i: int) -> str:
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def run(hit, total: int, chunk: int, trace: bool) -> list[tuple[float, int]]:
+    """Returns (ns per request, traced bytes) for every chunk."""
+    keys = [ip(i) for i in range(chunk)]
+    results = []
+    for start in range(0, total, chunk):
+        prefix = f"{start // chunk}."
+        batch = [prefix + k for k in keys]
+        t0 = time.perf_counter()
+        for key in batch:
+            hit(key)
+        elapsed = time.perf_counter() - t0
+        del batch
+        results.append((elapsed / chunk * 1e9, tracemalloc.get_traced_memory()[0] if trace else 0))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ips", type=int, default=1_000_000)
+    parser.add_argument("--max-clients", type=int, default=100_000)
+    args = parser.parse_args()
+    chunk = 100_000
+
+    def gcra_factory():
+        limiter = RateLimiter(requests_per_minute=60, max_clients=args.max_clients)
+        return limiter.hit
+
+    def legacy_factory():
+        limiter = legacy.RateLimiter(requests_per_minute=60)
+        return lambda key: limiter.check_rate_limit(SimpleNamespace(client=SimpleNamespace(host=key)))
+
+    timings = {name: run(factory(), args.ips, chunk, trace=False)
+               for name, factory in (("gcra", gcra_factory), ("legacy", legacy_factory))}
+
+    memory = {}
+    for name, factory in (("gcra", gcra_factory), ("legacy", legacy_factory)):
+        tracemalloc.start()
+        memory[name] = run(factory(), args.ips, chunk, trace=True)
+        tracemalloc.stop()
+
+    rows = []
+    for i in range(len(timings["gcra"])):
+        rows.append({
+            "distinct_ips": (i + 1) * chunk,
+            "gcra_ns/req": round(timings["gcra"][i][0]),
+            "legacy_ns/req": round(timings["legacy"][i][0]),
+            "gcra_MB": round(memory["gcra"][i][1] / 2**20, 1),
+            "legacy_MB": round(memory["legacy"][i][1] / 2**20, 1),
+        })
+    print_table(f"Distinct-IP spray (GCRA max_clients={args.max_clients})", rows)
+
+    # One client hammering at its limit
+    gcra = RateLimiter(requests_per_minute=600)
+    old = legacy.RateLimiter(requests_per_minute=600)
+    request = SimpleNamespace(client=SimpleNamespace(host="1.1.1.1"))
+    rows = []
+    for name, fn in (("gcra", lambda: gcra.hit("1.1.1.1")), ("legacy", lambda: old.check_rate_limit(request))):
+        n = 20_000
+        t0 = time.perf_counter()
+        for _ in range(n):
+            try:
+                fn()
+            except Exception:
+                pass
+        rows.append({"impl": name, "ns/req": round((time.perf_counter() - t0) / n * 1e9)})
+    print_table("Single client at a 600/min limit", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Response serialization: building a /honeypot response and turning it into
+bytes, per response, the way it was done before (nested pydantic models,
+validated on construction, then model_dump_json) against plain data
+serialized with orjson and with the json module fallback.
+
+Inputs are real responses: corpus messages scanned, extracted and advanced
+through a few turns of a session each, with cumulative intelligence on
+every other one. The persona reply is generated in every variant, so the
+difference is what construction and serialization cost. Every variant is
+checked to produce the same bytes first.
+
+Run: python -m benchmarks.bench_serialization [--count 5000] [--rounds 3]
+"""
+import argparse
+import time
+
+from app import pipeline
+from app.agent import generate_response
+from app.detector import scan_message
+from app.extractor import extract_all
+from app.memory import Session
+from app.models import Explanation, ExtractedIntelligence, HoneypotResponse, SessionState
+from benchmarks.corpus import generate_corpus
+from benchmarks.harness import measure, print_table
+
+
+def model_response(state: Session, extracted_data: ExtractedIntelligence | None = None,
+                   partial: bool = False, cumulative: dict[str, list[str]] | None = None,
+                   campaign_id: str | None = None) -> HoneypotResponse:
+    # build_response as it was, building the response models
+    scam_type = state.scam_type
+    if scam_type != "unknown":
+        persona, next_msg = generate_response(scam_type, state.stage, state.session_id, state.turn)
+        expl_summary = f"Detected {scam_type} pattern with {state.confidence} confidence."
+        expl_signals = state.signals
+    else:
+        persona = "none"
+        next_msg = ""
+        extracted_data = None
+        expl_summary = "No scam indicators detected."
+        expl_signals = []
+    return HoneypotResponse(
+        is_scam=(scam_type != "unknown"),
+        scam_type=scam_type,
+        confidence=state.confidence,
+        persona_used=persona,
+        next_message=next_msg,
+        extracted_intelligence=extracted_data or ExtractedIntelligence(),
+        session_state=SessionState(session_id=state.session_id, turn=state.turn, stage=state.stage),
+        explanation=Explanation(signals=expl_signals, summary=expl_summary),
+        cumulative_intelligence=ExtractedIntelligence(**cumulative) if cumulative is not None else None,
+        campaign_id=campaign_id,
+        partial=partial
+    )
+
+
+def make_inputs(count: int) -> list[tuple]:
+    inputs = []
+    for i, message in enumerate(generate_corpus(count, seed=9)):
+        hits = scan_message(message.text)
+        state = Session(f"bench-{i:06d}")
+        for _ in range(1 + i % 6):
+            state = state.advance(hits)
+        extracted = extract_all(message.text)
+        cumulative = extracted if i % 2 else None
+        campaign_id = f"c{i % 97:04x}" if i % 3 else None
+        inputs.append((state, ExtractedIntelligence(**extracted), False, cumulative, campaign_id))
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.count)
+
+    def models(item):
+        return model_response(*item).model_dump_json().encode()
+
+    def plain(item):
+        return pipeline.dump_json(pipeline.build_response(*item))
+
+    orjson = pipeline.orjson
+    variants = [("models + model_dump_json (before)", models)]
+    if orjson is not None:
+        variants.append(("plain data + orjson", plain))
+    variants.append(("plain data + json", plain))
+
+    rows = []
+    for name, fn in variants:
+        pipeline.orjson = orjson if "orjson" in name else None
+        try:
+            assert all(fn(item) == models(item) for item in inputs), f"{name}: bytes differ"
+            cpu = time.process_time()
+            stats = measure(fn, inputs, args.rounds)
+            cpu = time.process_time() - cpu
+        finally:
+            pipeline.orjson = orjson
+        rows.append({"variant": name, **stats,
+                     "cpu_us_per_response": round(cpu / ((len(inputs) * args.rounds) + min(100, len(inputs))) * 1e6, 2)})
+    baseline = rows[0]["cpu_us_per_response"]
+    for row in rows:
+        row["cpu_saved_us"] = round(baseline - row["cpu_us_per_response"], 2)
+    print_table(f"Build + serialize one response ({args.count} responses x {args.rounds} rounds)", rows)
+
+
+if __name__ == "__main__":
+    main()
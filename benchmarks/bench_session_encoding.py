@@ -0,0 +1,61 @@
+"""
+Session record encoding: the legacy JSON dict against the compact Session
+format, in stored bytes per session, encode/decode throughput and the size
+of the in-process object.
+
+Run: python -m benchmarks.bench_session_encoding [--sessions 20000] [--rounds 3]
+"""
+import argparse
+import json
+import random
+import sys
+
+from app.memory import SCAM_TYPE_NAMES, Session, stage_for_turn
+from benchmarks.harness import measure, print_table
+
+
+def make_sessions(count: int, seed: int = 0) -> list[Session]:
+    rng = random.Random(seed)
+    sessions = []
+    for i in range(count):
+        turn = rng.randint(1, 40)
+        sessions.append(Session(f"{i:08x}-5e55-4a1c-9d2b-c0ffee{i:06x}", turn, stage_for_turn(turn),
+                                rng.choice(SCAM_TYPE_NAMES), version=turn))
+    return sessions
+
+
+def deep_size(obj) -> int:
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sys.getsizeof(v) for v in obj.values() if not isinstance(v, str))
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    sessions = make_sessions(args.sessions)
+    dicts = [s.to_dict() for s in sessions]
+    json_records = [json.dumps(d) for d in dicts]
+    compact_records = [(s.session_id, s.encode()) for s in sessions]
+
+    # Strings are interned/shared in both forms, so only the containers are counted
+    print_table("Stored size per session", [
+        {"format": "json", "record_bytes": round(sum(map(len, json_records)) / len(sessions), 1),
+         "object_bytes": round(sum(map(deep_size, dicts)) / len(dicts), 1)},
+        {"format": "compact", "record_bytes": round(sum(len(r) for _, r in compact_records) / len(sessions), 1),
+         "object_bytes": round(sum(map(deep_size, sessions)) / len(sessions), 1)},
+    ])
+    print_table("Encode/decode", [
+        {"benchmark": "json.dumps", **measure(json.dumps, dicts, args.rounds)},
+        {"benchmark": "Session.encode", **measure(Session.encode, sessions, args.rounds)},
+        {"benchmark": "json.loads", **measure(json.loads, json_records, args.rounds)},
+        {"benchmark": "Session.decode", **measure(lambda r: Session.decode(*r), compact_records, args.rounds)},
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Cost per turn of collecting a session's intelligence over long (100+ turn)
+conversations: merging each turn's finds into capped per-session sets
+(SessionManager.merge_intelligence, in memory and on Redis via fakeredis)
+against rewriting the whole collection as one JSON blob every turn.
+
+Each turn finds one to three values drawn from a per-session pool, so new
+values keep arriving while repeats are common. The table shows the mean
+cost of a turn at increasing turn numbers; merging should stay flat.
+
+Run: python -m benchmarks.bench_session_intel [--sessions 20] [--turns 200]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import fakeredis
+
+from app.memory import INTEL_FIELDS, SessionManager
+from benchmarks.harness import print_table
+
+WINDOWS = [(1, 10), (50, 60), (100, 110), (190, 200), (490, 500)]
+
+
+def make_finds(sessions: int, turns: int, seed: int = 0) -> list[list[dict[str, list[str]]]]:
+    rng = random.Random(seed)
+    plays = []
+    for s in range(sessions):
+        pools = {field: [f"{field}-{s}-{i}" for i in range(turns)] for field in INTEL_FIELDS}
+        plays.append([
+            {field: rng.sample(pools[field], rng.randint(0, 1)) for field in rng.sample(INTEL_FIELDS, rng.randint(1, 3))}
+            for _ in range(turns)
+        ])
+    return plays
+
+
+async def run_merge(manager: SessionManager, plays: list, cumulative: bool) -> list[float]:
+    turns = len(plays[0])
+    totals = [0.0] * turns
+    for s, finds in enumerate(plays):
+        session_id = f"bench-intel-{s}"
+        for turn, found in enumerate(finds):
+            await manager.advance_turn(session_id, 0)
+            t0 = time.perf_counter()
+            await manager.merge_intelligence(session_id, found, cumulative)
+            totals[turn] += time.perf_counter() - t0
+    return [t / len(plays) for t in totals]
+
+
+async def run_blob(client, plays: list) -> list[float]:
+    """
+    The whole collection in one value: read, merge, write back every turn.
+    With client=None the blob lives in a dict (in-process JSON encode/decode only).
+    """
+    storage = {}
+    turns = len(plays[0])
+    totals = [0.0] * turns
+    for s, finds in enumerate(plays):
+        key = f"bench-intel-blob:{s}"
+        for turn, found in enumerate(finds):
+            t0 = time.perf_counter()
+            raw = await client.get(key) if client else storage.get(key)
+            collected = json.loads(raw) if raw else {field: [] for field in INTEL_FIELDS}
+            for field, values in found.items():
+                known = collected[field]
+                known.extend(v for v in values if v not in known)
+            raw = json.dumps(collected)
+            if client:
+                await client.set(key, raw)
+            else:
+                storage[key] = raw
+            totals[turn] += time.perf_counter() - t0
+    return [t / len(plays) for t in totals]
+
+
+def window_rows(name: str, per_turn: list[float]) -> dict:
+    row = {"strategy": name}
+    for first, last in WINDOWS:
+        if last <= len(per_turn):
+            row[f"turns_{first}-{last}_us"] = round(sum(per_turn[first - 1:last]) / (last - first + 1) * 1e6, 1)
+    return row
+
+
+async def run(sessions: int, turns: int) -> list[dict]:
+    plays = make_finds(sessions, turns)
+    return [
+        window_rows("blob (in-process)", await run_blob(None, plays)),
+        window_rows("sets (in-process)", await run_merge(SessionManager(), plays, False)),
+        window_rows("sets + cumulative (in-process)", await run_merge(SessionManager(), plays, True)),
+        window_rows("blob (fakeredis)", await run_blob(fakeredis.FakeAsyncRedis(decode_responses=True), plays)),
+        window_rows("sets (fakeredis)", await run_merge(
+            SessionManager(redis_client=fakeredis.FakeAsyncRedis(decode_responses=True)), plays, False)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+    print_table(f"Mean cost per turn, {args.sessions} sessions x {args.turns} turns", asyncio.run(run(args.sessions, args.turns)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Soak test of the in-memory session store: RSS while millions of distinct
+session_ids each play one turn.
+
+"cap" runs the default 24h TTL, so only the LRU cap bounds the store.
+"ttl" runs a simulated clock (--rate new sessions per second) with a short
+TTL and a sweep every simulated second, so expiry alone keeps the store bounded.
+"legacy" is the old plain dict (skip it with --no-legacy; it grows without bound).
+
+Run: python -m benchmarks.bench_sessions [--sessions 2000000] [--max-entries 100000]
+"""
+import argparse
+import gc
+import os
+import time
+
+from app.detector import scan_message
+from app.memory import LocalSessionStore, Session, stage_for_turn
+from benchmarks.harness import print_table
+
+PHISHING = scan_message("verify your kyc")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+
+
+def soak(total: int, chunk: int, turn, size) -> list[dict]:
+    rows = []
+    for start in range(0, total, chunk):
+        t0 = time.perf_counter()
+        for i in range(start, start + chunk):
+            turn(f"{i:08x}-5e55-4a1c-9d2b-c0ffee{i:06x}", i)
+        elapsed = time.perf_counter() - t0
+        gc.collect()
+        rows.append({"sessions": start + chunk, "entries": size(), "rss_mb": rss_mb(),
+                     "ns_per_turn": round(elapsed / chunk * 1e9)})
+    return rows
+
+
+def run_store(store: LocalSessionStore, total: int, chunk: int, rate: float | None) -> list[dict]:
+    sweep_every = int(rate * store.sweep_interval) if rate else 0
+
+    def turn(session_id, i):
+        # Same steps as SessionManager.advance_turn on the in-memory path
+        now = i / rate if rate else None
+        store.set((store.get(session_id, now) or Session(session_id)).advance(PHISHING), now)
+        if sweep_every and i % sweep_every == 0:
+            # What the background sweeper does every sweep_interval
+            while store.sweep(now=now):
+                pass
+
+    return soak(total, chunk, turn, store.__len__)
+
+
+def run_legacy(total: int, chunk: int) -> list[dict]:
+    storage = {}
+
+    def turn(session_id, i):
+        state = storage.get(session_id, {})
+        turn = state.get("turn", 0) + 1
+        storage[session_id] = {**state, "turn": turn, "stage": stage_for_turn(turn),
+                               "scam_type": "phishing", "session_id": session_id}
+
+    return soak(total, chunk, turn, storage.__len__)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=2_000_000)
+    parser.add_argument("--max-entries", type=int, default=100_000)
+    parser.add_argument("--ttl", type=float, default=5.0, help="TTL (simulated seconds) for the ttl run")
+    parser.add_argument("--rate", type=float, default=10_000, help="new sessions per simulated second")
+    parser.add_argument("--no-legacy", action="store_true")
+    args = parser.parse_args()
+    chunk = max(1, args.sessions // 10)
+
+    print(f"Baseline RSS: {rss_mb()} MB")
+    print_table("LRU cap (24h TTL)", run_store(LocalSessionStore(max_entries=args.max_entries), args.sessions, chunk, None))
+    gc.collect()
+    ttl_store = LocalSessionStore(ttl=args.ttl, max_entries=args.sessions, sweep_interval=1.0)
+    print_table(f"TTL expiry ({args.ttl}s TTL, {args.rate:.0f} sessions/s)", run_store(ttl_store, args.sessions, chunk, args.rate))
+    if not args.no_legacy:
+        gc.collect()
+        print_table("Legacy dict", run_legacy(args.sessions, chunk))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Streaming ingest: /honeypot/stream against one /honeypot request per
+message, through a real uvicorn server (started as a subprocess) over
+loopback TCP. Reports throughput, per-message latency (from the message
+being written to its result line arriving) and the server's peak RSS.
+
+The stream client writes the body as chunked NDJSON while it reads result
+lines; "window" is how many messages it lets be in flight (none: as fast
+as the socket accepts them, held back only by the server's flow control).
+
+Run: python -m benchmarks.bench_stream [--count 5000] [--connections 8] [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.harness import percentile, print_table
+
+API_KEY = "bench"
+SESSIONS = 50
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ, API_KEY=API_KEY, RATE_LIMIT_ENABLED="false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def peak_rss_mb(pid: int) -> float | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def row(mode: str, latencies: list[float], elapsed: float, pid: int) -> dict:
+    latencies.sort()
+    return {
+        "mode": mode,
+        "msgs_per_sec": round(len(latencies) / elapsed),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "server_peak_rss_mb": peak_rss_mb(pid),
+    }
+
+
+async def per_request(port: int, bodies: list[dict], connections: int) -> tuple[list[float], float]:
+    latencies = []
+    items = iter(bodies)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+
+        async def worker():
+            for body in items:
+                t0 = time.perf_counter()
+                response = await client.post("/honeypot", json=body, headers={"x-api-key": API_KEY})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(connections)))
+        return latencies, time.perf_counter() - t0
+
+
+async def stream(port: int, bodies: list[dict], window: int | None) -> tuple[list[float], float]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"POST /honeypot/stream HTTP/1.1\r\nHost: bench\r\nx-api-key: {API_KEY}\r\n"
+        "Content-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n".encode()
+    )
+    sent = []
+    latencies = []
+    in_flight = asyncio.Semaphore(window) if window else None
+
+    async def send():
+        for body in bodies:
+            if in_flight:
+                await in_flight.acquire()
+            line = json.dumps(body).encode() + b"\n"
+            sent.append(time.perf_counter())
+            writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def receive():
+        status = await reader.readline()
+        assert b" 200 " in status, status
+        await reader.readuntil(b"\r\n\r\n")
+        pending = b""
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            if size == 0:
+                break
+            pending += (await reader.readexactly(size + 2))[:-2]
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                latencies.append(time.perf_counter() - sent[len(latencies)])
+                assert b'"error"' not in line[:10], line
+                if in_flight:
+                    in_flight.release()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(send(), receive())
+    elapsed = time.perf_counter() - t0
+    writer.close()
+    assert len(latencies) == len(bodies)
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    bodies = [
+        {"message": m.text, "session_id": f"bench-{i % SESSIONS}"}
+        for i, m in enumerate(generate_corpus(args.count, seed=1))
+    ]
+    server = start_server(args.port)
+    try:
+        # Warm-up: imports, caches and the first sessions
+        asyncio.run(per_request(args.port, bodies[:200], 1))
+        cases = [
+            ("per-request, 1 connection", lambda: per_request(args.port, bodies, 1)),
+            (f"per-request, {args.connections} connections", lambda: per_request(args.port, bodies, args.connections)),
+            ("stream, window 1", lambda: stream(args.port, bodies, 1)),
+            (f"stream, window {args.connections}", lambda: stream(args.port, bodies, args.connections)),
+            ("stream, no window", lambda: stream(args.port, bodies, None)),
+        ]
+        rows = [row(mode, *asyncio.run(case()), server.pid) for mode, case in cases]
+    finally:
+        server.terminate()
+        server.wait()
+    print_table(f"/honeypot/stream vs /honeypot ({args.count} messages, uvicorn on loopback)", rows)
+
+
+if __name__ == "__main__":
+    main()
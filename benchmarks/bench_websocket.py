@@ -0,0 +1,159 @@
+"""
+Live conversations: one /honeypot request per scammer turn against one
+/honeypot/ws connection per conversation, with sessions in Redis.
+
+Both are driven in process at the ASGI level (no client library or sockets
+in the timings). Redis is fakeredis with a simulated network round trip
+(--rtt-ms) added to every command and pipeline; round trips are counted
+from the honeypot_redis_seconds histogram. Rate limiting is off for both.
+
+Run: python -m benchmarks.bench_websocket [--conversations 100] [--turns 40] [--rtt-ms 0.5]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import fakeredis
+from redis.asyncio.client import Pipeline, Redis
+
+from app import memory
+from app.config import settings
+from app.main import app
+from app.memory import SessionManager
+from app.metrics import REDIS_SECONDS
+from benchmarks.corpus import generate_corpus
+from benchmarks.harness import percentile, print_table
+
+API_KEY = "bench"
+HEADERS = [(b"host", b"bench"), (b"x-api-key", API_KEY.encode())]
+
+
+def simulate_rtt(seconds: float):
+    for cls, name in ((Redis, "execute_command"), (Pipeline, "execute")):
+        original = getattr(cls, name)
+
+        async def delayed(self, *args, _original=original, **kwargs):
+            if seconds:
+                await asyncio.sleep(seconds)
+            return await _original(self, *args, **kwargs)
+
+        setattr(cls, name, delayed)
+
+
+def round_trips() -> int:
+    # Every observation of the histogram is one round trip
+    return int(sum(
+        sum(s.registry.values[s.offset:s.offset + len(s.buckets) + 1]) for s in REDIS_SECONDS.series.values()
+    ))
+
+
+async def http_turn(body: dict) -> dict:
+    data = json.dumps(body).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/honeypot", "raw_path": b"/honeypot", "query_string": b"", "root_path": "",
+        "headers": HEADERS + [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())],
+        "client": ("127.0.0.1", 40000), "server": ("bench", 80),
+    }
+    requests = [{"type": "http.request", "body": data, "more_body": False}]
+    chunks = []
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return json.loads(b"".join(chunks))
+
+
+class WebSocketClient:
+    def __init__(self, session_id: str):
+        self.scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "ws",
+            "path": "/honeypot/ws", "raw_path": b"/honeypot/ws", "query_string": f"session_id={session_id}".encode(),
+            "root_path": "", "headers": HEADERS, "client": ("127.0.0.1", 40000), "server": ("bench", 80),
+            "subprotocols": [],
+        }
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        self.task = None
+
+    async def connect(self):
+        await self.inbox.put({"type": "websocket.connect"})
+        self.task = asyncio.create_task(app(self.scope, self.inbox.get, self.outbox.put))
+        accepted = await self.outbox.get()
+        assert accepted["type"] == "websocket.accept", accepted
+
+    async def turn(self, body: dict) -> dict:
+        await self.inbox.put({"type": "websocket.receive", "text": json.dumps(body)})
+        return json.loads((await self.outbox.get())["text"])
+
+    async def close(self):
+        await self.inbox.put({"type": "websocket.disconnect", "code": 1000})
+        await self.task
+
+
+async def run(mode: str, conversations: list[list[str]]) -> dict:
+    latencies = []
+    trips = round_trips()
+    t0 = time.perf_counter()
+    for c, messages in enumerate(conversations):
+        session_id = f"{mode}-{c}"
+        if mode == "websocket":
+            client = WebSocketClient(session_id)
+            await client.connect()
+        for message in messages:
+            started = time.perf_counter()
+            if mode == "websocket":
+                result = await client.turn({"message": message})
+            else:
+                result = await http_turn({"message": message, "session_id": session_id})
+            latencies.append(time.perf_counter() - started)
+            assert "error" not in result, result
+        if mode == "websocket":
+            await client.close()
+    elapsed = time.perf_counter() - t0
+    turns = len(latencies)
+    latencies.sort()
+    return {
+        "mode": mode,
+        "turns_per_sec": round(turns / elapsed),
+        "p50_us": round(percentile(latencies, 50) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 99) * 1e6, 1),
+        "redis_trips_per_turn": round((round_trips() - trips) / turns, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    settings.API_KEY = API_KEY
+    settings.RATE_LIMIT_ENABLED = False
+    simulate_rtt(args.rtt_ms / 1000)
+    memory.session_manager = SessionManager(redis_client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    texts = [m.text for m in generate_corpus(args.conversations * args.turns, seed=3)]
+    conversations = [texts[i:i + args.turns] for i in range(0, len(texts), args.turns)]
+
+    async def both():
+        await run("http", conversations[:5])  # warm-up
+        return [await run("http", conversations), await run("websocket", conversations)]
+
+    print_table(
+        f"{args.conversations} conversations x {args.turns} turns, Redis round trip {args.rtt_ms} ms",
+        asyncio.run(both())
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Deterministic synthetic message corpus for benchmarks.
+
+Scam messages are built from the detector's KEYWORD_RULES with embedded UPI
+IDs, phone numbers, URLs and account numbers; benign messages mix everyday
+filler with the "unknown" replies from app.agent.TEMPLATES (the scam
+personas' replies quote scam vocabulary, so they would not stay benign). The same
+seed always yields the same corpus, so results are comparable across runs.
+"""
+import random
+import string
+from typing import NamedTuple
+
+from app.agent import TEMPLATES
+from app.detector import KEYWORD_RULES
+
+
+class Message(NamedTuple):
+    text: str
+    scam_type: str  # rule the message was built from, "unknown" for benign
+    entities: dict[str, list[str]]  # embedded values per ExtractedIntelligence field
+
+
+SCAM_SENTENCES = [
+    "Dear customer, {kw} is required today.",
+    "URGENT: {kw} before midnight to avoid penalty.",
+    "Our team confirms your {kw} request.",
+    "Please complete {kw} immediately.",
+    "Final reminder regarding {kw}.",
+    "Sir/madam, {kw} has been initiated for you.",
+]
+
+ENTITY_SENTENCES = {
+    "upi_ids": ["Pay to {value} now.", "Send the fee to {value}."],
+    "phone_numbers": ["Call {value} for help.", "Our officer will call from {value}."],
+    "urls": ["Visit {value} to continue.", "Click {value} immediately."],
+    "bank_accounts": ["Transfer to account no. {value} today.", "Bank A/C {value}, IFSC SBIN0001234."],
+}
+
+FILLER = [
+    "How are you doing these days?",
+    "The weather has been lovely this week.",
+    "Let me know when you get home.",
+    "We are meeting for lunch at the usual place.",
+    "Thanks for the photos from the trip.",
+    "I will bring the books back on Sunday.",
+    "Did you watch the match yesterday?",
+    "Mom says dinner is ready at eight.",
+]
+
+UPI_HANDLES = ["ybl", "okaxis", "paytm", "oksbi", "ibl"]
+URL_HOSTS = ["secure-verify.in", "refund-portal.com", "kyc-update.net", "bit.ly", "claim-now.org"]
+BENIGN_REPLIES = [text for replies in TEMPLATES["unknown"].values() for text in replies]
+
+
+def make_entity(rnd: random.Random, field: str) -> str:
+    if field == "upi_ids":
+        name = "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 10)))
+        return f"{name}{rnd.randint(1, 99)}@{rnd.choice(UPI_HANDLES)}"
+    if field == "phone_numbers":
+        number = f"{rnd.randint(6, 9)}{rnd.randrange(10 ** 9):09d}"
+        return rnd.choice([number, f"+91 {number}", f"+91-{number}"])
+    if field == "urls":
+        path = "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(3, 8)))
+        return f"{rnd.choice(['http', 'https'])}://{rnd.choice(URL_HOSTS)}/{path}?id={rnd.randint(1000, 9999)}"
+    # 12 digits (no context needed); a leading 1-5 can never read as a +91 mobile
+    return f"{rnd.randint(1, 5)}{rnd.randrange(10 ** 11):011d}"
+
+
+def pad(rnd: random.Random, parts: list[str], length: int | None) -> str:
+    """Appends filler until the text reaches length, then cuts the filler to fit exactly."""
+    text = " ".join(parts)
+    if length is None:
+        return text
+    while len(text) < length:
+        text += " " + rnd.choice(FILLER)
+    core = len(" ".join(parts))
+    return text[:max(length, core)]
+
+
+def scam_message(rnd: random.Random, length: int | None = None) -> Message:
+    scam_type, _, keywords = rnd.choice(KEYWORD_RULES)
+    parts = [rnd.choice(SCAM_SENTENCES).format(kw=kw) for kw in rnd.sample(keywords, min(len(keywords), rnd.randint(1, 3)))]
+
+    entities = {field: [] for field in ENTITY_SENTENCES}
+    for field in rnd.sample(list(ENTITY_SENTENCES), rnd.randint(1, 3)):
+        value = make_entity(rnd, field)
+        entities[field].append(value)
+        parts.append(rnd.choice(ENTITY_SENTENCES[field]).format(value=value))
+
+    rnd.shuffle(parts)
+    return Message(pad(rnd, parts, length), scam_type, entities)
+
+
+def benign_message(rnd: random.Random, length: int | None = None) -> Message:
+    parts = [rnd.choice(FILLER), rnd.choice(BENIGN_REPLIES)]
+    rnd.shuffle(parts)
+    return Message(pad(rnd, parts, length), "unknown", {field: [] for field in ENTITY_SENTENCES})
+
+
+def generate_corpus(count: int, seed: int = 0, scam_ratio: float = 0.7, length: int | None = None) -> list[Message]:
+    """
+    count messages, scam_ratio of them scams. With length, every message is
+    padded (or its filler cut) to exactly that many characters; messages never
+    lose their keywords or entities, so very small lengths are exceeded.
+    """
+    rnd = random.Random(seed)
+    return [
+        scam_message(rnd, length) if rnd.random() < scam_ratio else benign_message(rnd, length)
+        for _ in range(count)
+    ]
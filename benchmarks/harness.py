@@ -0,0 +1,66 @@
+import time
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(fn, inputs: list, rounds: int = 3) -> dict:
+    """
+    Calls fn(item) for every item, `rounds` times, timing each call.
+    Returns ops/sec and p50/p99 latency in microseconds.
+    """
+    # Warm-up pass so lazy imports and caches don't skew the first samples
+    for item in inputs[:100]:
+        fn(item)
+
+    samples = []
+    perf = time.perf_counter
+    for _ in range(rounds):
+        for item in inputs:
+            t0 = perf()
+            fn(item)
+            samples.append(perf() - t0)
+
+    return summarize(samples)
+
+
+def summarize(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "ops_per_sec": round(len(samples) / total, 1) if total else 0.0,
+        "p50_us": round(percentile(samples, 50) * 1e6, 2),
+        "p99_us": round(percentile(samples, 99) * 1e6, 2),
+    }
+
+
+async def measure_async(fn, inputs: list, rounds: int = 3) -> dict:
+    """
+    measure() for coroutine functions: awaits fn(item) one call at a time.
+    """
+    for item in inputs[:100]:
+        await fn(item)
+
+    samples = []
+    perf = time.perf_counter
+    for _ in range(rounds):
+        for item in inputs:
+            t0 = perf()
+            await fn(item)
+            samples.append(perf() - t0)
+    return summarize(samples)
+
+
+def print_table(title: str, rows: list[dict]):
+    print(f"\n{title}")
+    if not rows:
+        return
+    headers = list(rows[0].keys())
+    widths = [max(len(str(h)), *(len(str(r[h])) for r in rows)) for h in headers]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(row[h]).ljust(w) for h, w in zip(headers, widths)))
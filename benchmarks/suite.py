@@ -0,0 +1,139 @@
+"""
+Benchmark suite over a synthetic scam/benign corpus.
+
+Times detect_scam, every extract_* function, generate_response and the
+end-to-end /honeypot handler (in-process, through the ASGI app), printing
+ops/sec and p50/p99 per benchmark. With --output the results are also
+written as JSON; --compare prints the ops/sec ratio against an earlier file.
+
+Run: python -m benchmarks.suite [--count 2000] [--length 300] [--output results.json] [--compare old.json]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import subprocess
+
+import httpx
+
+from app.agent import generate_response
+from app.config import settings
+from app.detector import detect_scam
+from app.extractor import extract_all, extract_bank_accounts, extract_phone_numbers, extract_upi_ids, extract_urls
+from app.main import app
+from app.memory import stage_for_turn
+from benchmarks.corpus import generate_corpus
+from benchmarks.harness import measure, measure_async, print_table
+
+API_KEY = "bench"
+SESSIONS = 50  # end-to-end requests cycle through this many conversations
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def measure_endpoint(texts: list[str], rounds: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        requests = [
+            {"message": text, "session_id": f"bench-{i % SESSIONS}"}
+            for i, text in enumerate(texts)
+        ]
+
+        async def post(body):
+            response = await client.post("/honeypot", json=body, headers={"x-api-key": API_KEY})
+            response.raise_for_status()
+
+        return await measure_async(post, requests, rounds)
+
+
+def run_suite(count: int, seed: int, length: int | None, rounds: int) -> dict[str, dict]:
+    settings.API_KEY = API_KEY
+    settings.RATE_LIMIT_ENABLED = False
+
+    corpus = generate_corpus(count, seed=seed, length=length)
+    texts = [m.text for m in corpus]
+    replies = [
+        (m.scam_type, stage_for_turn(i % 6 + 1), f"bench-{i % SESSIONS}", i % 6 + 1)
+        for i, m in enumerate(corpus)
+    ]
+
+    results = {}
+    for name, fn in (
+        ("detect_scam", detect_scam),
+        ("extract_upi_ids", extract_upi_ids),
+        ("extract_urls", extract_urls),
+        ("extract_phone_numbers", extract_phone_numbers),
+        ("extract_bank_accounts", extract_bank_accounts),
+        ("extract_all", extract_all),
+    ):
+        results[name] = measure(fn, texts, rounds)
+    results["generate_response"] = measure(lambda args: generate_response(*args), replies, rounds)
+    results["honeypot_endpoint"] = asyncio.run(measure_endpoint(texts, rounds))
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list[dict]:
+    rows = []
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        rows.append({
+            "benchmark": name,
+            "old_ops/s": old["ops_per_sec"],
+            "new_ops/s": stats["ops_per_sec"],
+            "speedup": round(stats["ops_per_sec"] / old["ops_per_sec"], 2) if old["ops_per_sec"] else None,
+            "old_p99_us": old["p99_us"],
+            "new_p99_us": stats["p99_us"],
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=2000, help="messages in the corpus")
+    parser.add_argument("--length", type=int, default=None, help="pad/cut every message to this many chars")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = run_suite(args.count, args.seed, args.length, args.rounds)
+    print_table("Benchmark suite", [{"benchmark": name, **stats} for name, stats in results.items()])
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "corpus": {"count": args.count, "seed": args.seed, "length": args.length},
+                "rounds": args.rounds,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        corpus = baseline["meta"]["corpus"]
+        if corpus != {"count": args.count, "seed": args.seed, "length": args.length}:
+            print(f"\nWarning: {args.compare} was measured on a different corpus: {corpus}")
+        print_table(f"Compared to {args.compare}", compare(results, baseline["results"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# Loaded automatically by gunicorn from the working directory.
+import glob
+import os
+
+def on_starting(server):
+    # Workers keep their metrics in per-process files under METRICS_DIR, which
+    # /metrics sums. Start every server run from zero; workers inherit the env.
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+    directory = os.environ.setdefault("METRICS_DIR", os.path.join(base, "honeypot-metrics"))
+    for path in glob.glob(os.path.join(directory, "*.metrics")):
+        os.remove(path)
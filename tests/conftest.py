@@ -0,0 +1,5 @@
+import os
+
+# Keep rate limiting per process in tests; the shared-memory default would
+# carry state between test runs through its file.
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+settings.API_KEY = "TEST123"
+
+from app import main, pipeline
+from app.admission import AdmissionControl
+from app.cache import detection_cache
+from app.campaigns import CampaignIndex, CampaignTracker
+from app.main import app
+from app.offload import AnalysisPool
+from benchmarks.corpus import generate_corpus
+
+def test_full_queue_is_rejected():
+    control = AdmissionControl(max_inflight=2, max_queue=1)
+
+    async def scenario():
+        assert await control.acquire() and await control.acquire()
+        waiter = asyncio.create_task(control.acquire())
+        await asyncio.sleep(0)
+        rejected = not await control.acquire()
+        control.release()
+        assert await waiter
+        return rejected
+
+    assert asyncio.run(scenario())
+    assert control.waiting == 0 and control.slots.locked()
+
+def test_busy_response(monkeypatch):
+    control = AdmissionControl(max_inflight=1, max_queue=0, retry_after=2)
+    monkeypatch.setattr("app.admission.admission", control)
+    asyncio.run(control.acquire())
+    client = TestClient(app)
+    response = client.post("/honeypot", headers={"x-api-key": "TEST123"}, json={"message": "hello"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
+    assert response.json() == {"error": "HTTPException", "message": "Server busy. Please try again later.", "details": None}
+    # Other endpoints don't take a slot
+    assert client.get("/health").status_code == 200
+    control.release()
+    assert client.post("/honeypot", headers={"x-api-key": "TEST123"}, json={"message": "hello"}).status_code == 200
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_offloaded_analysis_matches_inline(monkeypatch, kind):
+    client = TestClient(app)
+    headers = {"x-api-key": "TEST123"}
+    messages = [m.text for m in generate_corpus(20, seed=11)]
+
+    def responses(prefix):
+        return [
+            client.post("/honeypot", headers=headers, json={"message": text, "session_id": f"{prefix}-{i}"}).json()
+            for i, text in enumerate(messages)
+        ]
+
+    # Fresh detection cache entries for each run, so both actually analyze
+    monkeypatch.setattr(detection_cache, "max_bytes", 0)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    # Kept out of the shared campaign index (corpus texts repeat templates)
+    monkeypatch.setattr(main, "campaigns", CampaignTracker(CampaignIndex(slots=1024)))
+    pool = AnalysisPool(kind, workers=2)
+    expected = responses(f"inline-{kind}")
+    monkeypatch.setattr(pipeline, "analysis_pool", pool)
+    try:
+        offloaded = responses(kind)
+    finally:
+        pool.shutdown()
+
+    def strip(result):
+        return {**result, "session_state": None, "next_message": None, "campaign_id": None}
+
+    assert [strip(r) for r in offloaded] == [strip(r) for r in expected]
@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 import os
+import pytest
 
 # Set API Key env var BEFORE importing app to ensure config picks it up if needed,
 # though we usually patch settings. But simpler to set it here if config loads at import time.
@@ -9,7 +10,12 @@ import os
 from app.config import settings
 settings.API_KEY = "TEST123"
 
+from app import main, pipeline
+from app.campaigns import CampaignIndex, CampaignTracker
+from app.limiter import RateLimiter
 from app.main import app
+from app.models import HoneypotResponse
+from benchmarks.corpus import generate_corpus
 
 client = TestClient(app)
 
@@ -94,3 +100,116 @@ def test_benign_message():
     assert data["is_scam"] is False
     assert data["persona_used"] == "none"
     assert data["next_message"] == ""
+
+def test_batch_results_in_order():
+    """
+    Requirement: POST /honeypot/batch returns one HoneypotResponse per message, in order
+    """
+    msgs = [
+        {"message": "Urgent! Login immediately to verify account: http://scam-link.com/login"},
+        {"message": "Hey, just checking in. How are you?"},
+        {"message": ""},
+    ]
+    response = client.post(
+        "/honeypot/batch",
+        headers={"x-api-key": "TEST123"},
+        json={"messages": msgs}
+    )
+    assert response.status_code == 200
+    data = response.json()
+
+    results = data["results"]
+    assert [r["is_scam"] for r in results] == [True, False, False]
+    assert results[0]["scam_type"] == "phishing"
+    assert len(results[0]["extracted_intelligence"]["urls"]) > 0
+    assert results[2]["session_state"]["turn"] == 0
+    assert "detect" in data["timings"]["stages_ms"]
+    assert data["timings"]["total_ms"] >= 0
+
+def test_batch_repeated_session_advances_turns():
+    msg = {"message": "Share the OTP code now", "session_id": "batch-session-1"}
+    response = client.post(
+        "/honeypot/batch",
+        headers={"x-api-key": "TEST123"},
+        json={"messages": [msg, msg, msg]}
+    )
+    assert response.status_code == 200
+    states = [r["session_state"] for r in response.json()["results"]]
+    assert [s["turn"] for s in states] == [1, 2, 3]
+    assert [s["stage"] for s in states] == ["hook", "trust_building", "extraction"]
+
+    # The single endpoint continues from the saved batch state
+    response = client.post("/honeypot", headers={"x-api-key": "TEST123"}, json=msg)
+    assert response.json()["session_state"]["turn"] == 4
+
+def test_batch_too_large():
+    response = client.post(
+        "/honeypot/batch",
+        headers={"x-api-key": "TEST123"},
+        json={"messages": [{"message": "hi"}] * (settings.BATCH_MAX_SIZE + 1)}
+    )
+    assert response.status_code == 413
+
+def test_analysis_budget_marks_partial(monkeypatch):
+    headers = {"x-api-key": "TEST123"}
+    message = "Urgent! Verify account at http://scam-link.com/login or pay to fee@ybl"
+    response = client.post("/honeypot", headers=headers, json={"message": message})
+    assert response.json()["partial"] is False
+
+    # Detection alone uses up a near-zero budget, so extraction is skipped
+    # (a new text: the first one's results are cached now)
+    monkeypatch.setattr(settings, "ANALYSIS_BUDGET_MS", 1e-6)
+    data = client.post("/honeypot", headers=headers, json={"message": message + " Today."}).json()
+    assert data["partial"] is True
+    assert data["is_scam"] is True
+    assert data["extracted_intelligence"]["urls"] == []
+
+def test_cumulative_intelligence_spans_turns():
+    headers = {"x-api-key": "TEST123"}
+    first = {"message": "Verify KYC now, pay the fee to kyc.fee@ybl", "session_id": "cumulative-1"}
+    second = {"message": "Or call our officer on +91 9876543210", "session_id": "cumulative-1", "cumulative": True}
+    assert client.post("/honeypot", headers=headers, json=first).json()["cumulative_intelligence"] is None
+
+    data = client.post("/honeypot", headers=headers, json=second).json()
+    assert data["extracted_intelligence"]["upi_ids"] == []
+    assert data["cumulative_intelligence"]["upi_ids"] == ["kyc.fee@ybl"]
+    assert data["cumulative_intelligence"]["phone_numbers"] == data["extracted_intelligence"]["phone_numbers"] != []
+
+@pytest.mark.parametrize("encoder", ["orjson", "json"])
+def test_response_bytes_match_model_serialization(monkeypatch, encoder):
+    """
+    Responses are serialized from plain data; the bytes must be what the
+    HoneypotResponse model itself would produce.
+    """
+    if encoder == "json":
+        monkeypatch.setattr(pipeline, "orjson", None)
+    elif pipeline.orjson is None:
+        pytest.skip("orjson not installed")
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    # Kept out of the shared campaign index (corpus texts repeat templates)
+    monkeypatch.setattr(main, "campaigns", CampaignTracker(CampaignIndex(slots=1024)))
+    headers = {"x-api-key": "TEST123"}
+    messages = [m.text for m in generate_corpus(40, seed=17)] + ["", "Namaste 🙏 आपका खाता बंद होगा, pay ₹500 to kyc@ybl"]
+    for i, text in enumerate(messages):
+        body = {"message": text, "session_id": f"wire-{encoder}-{i % 4}", "cumulative": i % 2 == 0}
+        response = client.post("/honeypot", headers=headers, json=body)
+        assert response.status_code == 200
+        assert response.content == HoneypotResponse.model_validate_json(response.content).model_dump_json().encode()
+
+    batch = client.post("/honeypot/batch", headers=headers, json={"messages": [{"message": t} for t in messages[:5]]})
+    results = batch.json()["results"]
+    assert [HoneypotResponse.model_validate(r).model_dump(mode="json") for r in results] == results
+
+def test_batch_charges_each_message(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr("app.limiter.limiter", RateLimiter(requests_per_minute=5))
+    headers = {"x-api-key": "TEST123"}
+    batch = {"messages": [{"message": "hi"}] * 4}
+    assert client.post("/honeypot/batch", headers=headers, json=batch).status_code == 200
+    response = client.post("/honeypot/batch", headers=headers, json=batch)
+    assert response.status_code == 429 and "Retry-After" in response.headers
+    # The rejected batch took nothing
+    assert client.post("/honeypot", headers=headers, json={"message": "hi"}).status_code == 200
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 3)
+    assert client.post("/honeypot/batch", headers=headers, json=batch).status_code == 413
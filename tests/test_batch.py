@@ -0,0 +1,27 @@
+import pytest
+
+from app import batch
+from app.batch import detect_scam_batch
+from app.detector import detect_scam, classify_scores, score_mask
+from benchmarks.corpus import generate_corpus
+
+MESSAGES = [m.text for m in generate_corpus(500, seed=5)] + [
+    "", "OTP", "Share CODE now\x00then verify KYC", "İstanbul customs parcel, call the bank officer", "http://x.com"
+]
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_batch_matches_detect_scam(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(batch, "np", None)
+    elif batch.np is None:
+        pytest.skip("numpy not installed")
+    messages = MESSAGES + MESSAGES[:50]
+    assert detect_scam_batch(messages) == [detect_scam(m) for m in messages]
+
+def test_array_classification_matches_classify_scores():
+    if batch.np is None:
+        pytest.skip("numpy not installed")
+    # Every combination of up to three hits in the first 24 patterns, plus each pattern alone
+    masks = [(1 << a) | (1 << b) | (1 << c) for a in range(24) for b in range(24) for c in range(24)]
+    masks += [1 << i for i in range(len(batch.PATTERNS))] + [0]
+    assert batch.classify_masks_array(masks) == [classify_scores(score_mask(m)[0]) for m in masks]
@@ -0,0 +1,15 @@
+from app.detector import detect_scam
+from app.extractor import extract_all
+from benchmarks.corpus import generate_corpus
+
+def test_corpus_is_deterministic():
+    assert generate_corpus(50, seed=3) == generate_corpus(50, seed=3)
+    assert generate_corpus(50, seed=3) != generate_corpus(50, seed=4)
+    assert all(len(m.text) == 400 for m in generate_corpus(50, length=400))
+
+def test_corpus_labels_match_pipeline():
+    for message in generate_corpus(200):
+        assert detect_scam(message.text)["is_scam"] == (message.scam_type != "unknown")
+        found = extract_all(message.text)
+        for field, values in message.entities.items():
+            assert set(values) <= set(found[field])
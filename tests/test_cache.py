@@ -0,0 +1,62 @@
+import asyncio
+
+import fakeredis
+
+from app.cache import DetectionCache, message_key
+from app.budget import AnalysisBudget
+from app.detector import scan_message
+from app.extractor import extract_all
+from app.pipeline import cached_scan, cached_extraction
+
+SCAM = "Urgent! Verify your KYC at http://kyc-check.example/login or pay fee@ybl"
+
+def analyze(cache: DetectionCache, message: str):
+    async def scenario():
+        analysis = await cache.lookup(message)
+        hits = cached_scan(analysis, message, AnalysisBudget(None))
+        extracted = cached_extraction(analysis, message, AnalysisBudget(None))
+        await cache.store(analysis)
+        return hits, extracted.model_dump()
+    return asyncio.run(scenario())
+
+def test_cached_results_match_fresh_analysis():
+    cache = DetectionCache(max_bytes=2 ** 20)
+    fresh = (scan_message(SCAM), extract_all(SCAM))
+    assert analyze(cache, SCAM) == fresh
+    assert len(cache) == 1
+
+    # Copies differing only in surrounding whitespace share the entry
+    assert message_key(f"  {SCAM}\n") == message_key(SCAM)
+    hit = asyncio.run(cache.lookup(SCAM + "\n"))
+    assert (hit.hits, hit.extracted) == fresh
+    assert message_key(SCAM.upper()) != message_key(SCAM)
+
+def test_byte_cap_evicts_least_recently_used():
+    cache = DetectionCache(max_bytes=1500)
+    messages = [f"{SCAM} ref {i}" for i in range(20)]
+    for message in messages:
+        analyze(cache, message)
+    assert 0 < cache.size <= 1500
+    assert len(cache) < len(messages)
+    assert cache.get_local(message_key(messages[0])) is None
+    assert cache.get_local(message_key(messages[-1])) is not None
+
+def test_shared_level_serves_other_workers():
+    fake_redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    worker_a = DetectionCache(max_bytes=2 ** 20, redis_client=fake_redis)
+    worker_b = DetectionCache(max_bytes=2 ** 20, redis_client=fake_redis)
+
+    async def scenario():
+        analysis = await worker_a.lookup(SCAM)
+        cached_scan(analysis, SCAM, AnalysisBudget(None))
+        await worker_a.store(analysis)
+        # Only the scan so far; extraction is added by whoever needs it
+        shared = await worker_b.lookup(SCAM)
+        assert shared.hits == scan_message(SCAM) and shared.extracted is None
+        cached_extraction(shared, SCAM, AnalysisBudget(None))
+        await worker_b.store(shared)
+        worker_a.entries.clear()
+        return await worker_a.lookup(SCAM)
+
+    analysis = asyncio.run(scenario())
+    assert analysis.extracted == extract_all(SCAM)
@@ -0,0 +1,98 @@
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+settings.API_KEY = "TEST123"
+
+from app.campaigns import CampaignIndex, CampaignTracker, RedisCampaignIndex, fingerprint
+from app.main import app
+
+TEMPLATE = "Dear {name}, your SBI account will be suspended today. Update KYC at {link} or pay Rs {amount} to {upi}"
+VARIANTS = [
+    TEMPLATE.format(name="Ravi", link="http://sbi-kyc.in/a1", amount=500, upi="ravi.fee@ybl"),
+    TEMPLATE.format(name="Priya", link="https://sbi-upd.co/zz9", amount=1200, upi="kyc99@okaxis"),
+    TEMPLATE.format(name="Anil", link="http://bit.ly/3xYq", amount=99, upi="sbi.help@paytm"),
+]
+JOB = "Congratulations! You are hired for a part time work from home job, pay the registration fee on telegram"
+
+def test_fingerprint_shares_bands_between_variants_only():
+    keys = [fingerprint(v) for v in VARIANTS]
+    assert all(set(keys[0]) & set(k) for k in keys[1:])
+    assert not set(keys[0]) & set(fingerprint(JOB))
+    assert fingerprint("ok thanks") is None
+
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+def test_variants_join_one_campaign(backend):
+    if backend == "redis":
+        index = RedisCampaignIndex(fakeredis.FakeAsyncRedis(decode_responses=True))
+    else:
+        index = CampaignIndex(slots=1024)
+    tracker = CampaignTracker(index)
+
+    async def scenario():
+        ids = await tracker.assign_many(
+            [(v, "phishing") for v in VARIANTS] + [(JOB, "job_scam"), ("hi", "phishing"), (JOB, "unknown")]
+        )
+        return ids, await tracker.top(10)
+
+    ids, top = asyncio.run(scenario())
+    assert ids[0] == ids[1] == ids[2] != ids[3]
+    # Too short, and benign
+    assert ids[4] is None and ids[5] is None
+    assert [(c["campaign_id"], c["count"], c["scam_type"]) for c in top] == [
+        (ids[0], 3, "phishing"), (ids[3], 1, "job_scam")
+    ]
+
+def test_redis_campaign_script_declares_its_keys():
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    index = RedisCampaignIndex(redis_client, max_campaigns=1)
+    calls = []
+    original = index.script.__call__
+
+    async def recording(keys=(), args=(), client=None):
+        calls.append(list(keys))
+        return await original(keys=keys, args=args, client=client)
+
+    index.script = recording
+
+    async def scenario():
+        await index.assign_many([(fingerprint(VARIANTS[0]), "phishing"), (fingerprint(JOB), "job_scam")])
+        await index.flush()
+        return await redis_client.keys("*")
+
+    # Every key the script touched was passed in KEYS; the smaller campaign was trimmed
+    assert set(asyncio.run(scenario())) <= {key for keys in calls for key in keys}
+    assert len(asyncio.run(index.top(10))) == 1
+
+def test_redis_assignment_is_queued_off_the_request_path():
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    worker_a = CampaignTracker(RedisCampaignIndex(redis_client))
+    worker_b = CampaignTracker(RedisCampaignIndex(redis_client))
+
+    async def scenario():
+        first = await worker_a.assign(VARIANTS[0], "phishing")
+        assert await redis_client.keys("*") == []
+        assert await worker_a.flush() == 1
+        # Another worker learns the campaign's id from its own flush
+        await worker_b.assign(VARIANTS[1], "phishing")
+        await worker_b.flush()
+        learned = await worker_b.assign(VARIANTS[2], "phishing")
+        return first, learned, await worker_b.top(10)
+
+    first, learned, top = asyncio.run(scenario())
+    assert learned == first
+    assert [(c["campaign_id"], c["count"]) for c in top] == [(first, 3)]
+
+def test_campaign_endpoint():
+    client = TestClient(app)
+    headers = {"x-api-key": "TEST123"}
+    ids = [client.post("/honeypot", headers=headers, json={"message": v}).json()["campaign_id"] for v in VARIANTS]
+    assert ids[0] is not None and len(set(ids)) == 1
+
+    campaigns = client.get("/campaigns", headers=headers, params={"limit": 5}).json()["campaigns"]
+    assert {"campaign_id": ids[0], "count": 3, "scam_type": "phishing"}.items() <= \
+        next(c for c in campaigns if c["campaign_id"] == ids[0]).items()
+    assert client.get("/campaigns").status_code == 401
@@ -0,0 +1,48 @@
+import csv
+import json
+
+import pytest
+
+from app.cli import main
+from app.detector import detect_scam
+from app.extractor import extract_all
+from benchmarks.corpus import generate_corpus
+
+MESSAGES = [m.text for m in generate_corpus(300, seed=9)]
+
+def scored(path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_score_jsonl_in_order(tmp_path, workers):
+    source = tmp_path / "archive.jsonl"
+    with open(source, "w", encoding="utf-8") as f:
+        for i, message in enumerate(MESSAGES):
+            f.write(json.dumps({"id": i, "message": message}) + "\n")
+        f.write("not json\n")
+        f.write(json.dumps({"id": "no-message"}))  # no trailing newline
+
+    out = tmp_path / "out.jsonl"
+    main(["score", str(source), "-o", str(out), "--workers", str(workers), "--chunk-size", "2000", "--quiet"])
+    results = scored(out)
+    assert [r.get("id") for r in results] == list(range(len(MESSAGES))) + [None, "no-message"]
+    for result, message in zip(results, MESSAGES):
+        assert {k: result[k] for k in ("is_scam", "scam_type", "confidence", "signals")} == detect_scam(message)
+        assert result["extracted_intelligence"] == extract_all(message)
+    assert results[-2] == {"error": "Invalid record"}
+    assert results[-1] == {"id": "no-message", "error": "Missing 'message'"}
+
+def test_score_csv_with_multiline_fields(tmp_path):
+    source = tmp_path / "archive.csv"
+    texts = [m.replace(". ", '.\n"Note" ') for m in MESSAGES]
+    with open(source, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "text"])
+        writer.writerows(enumerate(texts))
+
+    out = tmp_path / "out.jsonl"
+    main(["score", str(source), "-o", str(out), "--field", "text", "--workers", "2", "--chunk-size", "1500", "--quiet"])
+    results = scored(out)
+    assert [r["id"] for r in results] == [str(i) for i in range(len(texts))]
+    assert [r["signals"] for r in results] == [detect_scam(t)["signals"] for t in texts]
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import settings
+settings.API_KEY = "TEST123"
+
+from app import memory
+from app.conversation import Conversation
+from app.admission import AdmissionControl
+from app.limiter import RateLimiter
+from app.main import app
+from app.memory import SessionManager
+
+SCAM = "Your SBI account is blocked today, update KYC at http://sbi-kyc.in or pay the fee to sbi.help@ybl"
+
+def test_websocket_conversation(monkeypatch):
+    manager = SessionManager(redis_client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    monkeypatch.setattr(memory, "session_manager", manager)
+    client = TestClient(app)
+
+    with client.websocket_connect("/honeypot/ws?session_id=ws-1", headers={"x-api-key": "TEST123"}) as ws:
+        ws.send_text(json.dumps({"message": SCAM}))
+        first = json.loads(ws.receive_text())
+        ws.send_text("not json")
+        assert json.loads(ws.receive_text())["error"] == "ValidationError"
+        ws.send_text(json.dumps({"message": "ok, what should I do next?", "cumulative": True}))
+        second = json.loads(ws.receive_text())
+
+    assert first["is_scam"] and first["next_message"]
+    assert first["session_state"] == {"session_id": "ws-1", "turn": 1, "stage": "hook"}
+    assert second["session_state"]["turn"] == 2
+    assert second["cumulative_intelligence"]["urls"] == ["http://sbi-kyc.in"]
+    # Written on close; the next message over HTTP continues the conversation
+    stored = asyncio.run(manager.get_session("ws-1"))
+    assert (stored.turn, stored.scam_type) == (2, "phishing")
+    response = client.post("/honeypot", headers={"x-api-key": "TEST123"}, json={"message": "hm", "session_id": "ws-1"})
+    assert response.json()["session_state"]["turn"] == 3
+
+def test_websocket_frames_are_rate_limited_and_admitted(monkeypatch):
+    manager = SessionManager(redis_client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    monkeypatch.setattr(memory, "session_manager", manager)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    # The connection and two frames
+    monkeypatch.setattr("app.limiter.limiter", RateLimiter(requests_per_minute=3))
+    control = AdmissionControl(max_inflight=1, max_queue=0)
+    monkeypatch.setattr("app.admission.admission", control)
+    client = TestClient(app)
+
+    with client.websocket_connect("/honeypot/ws?session_id=ws-3", headers={"x-api-key": "TEST123"}) as ws:
+        ws.send_text(json.dumps({"message": "hello"}))
+        assert json.loads(ws.receive_text())["session_state"]["turn"] == 1
+        # No free admission slot
+        asyncio.run(control.acquire())
+        ws.send_text(json.dumps({"message": "hello"}))
+        assert json.loads(ws.receive_text())["message"] == "Server busy. Please try again later."
+        control.release()
+        ws.send_text(json.dumps({"message": "hello"}))
+        assert json.loads(ws.receive_text())["message"] == "Rate limit exceeded. Please try again later."
+
+@pytest.mark.parametrize("headers,query", [({}, ""), ({"x-api-key": "wrong"}, ""), ({}, "?api_key=wrong")])
+def test_websocket_rejects_bad_key(headers, query):
+    client = TestClient(app)
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/honeypot/ws" + query, headers=headers) as ws:
+            ws.receive_text()
+    assert closed.value.code == 1008
+
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+def test_persist_replays_turns_over_concurrent_writes(monkeypatch, backend):
+    manager = SessionManager(redis_client=fakeredis.FakeAsyncRedis(decode_responses=True) if backend == "redis" else None)
+    monkeypatch.setattr(memory, "session_manager", manager)
+
+    async def scenario():
+        conversation = await Conversation.open("ws-2")
+        conversation.advance(0b001)
+        conversation.advance(0)
+        await conversation.persist()
+        conversation.advance(0b100)
+        # A /honeypot request on the same session in between
+        await manager.advance_turn("ws-2", 0b010)
+        await conversation.persist()
+        return conversation, await manager.get_session("ws-2")
+
+    conversation, stored = asyncio.run(scenario())
+    assert (stored.turn, stored.signal_mask) == (4, 0b111)
+    assert conversation.state == stored and not conversation.dirty
@@ -0,0 +1,48 @@
+import random
+
+from app import detector
+from app.detector import detect_scam, scan_message
+from app.matcher import KeywordMatcher
+from benchmarks.corpus import generate_corpus
+
+def test_matcher_finds_every_occurring_keyword():
+    """
+    The automaton must report exactly the keywords a substring check would,
+    including overlapping ones and keywords that are suffixes of others.
+    """
+    keywords = ["code", "share code", "qr code", "de", "manager", "hr manager", "a", "a"]
+    matcher = KeywordMatcher(keywords)
+    rnd = random.Random(0)
+    alphabet = "acdehmnoqrs g"
+    for _ in range(500):
+        text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 40)))
+        expected = {i for i, kw in enumerate(keywords) if kw in text}
+        assert matcher.scan(text) == expected
+
+def test_signals_keep_rule_order():
+    result = detect_scam("Share code with the HR Manager now, police will verify. http://x.com")
+    assert result["signals"] == [
+        "phishing:verify",
+        "otp_fraud:code",
+        "otp_fraud:share code",
+        "job_scam:hr manager",
+        "impersonation:police",
+        "impersonation:manager",
+    ]
+    assert result["scam_type"] == "otp_fraud"
+    assert result["confidence"] == 0.76
+
+def test_link_markers_score_once():
+    # Three link markers still add a single 0.5 phishing bonus -> weak match only
+    result = detect_scam("see www.example.com or http://example.com")
+    assert result["is_scam"] is False
+    assert result["confidence"] == 0.25
+    assert result["signals"] == []
+
+def test_scan_strategies_agree(monkeypatch):
+    texts = [m.text for m in generate_corpus(200, seed=4)]
+    searched = [scan_message(t) for t in texts]
+    # Force the automaton, as for a rule set past the crossover
+    monkeypatch.setattr(detector, "SCAN_MAX_KEYWORDS", 0)
+    assert [scan_message(t) for t in texts] == searched
+    assert any(searched)
@@ -0,0 +1,42 @@
+import time
+from app.budget import AnalysisBudget
+from app.extractor import Entity, extract_entities, extract_all, extract_phone_numbers, extract_bank_accounts
+
+def test_entities_carry_offsets():
+    text = "Pay 9876543210@ybl or visit http://scam-link.com/pay now"
+    entities = extract_entities(text)
+    for entity in entities:
+        assert text[entity.start:entity.end] == entity.value
+    assert Entity("upi_id", "9876543210@ybl", 4, 18) in entities
+    assert Entity("url", "http://scam-link.com/pay", 28, 52) in entities
+    # Each kind keeps its own matches, so the phone inside the UPI ID is reported too
+    assert Entity("phone_number", "9876543210", 4, 14) in entities
+
+def test_phone_and_bank_disambiguation():
+    text = "Call 9876543210. Account no. 9876543210 or 123456789012"
+    result = extract_all(text)
+    assert result["phone_numbers"] == ["9876543210"]
+    # Same digits as a phone -> not a bank account, even with account context
+    assert result["bank_accounts"] == ["123456789012"]
+
+def test_short_account_needs_context():
+    assert extract_bank_accounts("Send to A/C 123456789 today") == ["123456789"]
+    assert extract_bank_accounts("Order 123456789 shipped") == []
+    assert extract_phone_numbers("+1-555-123-4567 or 555-123-4567") == ["+1-555-123-4567", "555-123-4567"]
+
+def test_budget_stops_scan_early():
+    text = " ".join(f"user{i}@ybl" for i in range(500))
+    budget = AnalysisBudget(0.001)
+    with budget:
+        time.sleep(0.002)
+        partial = extract_entities(text, budget)
+    assert budget.exceeded
+    # Anchors are processed in batches between budget checks
+    assert len(partial) < 500
+    assert extract_entities(text) and len(extract_entities(text)) == 500
+
+def test_budget_only_charges_time_inside_with():
+    budget = AnalysisBudget(0.005)
+    time.sleep(0.01)
+    assert not budget.expired()
+    assert not AnalysisBudget(0).expired()
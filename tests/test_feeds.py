@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+
+from app.config import settings
+settings.API_KEY = "TEST123"
+
+from app import feeds
+from app.detector import detect_scam, KNOWN_BAD_BITS
+from app.feeds import FeedIndex, build_feed, read_entries
+from app.main import app
+
+def make_feed(tmp_path) -> FeedIndex:
+    domains = tmp_path / "domains.txt"
+    domains.write_text("# reported phishing hosts\nEvil-Bank.example\nhttp://www.kyc-update.example/login,phishing\n")
+    upis = tmp_path / "upi.txt"
+    upis.write_text("refund.desk@YBL\nloan.fee@okaxis,loan_scam\n")
+    entries = [*read_entries(str(domains), "domain"), *read_entries(str(upis), "upi_id"),
+               ("phone_number", "+91 98765 43210", "impersonation")]
+    path = tmp_path / "feeds.bin"
+    assert build_feed(entries, str(path)) == 5
+    return FeedIndex(str(path))
+
+def test_feed_lookup_normalizes_and_matches_parent_domains(tmp_path):
+    feed = make_feed(tmp_path)
+    assert feed.lookup("upi_id", "refund.desk@ybl") == "upi_refund"
+    assert feed.lookup("upi_id", "loan.fee@okaxis") == "loan_scam"
+    assert feed.lookup("phone_number", "9876543210") == "impersonation"
+    assert feed.lookup("domain", "evil-bank.example") == "phishing"
+    assert feed.lookup("domain", "secure.login.evil-bank.example") == "phishing"
+    assert feed.lookup("domain", "not-evil-bank.example") is None
+    assert feed.lookup("domain", "example") is None
+    assert feed.lookup("upi_id", "someone@ybl") is None
+
+    found = {"urls": ["https://pay.kyc-update.example/x"], "upi_ids": ["Refund.Desk@ybl"]}
+    assert feed.hits(found) == KNOWN_BAD_BITS[("phishing", "domain")] | KNOWN_BAD_BITS[("upi_refund", "upi_id")]
+    feed.close()
+
+def test_feed_hits_raise_confidence_and_signals():
+    plain = detect_scam("Please send the amount to refund.desk@ybl")
+    flagged = detect_scam("Please send the amount to refund.desk@ybl", KNOWN_BAD_BITS[("upi_refund", "upi_id")])
+    assert flagged["confidence"] > plain["confidence"]
+    assert flagged["scam_type"] == "upi_refund"
+    assert "upi_refund:known bad upi id" in flagged["signals"]
+
+def test_feed_hit_flags_otherwise_benign_message(tmp_path, monkeypatch):
+    client = TestClient(app)
+    headers = {"x-api-key": "TEST123"}
+    message = {"message": "Hi, this is Ravi, you can reach me at +91 9876543210 anytime"}
+    assert client.post("/honeypot", headers=headers, json=message).json()["is_scam"] is False
+
+    monkeypatch.setattr(feeds, "known_bad", make_feed(tmp_path))
+    data = client.post("/honeypot", headers=headers, json=message).json()
+    assert data["is_scam"] is True
+    assert data["scam_type"] == "impersonation"
+    assert data["explanation"]["signals"] == ["impersonation:known bad phone number"]
+    assert data["extracted_intelligence"]["phone_numbers"] != []
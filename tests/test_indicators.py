@@ -0,0 +1,62 @@
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+settings.API_KEY = "TEST123"
+
+from app.indicators import IndicatorIndex, IndicatorRecorder, RedisIndicatorIndex, normalize_indicator
+from app.main import app
+
+def test_normalize_indicator():
+    assert normalize_indicator("phone_number", "+91 98765-43210") == "9876543210"
+    assert normalize_indicator("phone_number", "09876543210") == "9876543210"
+    assert normalize_indicator("domain", "https://WWW.Scam-Site.in/kyc?x=1") == "scam-site.in"
+    assert normalize_indicator("domain", "scam-site.in") == "scam-site.in"
+    assert normalize_indicator("upi_id", "Fee.Pay@YBL") == "fee.pay@ybl"
+
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+def test_index_tracks_sessions_counts_and_times(backend):
+    if backend == "redis":
+        index = RedisIndicatorIndex(fakeredis.FakeAsyncRedis(decode_responses=True), max_sessions=2)
+    else:
+        index = IndicatorIndex(max_sessions=2)
+    recorder = IndicatorRecorder(index)
+    found = {"upi_ids": ["fee@ybl"], "urls": ["http://kyc.example/a", "http://kyc.example/b"]}
+
+    async def scenario():
+        recorder.record("s1", found, now=100.0)
+        recorder.record("s1", found, now=105.0)
+        recorder.record("s2", found, now=110.0)
+        assert await recorder.flush() == 6
+        recorder.record("s3", {"upi_ids": ["FEE@ybl"]}, now=120.0)
+        return await recorder.lookup("upi_id", "fee@ybl"), await recorder.lookup("domain", "kyc.example")
+
+    upi, domain = asyncio.run(scenario())
+    assert (upi["count"], upi["session_count"], upi["first_seen"], upi["last_seen"]) == (4, 3, 100.0, 120.0)
+    # Only the 2 most recently seen sessions are kept
+    assert upi["sessions"] == [{"session_id": "s3", "last_seen": 120.0}, {"session_id": "s2", "last_seen": 110.0}]
+    assert (domain["count"], domain["session_count"]) == (3, 2)
+
+def test_indicator_endpoint():
+    headers = {"x-api-key": "TEST123"}
+    message = "Urgent: verify KYC at http://kyc-index-test.in/login and pay to index.test@ybl"
+    with TestClient(app) as client:
+        for session_id in ("index-a", "index-b"):
+            client.post("/honeypot", headers=headers, json={"message": message, "session_id": session_id})
+
+        response = client.get("/indicators", headers=headers, params={"kind": "upi_id", "value": "index.test@ybl"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["session_count"] == 2
+        assert {s["session_id"] for s in data["sessions"]} == {"index-a", "index-b"}
+
+        domain = client.get("/indicators", headers=headers,
+                            params={"kind": "domain", "value": "https://kyc-index-test.in/other"}).json()
+        assert domain["value"] == "kyc-index-test.in"
+
+        assert client.get("/indicators", headers=headers, params={"kind": "domain", "value": "never.seen"}).status_code == 404
+        assert client.get("/indicators", headers=headers, params={"kind": "email", "value": "x"}).status_code == 400
+        assert client.get("/indicators", params={"kind": "upi_id", "value": "x"}).status_code == 401
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import fakeredis
+
+from app.limiter import RateLimiter, SharedMemoryRateLimiter, RedisRateLimiter, LeasedRateLimiter
+
+def test_burst_then_refill():
+    limiter = RateLimiter(requests_per_minute=60)
+    now = 1000.0
+    assert all(limiter.hit("1.2.3.4", now) == 0.0 for _ in range(60))
+
+    # Bucket empty: next request must wait one emission interval
+    assert limiter.hit("1.2.3.4", now) == 1.0
+    assert limiter.hit("5.6.7.8", now) == 0.0
+
+    assert limiter.hit("1.2.3.4", now + 1.0) == 0.0
+    assert limiter.hit("1.2.3.4", now + 1.0) > 0
+
+def test_sweep_forgets_idle_clients():
+    limiter = RateLimiter(requests_per_minute=60)
+    limiter.hit("idle", 0.0)
+    limiter.hit("busy", 50.0)
+
+    # "idle" refilled at t=1, "busy" is still within its window at t=10
+    assert limiter.sweep(now=10.0) == 1
+    assert list(limiter.clients) == ["busy"]
+
+def test_client_cap_evicts_oldest():
+    limiter = RateLimiter(requests_per_minute=60, max_clients=3)
+    for i in range(5):
+        limiter.hit(f"10.0.0.{i}", 0.0)
+    assert list(limiter.clients) == ["10.0.0.2", "10.0.0.3", "10.0.0.4"]
+    assert limiter.evicted == 2
+
+def test_shared_memory_limit_spans_workers(tmp_path):
+    # Two mappings of one file behave like two gunicorn workers
+    path = str(tmp_path / "ratelimit")
+    worker_a = SharedMemoryRateLimiter(path, slots=64, requests_per_minute=10)
+    worker_b = SharedMemoryRateLimiter(path, slots=64, requests_per_minute=10)
+
+    assert worker_a.take_sync("1.2.3.4", 6, now=100.0) == (6, 0.0)
+    assert worker_b.take_sync("1.2.3.4", 6, now=100.0) == (4, 0.0)
+    granted, retry_after = worker_a.take_sync("1.2.3.4", 1, now=100.0)
+    assert granted == 0 and retry_after == 6.0
+    assert worker_b.take_sync("1.2.3.4", 1, now=106.0) == (1, 0.0)
+
+def test_redis_limit_and_leases():
+    backend = RedisRateLimiter(fakeredis.FakeAsyncRedis(), requests_per_minute=10)
+    worker_a = LeasedRateLimiter(backend, lease_size=4)
+    worker_b = LeasedRateLimiter(backend, lease_size=4)
+
+    async def scenario():
+        results = []
+        for _ in range(7):
+            results.append(await worker_a.acquire("1.2.3.4"))
+            results.append(await worker_b.acquire("1.2.3.4"))
+        return results
+
+    results = asyncio.run(scenario())
+    # 10 requests allowed across both workers, then both are denied
+    assert sum(1 for r in results if r == 0.0) == 10
+    assert all(r > 0 for r in results[-2:])
+
+def test_unspent_lease_tokens_are_credited_back(tmp_path):
+    # Leases lapse at once: every request lands after its worker's lease expired
+    backend = RedisRateLimiter(fakeredis.FakeAsyncRedis(), requests_per_minute=10)
+    worker_a = LeasedRateLimiter(backend, lease_size=4, lease_ttl=0)
+    worker_b = LeasedRateLimiter(backend, lease_size=4, lease_ttl=0)
+
+    async def scenario():
+        results = []
+        for _ in range(6):
+            results.append(await worker_a.acquire("1.2.3.4"))
+            results.append(await worker_b.acquire("1.2.3.4"))
+        return results
+
+    results = asyncio.run(scenario())
+    # The full limit, as if both workers were one
+    assert results[:10] == [0.0] * 10 and all(r > 0 for r in results[10:])
+
+    # Leases dropped by the sweeper are credited back too
+    shared = SharedMemoryRateLimiter(str(tmp_path / "ratelimit"), slots=64, requests_per_minute=10)
+    worker = LeasedRateLimiter(shared, lease_size=5, lease_ttl=60)
+    assert asyncio.run(worker.acquire("5.6.7.8")) == 0.0
+    assert worker.sweep(now=time.monotonic() + 61) == 1
+    asyncio.run(worker.return_lapsed())
+    assert shared.take_sync("5.6.7.8", 10) == (9, 0.0)
+
+def test_batch_cost_is_all_or_nothing(tmp_path):
+    limiter = RateLimiter(requests_per_minute=10)
+    assert asyncio.run(limiter.acquire("1.2.3.4", 6)) == 0.0
+    # 4 left: a batch of 6 waits for two more, and takes nothing meanwhile
+    assert 11 < asyncio.run(limiter.acquire("1.2.3.4", 6)) <= 12.0
+    assert asyncio.run(limiter.acquire("1.2.3.4", 4)) == 0.0
+
+    # Behind a lease, the lease's unspent tokens go back before the batch is charged
+    shared = SharedMemoryRateLimiter(str(tmp_path / "ratelimit"), slots=64, requests_per_minute=10)
+    worker = LeasedRateLimiter(shared, lease_size=5, lease_ttl=60)
+    assert asyncio.run(worker.acquire("5.6.7.8")) == 0.0
+    assert asyncio.run(worker.acquire("5.6.7.8", 8)) == 0.0
+    assert asyncio.run(worker.acquire("5.6.7.8", 2)) > 0
+    assert asyncio.run(worker.acquire("5.6.7.8")) == 0.0
@@ -0,0 +1,248 @@
+import asyncio
+
+import fakeredis
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+settings.API_KEY = "TEST123"
+
+from app import memory
+from app.main import app
+from app.detector import scan_message
+from app.memory import SessionManager, LocalSessionStore, Session, encode_varint, decode_varint
+
+@pytest.fixture
+def fake_redis():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+def test_redis_session_roundtrip(fake_redis):
+    manager = SessionManager(redis_client=fake_redis)
+
+    async def scenario():
+        assert await manager.get_session("abc") is None
+        await manager.update_session(Session("abc", turn=1, stage="hook", scam_type="phishing"))
+        assert (await manager.get_session("abc")).scam_type == "phishing"
+        assert 0 < await fake_redis.ttl("session:abc") <= 3600 * 24
+
+        state = await manager.advance_turn("abc", 0)
+        assert state.to_dict() == {"turn": 2, "stage": "trust_building", "scam_type": "phishing", "session_id": "abc"}
+        assert await manager.get_session("abc") == state
+
+    asyncio.run(scenario())
+
+def test_in_memory_fallback():
+    manager = SessionManager()
+    assert manager.redis_client is None
+
+    async def scenario():
+        await manager.update_session(Session("abc", turn=1))
+        assert await manager.get_session("abc") == Session("abc", turn=1, version=1)
+        assert (await manager.advance_turn("abc", scan_message("share the otp"))).turn == 2
+
+    asyncio.run(scenario())
+
+def test_session_encoding_roundtrip():
+    for n in (0, 63, 64, 4095, 4096, 10 ** 9):
+        assert decode_varint(encode_varint(n), 0) == (n, len(encode_varint(n)))
+
+    session = Session("s-1", turn=300, stage="exit", scam_type="otp_fraud", version=70, extra={"note": "x"})
+    raw = session.encode()
+    assert raw.isascii() and len(raw) < 30
+    assert Session.decode("s-1", raw) == session
+    assert Session.decode("s-1", raw.encode()) == session
+
+    # Records written before the compact format are still read
+    legacy = '{"turn": 2, "stage": "trust_building", "scam_type": "phishing", "session_id": "s-1", "note": "x"}'
+    assert Session.decode("s-1", legacy) == Session("s-1", 2, "trust_building", "phishing", extra={"note": "x"})
+    with pytest.raises(ValueError):
+        Session.decode("s-1", "\x7fjunk")
+
+def test_redis_upgrades_legacy_json_records(fake_redis):
+    manager = SessionManager(redis_client=fake_redis)
+
+    async def scenario():
+        await fake_redis.set("session:old", '{"turn": 64, "stage": "exit", "scam_type": "job_scam", "session_id": "old"}')
+        state = await manager.advance_turn("old", 0)
+        assert (state.turn, state.stage, state.scam_type, state.version) == (65, "exit", "job_scam", 1)
+        assert (await fake_redis.get("session:old")).startswith("\x03")
+
+    asyncio.run(scenario())
+
+def test_honeypot_against_redis_backend(fake_redis, monkeypatch):
+    monkeypatch.setattr(memory, "session_manager", SessionManager(redis_client=fake_redis))
+    msg = {"message": "Your KYC will expire, verify now", "session_id": "redis-api-1"}
+
+    with TestClient(app) as client:
+        first = client.post("/honeypot", headers={"x-api-key": "TEST123"}, json=msg).json()
+        second = client.post("/honeypot", headers={"x-api-key": "TEST123"}, json=msg).json()
+
+    assert first["session_state"]["turn"] == 1
+    assert second["session_state"]["turn"] == 2
+
+def test_stale_copy_is_refused_on_write(fake_redis):
+    worker_a = SessionManager(redis_client=fake_redis)
+    worker_b = SessionManager(redis_client=fake_redis)
+
+    async def scenario():
+        await worker_a.advance_turn("moving", scan_message("verify your kyc"))
+        session = await worker_a.get_session("moving")
+        assert session == Session("moving", 1, "hook", version=1, signal_mask=scan_message("verify your kyc"))
+
+        # The conversation moves to worker B; A's copy is now stale
+        await worker_b.advance_turn("moving", 0)
+
+        # A compare-and-set write from the stale copy is refused
+        session.extra = {"note": "from A"}
+        assert not await worker_a.update_session(session, compare=True)
+        session = await worker_a.get_session("moving")
+        assert (session.version, session.turn, session.extra) == (2, 2, None)
+        session.extra = {"note": "from A"}
+        assert await worker_a.update_session(session, compare=True)
+        assert session.version == 3
+
+        state = await worker_b.advance_turn("moving", 0)
+        assert (state.turn, state.scam_type, state.extra) == (3, "phishing", {"note": "from A"})
+
+    asyncio.run(scenario())
+
+def test_local_store_ttl_and_lru_cap():
+    store = LocalSessionStore(ttl=10, max_entries=3)
+    for i, session_id in enumerate("abcd"):
+        store.set(Session(session_id, turn=1), now=i)
+
+    # Over the cap: the least recently written session is gone
+    assert len(store) == 3 and store.evicted == 1
+    assert store.get("a", now=4) is None
+    assert store.get("b", now=4).session_id == "b"
+
+    # Rewriting a session renews its TTL; reads don't
+    store.set(Session("b", turn=2), now=5)
+    assert store.get("c", now=12) is None
+    assert store.sweep(now=13.5) == 1  # "d" expired at 13, "b" lives until 15
+    assert store.get("b", now=14) == Session("b", turn=2)
+
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+def test_concurrent_advance_is_sequential(backend, fake_redis):
+    """
+    Many concurrent turns on one session_id must each get a distinct turn,
+    with no turn lost or repeated.
+    """
+    manager = SessionManager(redis_client=fake_redis if backend == "redis" else None)
+    n = 100
+
+    async def scenario():
+        states = await asyncio.gather(*(manager.advance_turn("hot", scan_message("share the otp")) for _ in range(n)))
+        batched = await manager.advance_turns([("hot", 0)] * 10)
+        return states, batched, await manager.get_session("hot")
+
+    states, batched, final = asyncio.run(scenario())
+    assert sorted(s.turn for s in states) == list(range(1, n + 1))
+    assert [s.turn for s in batched] == list(range(n + 1, n + 11))
+    assert final.turn == n + 10
+    assert final.stage == "exit"
+    assert final.scam_type == "otp_fraud"
+
+def test_concurrent_requests_same_session(fake_redis, monkeypatch):
+    monkeypatch.setattr(memory, "session_manager", SessionManager(redis_client=fake_redis))
+    msg = {"message": "Share the OTP code now", "session_id": "hammered"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            responses = await asyncio.gather(*(
+                ac.post("/honeypot", headers={"x-api-key": "TEST123"}, json=msg) for _ in range(50)
+            ))
+        return [r.json()["session_state"]["turn"] for r in responses]
+
+    assert sorted(asyncio.run(scenario())) == list(range(1, 51))
+
+def test_signals_accumulate_across_turns_on_both_backends(fake_redis):
+    """
+    The Lua advance must merge signal masks exactly like Session.advance,
+    including masks spanning several varint digits.
+    """
+    turns = ["Please verify", "your KYC is pending", "verify verify", "", "Share the OTP code, HR manager on telegram"]
+
+    async def play(manager):
+        return [await manager.advance_turn("conv", scan_message(text)) for text in turns]
+
+    redis_states = asyncio.run(play(SessionManager(redis_client=fake_redis)))
+    memory_states = asyncio.run(play(SessionManager()))
+    assert [(s.turn, s.stage, s.scam_type, s.signal_mask, s.confidence) for s in redis_states] == \
+        [(s.turn, s.stage, s.scam_type, s.signal_mask, s.confidence) for s in memory_states]
+
+    # Evidence builds on earlier turns; repeating a keyword adds nothing
+    assert [s.confidence for s in memory_states[:4]] == [0.4, 0.6, 0.6, 0.6]
+    assert memory_states[1].signals == ["phishing:verify", "phishing:kyc"]
+    assert memory_states[4].signal_mask >= 2 ** 36
+
+    # Compact records from before signal tracking have none
+    old = Session.decode("conv", "\x01\x05\x03\x02\x01")
+    assert (old.version, old.turn, old.stage, old.scam_type, old.signal_mask) == (5, 3, "extraction", "phishing", 0)
+
+def test_masks_of_other_rule_sets_are_dropped(fake_redis):
+    # A record written before a rules change: its mask bits meant other patterns
+    stale = (memory.FORMAT_V3 + encode_varint(4) + encode_varint(3) + chr(memory.STAGE_CODES["extraction"])
+             + chr(memory.SCAM_TYPE_CODES["phishing"]) + encode_varint(memory.PATTERNS_ID ^ 1) + encode_varint(0b1011))
+    session = Session.decode("old-rules", stale)
+    assert (session.turn, session.scam_type, session.signal_mask) == (3, "phishing", 0)
+
+    async def scenario():
+        await fake_redis.set("session:old-rules", stale)
+        return await SessionManager(redis_client=fake_redis).advance_turn("old-rules", 0b100)
+
+    advanced = asyncio.run(scenario())
+    assert (advanced.version, advanced.turn, advanced.signal_mask) == (5, 4, 0b100)
+
+def test_v2_records_are_tied_to_their_rule_set(fake_redis, monkeypatch):
+    v2 = memory.FORMAT_V2 + encode_varint(4) + encode_varint(3) + "\x02\x01" + encode_varint(0b1011)
+    assert Session.decode("v2", v2).signal_mask == 0b1011
+
+    # After a rules change, V2 masks are as stale as any other
+    monkeypatch.setattr(memory, "PATTERNS_ID", memory.V2_PATTERNS_ID ^ 1)
+    assert Session.decode("v2", v2).signal_mask == 0
+
+    async def scenario():
+        await fake_redis.set("session:v2", v2)
+        return await SessionManager(redis_client=fake_redis).advance_turn("v2", 0b100)
+
+    advanced = asyncio.run(scenario())
+    assert (advanced.turn, advanced.signal_mask) == (4, 0b100)
+
+@pytest.mark.parametrize("backend", ["redis", "memory"])
+def test_intelligence_sets_merge_dedup_and_cap(backend, fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "INTEL_MAX_PER_FIELD", 3)
+    manager = SessionManager(redis_client=fake_redis if backend == "redis" else None)
+
+    async def scenario():
+        await manager.advance_turn("intel", 0)
+        assert await manager.merge_intelligence("intel", {"upi_ids": ["a@ybl", "b@ybl"]}) is None
+        await manager.advance_turn("intel", 0)
+        return await manager.merge_intelligence(
+            "intel", {"upi_ids": ["b@ybl", "c@ybl", "d@ybl"], "urls": ["http://x.in"]}, cumulative=True
+        )
+
+    collected = asyncio.run(scenario())
+    assert collected == {
+        "upi_ids": ["a@ybl", "b@ybl", "c@ybl"],
+        "bank_accounts": [],
+        "phone_numbers": [],
+        "urls": ["http://x.in"],
+    }
+    if backend == "redis":
+        assert asyncio.run(fake_redis.smembers("intel:intel:upi_ids")) == {"a@ybl", "b@ybl", "c@ybl"}
+        assert 0 < asyncio.run(fake_redis.ttl("intel:intel:urls")) <= 3600 * 24
+
+def test_intelligence_keys_dont_collide_with_sessions(fake_redis):
+    manager = SessionManager(redis_client=fake_redis)
+
+    async def scenario():
+        await manager.advance_turn("victim", 0)
+        await manager.merge_intelligence("victim", {"urls": ["http://x.in"]})
+        # A session named after one of the victim's intelligence sets
+        assert (await manager.advance_turn("victim:urls", 0)).turn == 1
+        return await manager.merge_intelligence("victim", {"urls": ["http://y.in"]}, cumulative=True)
+
+    assert asyncio.run(scenario())["urls"] == ["http://x.in", "http://y.in"]
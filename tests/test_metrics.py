@@ -0,0 +1,63 @@
+import multiprocessing
+import re
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.metrics import Registry
+
+client = TestClient(app)
+
+def sample(text: str, series: str) -> float:
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+def test_metrics_endpoint_counts_stages(monkeypatch):
+    monkeypatch.setattr(settings, "API_KEY", "TEST123")
+    before = client.get("/metrics").text
+    client.post(
+        "/honeypot",
+        headers={"x-api-key": "TEST123"},
+        json={"message": "Urgent! Verify your account at http://scam-link.com/login", "session_id": "metrics-1"}
+    )
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    after = response.text
+
+    for stage in ("auth", "rate_limit", "detect", "session", "extract", "respond", "serialize"):
+        series = f'honeypot_stage_seconds_count{{stage="{stage}"}}'
+        assert sample(after, series) == sample(before, series) + 1
+    series = 'honeypot_messages_total{scam_type="phishing",stage="hook"}'
+    assert sample(after, series) == sample(before, series) + 1
+
+def record_in_worker(directory):
+    registry, requests, latency = build_registry()
+    registry.open(directory)
+    requests.inc("b", amount=2)
+    latency.observe(0.3)
+
+def build_registry():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", {"kind": ["a", "b"]})
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    return registry, requests, latency
+
+def test_registry_sums_worker_files(tmp_path):
+    registry, requests, latency = build_registry()
+    registry.open(str(tmp_path))
+    requests.inc("a")
+    latency.observe(0.05)
+
+    worker = multiprocessing.get_context("fork").Process(target=record_in_worker, args=(str(tmp_path),))
+    worker.start()
+    worker.join()
+
+    # The exited worker's file still counts
+    text = registry.render()
+    assert 'requests_total{kind="a"} 1' in text
+    assert 'requests_total{kind="b"} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+    assert "latency_seconds_sum 0.35" in text
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+settings.API_KEY = "TEST123"
+
+from app.limiter import RateLimiter
+from app.main import app
+from app.streaming import stream_results
+
+SCAM = "Your SBI account is blocked today, update KYC at http://sbi-kyc.in or pay the fee to sbi.help@ybl"
+
+def test_stream_results_in_order_with_error_lines():
+    client = TestClient(app)
+    body = "\n".join([
+        json.dumps({"message": SCAM, "session_id": "stream-1"}),
+        "not json",
+        "",
+        json.dumps({"message": "ok, what should I do?", "session_id": "stream-1"}),
+        json.dumps({"message": "x" * 10000}),
+    ])  # no trailing newline
+    response = client.post("/honeypot/stream", content=body, headers={"x-api-key": "TEST123"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert len(results) == 4
+    assert results[0]["is_scam"] and results[0]["session_state"] == {
+        "session_id": "stream-1", "turn": 1, "stage": "hook"
+    }
+    assert results[1]["error"] == "ValidationError"
+    assert results[2]["session_state"]["turn"] == 2
+    assert results[3]["error"] == "HTTPException" and "too long" in results[3]["message"]
+
+    assert client.post("/honeypot/stream", content=body).status_code == 401
+
+def test_line_too_long_ends_stream():
+    client = TestClient(app)
+    body = json.dumps({"message": SCAM}) + "\n" + "x" * (settings.STREAM_MAX_LINE_BYTES + 1) + "\n" + json.dumps({"message": SCAM})
+    response = client.post("/honeypot/stream", content=body, headers={"x-api-key": "TEST123"})
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r.get("error") for r in results] == [None, "HTTPException"]
+
+def test_read_ahead_is_bounded():
+    read = []
+
+    async def chunks():
+        for i in range(100):
+            read.append(i)
+            yield b'{"n": %d}\n' % i
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handle(line: bytes) -> bytes:
+            await release.wait()
+            return line + b"\n"
+
+        results = stream_results(chunks(), handle, max_pending=5, max_line=100)
+        first = asyncio.ensure_future(results.__anext__())
+        await asyncio.sleep(0.01)
+        # One line in the handler, five queued, one waiting to be queued
+        assert len(read) <= 7
+        release.set()
+        return [await first] + [line async for line in results]
+
+    lines = asyncio.run(scenario())
+    assert lines == [b'{"n": %d}\n' % i for i in range(100)]
+
+def test_stream_lines_are_rate_limited(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    # The stream and two lines
+    monkeypatch.setattr("app.limiter.limiter", RateLimiter(requests_per_minute=3))
+    client = TestClient(app)
+    body = "\n".join(json.dumps({"message": "hello", "session_id": "stream-limit"}) for _ in range(4))
+    response = client.post("/honeypot/stream", content=body, headers={"x-api-key": "TEST123"})
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["session_state"]["turn"] for r in results[:2]] == [1, 2]
+    assert [r["message"] for r in results[2:]] == ["Rate limit exceeded. Please try again later."] * 2